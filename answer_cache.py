@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 의미 기반 답변 캐시 설정 (환경 변수로 조정 가능)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+
+def entity_key(entity_index):
+    """질문에서 찾은 카드사/카드명으로 캐시 항목을 나누는 키 함수 (entity_index.EntityIndex 사용)
+
+    "삼성카드 taptap O 연회비"와 "신한카드 Mr.Life 연회비"처럼 카드만 다른 질문은 임베딩이 거의 같으므로,
+    키가 같은 항목끼리만 유사도를 비교해 다른 카드의 답변을 돌려주지 않게 한다.
+    """
+    def key(question):
+        matched = entity_index.match(question)
+        return tuple(sorted(matched["companies"])), tuple(sorted(matched["cards"]))
+    return key
+
+
+class SemanticAnswerCache:
+    """독립 질문(standalone question) 임베딩으로 이전 답변을 찾아 재사용하는 캐시
+
+    코사인 유사도가 threshold 이상인 이전 질문이 있으면 저장된 답변과 context 문서를 반환한다.
+    entity_fn을 주면 질문의 엔티티 키(entity_key 참고)가 같은 항목만 적중으로 인정하고,
+    카드사/카드명이 하나도 없는 질문은 어느 카드 이야기인지 알 수 없으므로 조회도 저장도 하지 않는다.
+    항목은 TTL이 지나거나 max_entries를 넘으면(LRU) 제거되고, 인덱스 버전이 바뀌면 모두 무효화된다.
+    """
+
+    def __init__(self, embeddings, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL,
+                 max_entries=ANSWER_CACHE_SIZE, version_fn=None, entity_fn=None):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.version = version_fn() if version_fn else None
+        self.entity_fn = entity_fn
+        self.entries = OrderedDict()
+        self._matrix = None
+        self._keys = []
+        self._entities = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def _check_version(self):
+        if not self.version_fn:
+            return
+        version = self.version_fn()
+        if version != self.version:
+            # 인덱스 내용이 바뀌었으므로 이전 답변은 더 이상 신뢰할 수 없음
+            self.entries.clear()
+            self._matrix = None
+            self.version = version
+            self.invalidations += 1
+
+    def _expire(self, now):
+        expired = [key for key, entry in self.entries.items() if now - entry["created_at"] > self.ttl]
+        for key in expired:
+            del self.entries[key]
+        if expired:
+            self._matrix = None
+            self.evictions += len(expired)
+
+    def _rebuild_matrix(self):
+        self._keys = list(self.entries)
+        self._entities = [self.entries[key]["entities"] for key in self._keys]
+        if self._keys:
+            self._matrix = np.vstack([self.entries[key]["embedding"] for key in self._keys])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def embed(self, question):
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def entities(self, question):
+        return self.entity_fn(question) if self.entity_fn else None
+
+    @staticmethod
+    def _scoped(entities):
+        # entity_fn이 없으면 None, 있으면 (카드사들, 카드명들) 중 하나라도 있어야 함
+        return entities is None or any(entities)
+
+    def lookup(self, question, embedding=None):
+        """유사한 이전 질문의 캐시 항목을 반환 (없으면 None)"""
+        entities = self.entities(question)
+        if not self._scoped(entities):
+            with self._lock:
+                self.skipped += 1
+            return None
+        embedding = self.embed(question) if embedding is None else embedding
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+            if self._matrix is None:
+                self._rebuild_matrix()
+            if not self._keys:
+                self.misses += 1
+                return None
+            similarities = self._matrix @ embedding
+            if self.entity_fn:
+                # 카드사/카드명이 다른 질문의 항목은 유사도와 관계없이 제외
+                same = np.array([other == entities for other in self._entities])
+                similarities = np.where(same, similarities, -np.inf)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = self._keys[best]
+            entry = self.entries[key]
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry["latency"]
+            return {**entry, "similarity": float(similarities[best])}
+
+    def store(self, question, answer, context, latency, embedding=None):
+        entities = self.entities(question)
+        if not self._scoped(entities):
+            return
+        embedding = self.embed(question) if embedding is None else embedding
+        with self._lock:
+            self._check_version()
+            self.entries[question] = {
+                "question": question,
+                "entities": entities,
+                "answer": answer,
+                "context": context,
+                "embedding": embedding,
+                "latency": latency,
+                "created_at": time.time(),
+            }
+            self.entries.move_to_end(question)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def metrics(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": self.hits / total if total else 0.0,
+            "latency_saved_seconds": self.saved_seconds,
+            "entries": len(self.entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,103 @@
+"""카드 표(card_tables.py) 직접 답변과 RAG 체인의 응답 지연 / 적용 범위 비교
+
+카드 표에서 정형 질문(연회비·전월실적 조회, 두 카드 비교, 혜택/연회비 조건 검색)을 만들고, 카드 표를 붙인 rag_chain과
+붙이지 않은 rag_chain(모든 질문을 검색 -> 리랭크 -> 생성)으로 같은 질문에 답하게 해 p50/p95 지연과 표 적중률을 출력한다.
+조회 질문은 답변에 표의 연회비/전월실적 값이 들어 있는지도 확인하고, 혜택 설명 질문(build_benefit_questions)이
+표로 잘못 넘어가지 않는지(표 적중률이 0에 가까워야 함) 함께 잰다. 가짜 임베더/리랭커/LLM을 쓰므로 API 키 없이 실행된다.
+
+    python -m benchmarks.bench_card_tables --questions 60
+"""
+import random
+import argparse
+
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from chatbot_logic import rag_chain
+from card_tables import CardTable, format_fee, format_spend
+from tracing import tracer
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+from benchmarks.common import percentile, build_benefit_questions
+
+BENEFIT_KEYWORDS = ("공항라운지", "주유", "카페", "대중교통", "편의점", "온라인쇼핑", "영화", "통신")
+
+
+def build_table_questions(table, count, seed):
+    """카드 표로 답할 수 있는 질문 -> [(질문, 답변에 들어 있어야 할 문자열 또는 None)]"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(count):
+        record, other = rng.sample(table.records, 2)
+        kind = i % 5
+        if kind == 0:
+            questions.append((f"{record['card_name']} 연회비 얼마야?", format_fee(record)))
+        elif kind == 1:
+            questions.append((f"{record['card_name']} 전월실적 조건 알려줘", format_spend(record)))
+        elif kind == 2:
+            questions.append((f"{record['card_name']}랑 {other['card_name']} 비교해줘", format_fee(other)))
+        elif kind == 3:
+            questions.append((f"{rng.choice(BENEFIT_KEYWORDS)} 혜택 있는 카드 중에 연회비 싼 카드", None))
+        else:
+            questions.append((f"연회비 {rng.choice((1, 2, 3, 5))}만원 이하 {rng.choice(BENEFIT_KEYWORDS)} 카드 있어?", None))
+    return questions
+
+
+def run(chain, questions, label):
+    totals, table_hits, correct = [], 0, 0
+    for i, (question, expected) in enumerate(questions):
+        session_id = f"{label}-{i}"
+        output = chain.invoke({"input": question, "chat_history": []}, {"configurable": {"session_id": session_id}})
+        totals.append(tracer.last(session_id)["total"])
+        table_hits += bool(output.get("table_hit"))
+        correct += expected is not None and expected in output["answer"]
+    checked = sum(expected is not None for _, expected in questions)
+    return {
+        "table hit rate": table_hits / len(questions),
+        "lookup correct": correct / checked if checked else 0.0,
+        "total p50 (ms)": percentile(totals, 50) * 1000,
+        "total p95 (ms)": percentile(totals, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--questions", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.1, help="가짜 LLM의 기본 첫 토큰 지연(초)")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002, help="입력 토큰당 첫 토큰 지연(초)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="출력 토큰당 지연(초)")
+    args = parser.parse_args()
+
+    # 추적 결과는 메모리에서만 읽음 (traces.jsonl에 남기지 않음)
+    tracer.log_path = ""
+    table = CardTable.from_json(args.data_path)
+    documents = list(load_documents(args.data_path))
+    chunks = assign_chunk_ids(split_documents(documents))
+    vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in chunks], HashEmbeddings(dimension=256),
+                                              metadatas=[doc.metadata for doc in chunks],
+                                              ids=[doc.metadata["chunk_id"] for doc in chunks])
+    question_sets = {
+        "structured": build_table_questions(table, args.questions, args.seed),
+        "benefit": [(question, None) for question, _, _ in
+                    build_benefit_questions(documents, args.questions, args.seed)],
+    }
+
+    for name, questions in question_sets.items():
+        results = {}
+        # 빈 표를 넘기면 card_table.json이 있어도 모든 질문이 RAG 체인으로 감
+        for label, card_table in (("rag only", CardTable([])), ("card table", table)):
+            llm = StubChatModel(latency=args.latency, prompt_token_latency=args.prompt_token_latency,
+                                token_latency=args.token_latency)
+            chain = rag_chain(vectorstore, None, use_router=True, llm=llm, reranker_model=StubCrossEncoder(),
+                              card_table=card_table)
+            results[label] = run(chain, questions, f"{name}-{label}")
+
+        print(f"\n[{name} questions, n={len(questions)}]")
+        print(f"{'':<18}{'rag only':>12}{'card table':>12}")
+        for key in results["rag only"]:
+            print(f"{key:<18}{results['rag only'][key]:>12.2f}{results['card table'][key]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
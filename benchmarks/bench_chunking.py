@@ -0,0 +1,98 @@
+"""청킹 방식별 인덱스 크기 / 임베딩 호출 수 / 검색 품질 비교
+
+기존 방식(카드 요약 + 혜택 설명을 500자/100자 중복으로 분할)과 섹션 단위 청킹(카드 요약은 부모 레코드에 한 번만 저장)을
+같은 가짜 임베더로 로컬 인덱스에 적재해 비교한다. 검색 품질은 혜택 설명에서 뽑은 질문으로 정답 (카드, 혜택) 청크가
+상위 k개 안에 있는지(hit@k)와 MRR로 측정하고, 리랭크 후 LLM에 들어가는 context 길이도 함께 출력한다.
+
+    python -m benchmarks.bench_chunking --questions 200
+"""
+import os
+import argparse
+import tempfile
+
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import ingest_documents, assign_chunk_ids
+from local_vectorstore import LocalIndex, LocalVectorStore
+from lexical_index import LexicalIndex, HybridRetriever
+from card_chunker import structured_split, ParentStore, expand_to_parents
+from reranker import FastCrossEncoderReranker
+from session_store import estimate_tokens
+from stubs import HashEmbeddings, StubCrossEncoder
+from benchmarks.common import build_benefit_questions
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def evaluate(chunks, parents, questions, args):
+    embeddings = HashEmbeddings(dimension=args.dimension)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = LocalIndex(os.path.join(tmp_dir, "index"))
+        stats = ingest_documents(chunks, embeddings, index, manifest_path=os.path.join(tmp_dir, "manifest.json"),
+                                 show_progress=False)
+        index.save()
+        size = directory_size(index.path)
+        if parents:
+            ParentStore(parents).save(os.path.join(tmp_dir, "parents.json"))
+            size += os.path.getsize(os.path.join(tmp_dir, "parents.json"))
+        embed_calls, embedded_chars = embeddings.calls, sum(len(doc.page_content) for doc in chunks)
+
+        vectorstore = LocalVectorStore(index, embeddings)
+        retriever = HybridRetriever(dense_retriever=vectorstore.as_retriever(search_kwargs={"k": args.k}),
+                                    lexical_index=LexicalIndex.build(chunks), k=args.k, lexical_k=args.k)
+        reranker = FastCrossEncoderReranker(scorer=StubCrossEncoder(), top_n=15, prefilter_n=0, cache_size=0)
+        parent_store = ParentStore(parents) if parents else None
+
+        hits = {k: 0 for k in (1, 5, args.k)}
+        reciprocal_ranks, context_tokens = [], []
+        for question, card_name, benefit in questions:
+            docs = retriever.invoke(question)
+            rank = next((i for i, doc in enumerate(docs, start=1)
+                         if doc.metadata["card_name"] == card_name and doc.metadata["benefit"] == benefit), None)
+            for k in hits:
+                hits[k] += rank is not None and rank <= k
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            context = reranker.compress_documents(docs, question)
+            if parent_store:
+                context = expand_to_parents(context, parent_store)
+            context_tokens.append(sum(estimate_tokens(doc.page_content) for doc in context))
+
+    return {
+        "chunks": stats.total_chunks,
+        "embedded chars": embedded_chars,
+        "embed calls": embed_calls,
+        "index size (KB)": size // 1024,
+        **{f"hit@{k}": hits[k] / len(questions) for k in hits},
+        "MRR": sum(reciprocal_ranks) / len(questions),
+        "context tokens": sum(context_tokens) / len(context_tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--dimension", type=int, default=1536, help="가짜 임베딩 차원 (인덱스 크기 계산용)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    documents = list(load_documents(args.data_path))
+    questions = build_benefit_questions(documents, args.questions, args.seed)
+
+    recursive = evaluate(assign_chunk_ids(split_documents(documents)), None, questions, args)
+    structured_chunks, parents = structured_split(documents)
+    structured = evaluate(assign_chunk_ids(structured_chunks), parents, questions, args)
+
+    print(f"{'':<18}{'recursive':>12}{'structured':>12}")
+    for key in recursive:
+        before, after = recursive[key], structured[key]
+        if isinstance(before, float):
+            print(f"{key:<18}{before:>12.3f}{after:>12.3f}")
+        else:
+            print(f"{key:<18}{before:>12}{after:>12}")
+
+
+if __name__ == "__main__":
+    main()
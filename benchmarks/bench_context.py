@@ -0,0 +1,90 @@
+"""context 조립(중복 제거 + 토큰 예산 선택 + 인접 청크 병합) 전후의 프롬프트 토큰 수와 답변 지연 비교
+
+rag_chain을 기존 방식(리랭크된 15개 청크를 그대로 전달)과 context 조립 방식으로 각각 만들어 같은 질문 목록에 답하게 하고,
+답변 생성 단계의 평균 프롬프트 토큰 수, 응답 지연, context 문서 수, 정답 (카드, 혜택)이 context에 남았는지를 출력한다.
+가짜 LLM은 입력 토큰 수에 비례하는 첫 토큰 지연(--prompt-token-latency)을 흉내낸다.
+
+    python -m benchmarks.bench_context --questions 30 --budget 2000
+"""
+import time
+import argparse
+
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from card_chunker import structured_split, ParentStore
+from chatbot_logic import rag_chain
+from tracing import tracer
+from context_assembly import CONTEXT_TOKEN_BUDGET
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+from benchmarks.common import percentile, build_benefit_questions
+
+
+def run(chain, questions, label):
+    prompt_tokens, totals, context_docs, gold_hits = [], [], [], 0
+    for i, (question, card_name, benefit) in enumerate(questions):
+        session_id = f"{label}-{i}"
+        output = chain.invoke({"input": question, "chat_history": []}, {"configurable": {"session_id": session_id}})
+        trace = tracer.last(session_id)
+        prompt_tokens.append(trace["tokens"]["prompt"])
+        totals.append(trace["total"])
+        context_docs.append(len(output["context"]))
+        gold_hits += any(doc.metadata.get("card_name") == card_name and benefit in doc.metadata.get("benefit", "")
+                         for doc in output["context"])
+    count = len(questions)
+    return {
+        "prompt tokens": sum(prompt_tokens) / count,
+        "context docs": sum(context_docs) / count,
+        "total p50 (ms)": percentile(totals, 50) * 1000,
+        "total p95 (ms)": percentile(totals, 95) * 1000,
+        "gold in context": gold_hits / count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget", type=int, default=CONTEXT_TOKEN_BUDGET, help="context 토큰 예산")
+    parser.add_argument("--chunking", nargs="+", choices=["recursive", "structured"], default=["recursive", "structured"])
+    parser.add_argument("--latency", type=float, default=0.1, help="가짜 LLM의 기본 첫 토큰 지연(초)")
+    parser.add_argument("--prompt-token-latency", type=float, default=0.0002, help="입력 토큰당 첫 토큰 지연(초)")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="출력 토큰당 지연(초)")
+    args = parser.parse_args()
+
+    # 추적 결과는 메모리에서만 읽음 (traces.jsonl에 남기지 않음)
+    tracer.log_path = ""
+    documents = list(load_documents(args.data_path))
+    questions = build_benefit_questions(documents, args.questions, args.seed)
+
+    for chunking in args.chunking:
+        if chunking == "structured":
+            chunks, parents = structured_split(documents)
+            parent_store = ParentStore(parents)
+        else:
+            chunks, parent_store = split_documents(documents), None
+        chunks = assign_chunk_ids(chunks)
+        vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in chunks], HashEmbeddings(dimension=256),
+                                                  metadatas=[doc.metadata for doc in chunks],
+                                                  ids=[doc.metadata["chunk_id"] for doc in chunks])
+
+        results = {}
+        for label, budget in (("before", None), ("after", args.budget)):
+            llm = StubChatModel(latency=args.latency, prompt_token_latency=args.prompt_token_latency,
+                                token_latency=args.token_latency)
+            chain = rag_chain(vectorstore, None, use_router=True, llm=llm, reranker_model=StubCrossEncoder(),
+                              context_budget=budget, parent_store=parent_store)
+            start = time.perf_counter()
+            results[label] = run(chain, questions, f"{chunking}-{label}")
+            print(f"{chunking}/{label}: {time.perf_counter() - start:.1f}s")
+
+        print(f"\n[{chunking} chunking, budget={args.budget}]")
+        print(f"{'':<18}{'before':>10}{'after':>10}")
+        for key in results["before"]:
+            print(f"{key:<18}{results['before'][key]:>10.2f}{results['after'][key]:>10.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
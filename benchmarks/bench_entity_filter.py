@@ -0,0 +1,87 @@
+"""엔티티 메타데이터 필터 검색 벤치마크
+
+카드명/카드사+혜택이 드러난 질문으로 기존 하이브리드 검색(필터 없음)과 EntityFilteredRetriever를 비교한다.
+질의당 리랭커에 넘어가는 후보 수(채점 쌍 수), 검색+리랭크 지연 시간, 후보 중 질문 대상과 일치하는 비율을 출력한다.
+임베딩은 가짜 해시 임베더를 쓰므로 API 키가 필요 없다.
+
+    python -m benchmarks.bench_entity_filter --pair-latency 0.005
+"""
+import time
+import random
+import argparse
+
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from lexical_index import LexicalIndex, HybridRetriever
+from entity_index import EntityIndex, EntityFilteredRetriever
+from reranker import FastCrossEncoderReranker
+from stubs import HashEmbeddings, StubCrossEncoder
+from benchmarks.common import format_latency
+
+BENEFIT_QUESTIONS = ["주유 할인", "공항 라운지", "커피 할인", "대중교통 할인", "영화 할인", "항공 마일리지 적립"]
+
+
+def build_questions(docs, count, seed):
+    """(질문, 대상 필드, 대상 값) 목록: 카드명 질문과 카드사+혜택 질문을 섞어 만든다"""
+    rng = random.Random(seed)
+    cards = sorted({(doc.metadata["company"], doc.metadata["card_name"]) for doc in docs})
+    questions = []
+    for company, card_name in rng.sample(cards, count // 2):
+        questions.append((f"{card_name} 연회비랑 혜택 알려줘", "card_name", card_name))
+    companies = sorted({company for company, _ in cards})
+    for _ in range(count - len(questions)):
+        company = rng.choice(companies)
+        questions.append((f"{company} {rng.choice(BENEFIT_QUESTIONS)} 카드 추천해줘", "company", company))
+    return questions
+
+
+def run(retriever, reranker, questions):
+    latencies, candidates, on_target = [], 0, 0
+    for question, field, value in questions:
+        start = time.perf_counter()
+        docs = retriever.invoke(question)
+        reranker.compress_documents(docs, question)
+        latencies.append(time.perf_counter() - start)
+        candidates += len(docs)
+        on_target += sum(doc.metadata.get(field) == value for doc in docs)
+    return latencies, candidates / len(questions), on_target / max(candidates, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--questions", type=int, default=40)
+    parser.add_argument("--k", type=int, default=20, help="필터 없는 검색의 후보 수")
+    parser.add_argument("--filtered-k", type=int, default=10)
+    parser.add_argument("--pair-latency", type=float, default=0.005, help="가짜 리랭커의 쌍당 채점 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    docs = assign_chunk_ids(split_documents(load_documents(args.data_path)))
+    vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in docs], HashEmbeddings(dimension=256),
+                                              metadatas=[doc.metadata for doc in docs],
+                                              ids=[doc.metadata["chunk_id"] for doc in docs])
+    lexical_index = LexicalIndex.build(docs)
+    entity_index = EntityIndex.build([doc.metadata for doc in docs])
+    questions = build_questions(docs, args.questions, args.seed)
+
+    retrievers = {
+        "hybrid (no filter)": HybridRetriever(dense_retriever=vectorstore.as_retriever(search_kwargs={"k": args.k}),
+                                              lexical_index=lexical_index, k=args.k, lexical_k=args.k),
+        "entity filter": EntityFilteredRetriever(vectorstore=vectorstore, entity_index=entity_index,
+                                                 lexical_index=lexical_index, k=args.k, filtered_k=args.filtered_k),
+    }
+    for name, retriever in retrievers.items():
+        scorer = StubCrossEncoder(latency_per_pair=args.pair_latency)
+        reranker = FastCrossEncoderReranker(scorer=scorer, top_n=15, prefilter_n=0, cache_size=0)
+        latencies, mean_candidates, precision = run(retriever, reranker, questions)
+        print(format_latency(name, latencies))
+        print(f"{'':<30} candidates/query={mean_candidates:.1f}  scored pairs={scorer.scored_pairs}  "
+              f"on-target={precision:.0%}")
+        if isinstance(retriever, EntityFilteredRetriever):
+            print(f"{'':<30} {retriever.stats()}")
+
+
+if __name__ == "__main__":
+    main()
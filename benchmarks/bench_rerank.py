@@ -0,0 +1,88 @@
+"""CPU 리랭크 지연 시간(p50/p95) 벤치마크 (k=30 후보)
+
+기존 방식(HuggingFaceCrossEncoder 기본 설정으로 30개 전부 채점)과 길이 제한/배치/1차 필터링/점수 캐시를
+적용한 FastCrossEncoderReranker를 비교한다. 후보는 BM25 인덱스로 뽑으므로 임베딩 API가 필요 없다.
+
+    python -m benchmarks.bench_rerank                       # 실제 bge-reranker-v2-m3 (CPU)
+    python -m benchmarks.bench_rerank --backend onnx        # ONNX Runtime 경로
+    python -m benchmarks.bench_rerank --stub                # 모델 없이 파이프라인 오버헤드만 측정
+"""
+import time
+import argparse
+
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from lexical_index import LexicalIndex
+from reranker import CrossEncoderScorer, FastCrossEncoderReranker
+from stubs import StubCrossEncoder
+from benchmarks.common import format_latency
+
+QUESTIONS = [
+    "스타벅스 할인 카드 추천해줘",
+    "삼성카드 마일리지 적립 카드 알려줘",
+    "공항 라운지 무료 이용 가능한 카드는?",
+    "주유 할인 많이 되는 카드",
+    "전월실적 없는 카드 중에 할인 많은 카드",
+    "넷플릭스 구독 할인 카드",
+    "대중교통 10% 할인 카드",
+    "연회비 저렴한 현대카드",
+    "해외 결제 수수료 면제 카드",
+    "편의점 할인 카드 추천",
+]
+
+
+def measure(reranker, candidate_sets, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for question, candidates in candidate_sets:
+            start = time.perf_counter()
+            reranker.compress_documents(candidates, question)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--k", type=int, default=30)
+    parser.add_argument("--top-n", type=int, default=15)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--prefilter", type=int, default=20)
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx"])
+    parser.add_argument("--onnx-file", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stub", action="store_true", help="실제 모델 대신 가짜 채점기 사용")
+    args = parser.parse_args()
+
+    docs = assign_chunk_ids(split_documents(load_documents(args.data_path)))
+    lexical_index = LexicalIndex.build(docs)
+    candidate_sets = [(q, [doc for doc, _ in lexical_index.search(q, k=args.k)]) for q in QUESTIONS]
+
+    if args.stub:
+        baseline_scorer = StubCrossEncoder(latency_per_pair=0.01)
+        tuned_scorer = StubCrossEncoder(latency_per_pair=0.005)
+    else:
+        baseline_scorer = CrossEncoderScorer(max_length=8192, batch_size=32, backend="torch")
+        tuned_scorer = CrossEncoderScorer(max_length=args.max_length, batch_size=args.batch_size,
+                                          backend=args.backend, onnx_file=args.onnx_file)
+
+    # 캐시를 끄려면 cache_size=0 (매 질의 전체 채점)
+    baseline = FastCrossEncoderReranker(scorer=baseline_scorer, top_n=args.top_n, prefilter_n=0, cache_size=0)
+    print(format_latency(f"baseline (k={args.k})", measure(baseline, candidate_sets, args.repeat)))
+
+    tuned = FastCrossEncoderReranker(scorer=tuned_scorer, top_n=args.top_n, prefilter_n=0, cache_size=0)
+    print(format_latency(f"max_length={args.max_length} batch={args.batch_size}",
+                         measure(tuned, candidate_sets, args.repeat)))
+
+    prefiltered = FastCrossEncoderReranker(scorer=tuned_scorer, top_n=args.top_n, prefilter_n=args.prefilter,
+                                           cache_size=0)
+    print(format_latency(f"+ prefilter={args.prefilter}", measure(prefiltered, candidate_sets, args.repeat)))
+
+    cached = FastCrossEncoderReranker(scorer=tuned_scorer, top_n=args.top_n, prefilter_n=args.prefilter)
+    measure(cached, candidate_sets, 1)
+    print(format_latency("+ score cache (warm)", measure(cached, candidate_sets, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
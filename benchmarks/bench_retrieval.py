@@ -0,0 +1,193 @@
+"""오프라인 검색 품질 / 지연 시간 벤치마크
+
+카드 데이터에서 정답(카드명, 혜택명)이 붙은 질문 목록을 seed로 고정해 만들고, 챗봇과 같은 검색 스택
+(청킹 -> 로컬 인덱스 -> dense / hybrid / entity 리트리버 -> cross-encoder 리랭커)을 실행해 다음을 잰다.
+  - 리랭크 전(후보 k개)과 후(top_n개)의 recall@1/5/10, MRR -> 리랭커 기여도(차이)
+  - 검색/리랭크 단계별 p50/p95 지연 시간과 처리량(질문/초)
+결과는 실행 설정, 커밋, 시각과 함께 JSONL 파일에 한 줄씩 추가되며, 같은 설정의 직전 실행과의 차이를 출력한다.
+
+기본은 가짜 해시 임베더/채점기를 쓰므로 API 키나 모델 없이 결정적으로 실행된다.
+--embeddings openai는 디스크 임베딩 캐시(embedding_cache.py)를 거쳐 실제 벡터를 쓰므로 두 번째 실행부터는 API를 호출하지 않고,
+--reranker cross-encoder는 실제 리랭커 모델(sentence-transformers 필요)을 쓴다.
+
+    python -m benchmarks.bench_retrieval --questions 200 --k 30 --top-n 15
+"""
+import os
+import json
+import time
+import argparse
+import subprocess
+
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from lexical_index import LexicalIndex, HybridRetriever
+from entity_index import EntityIndex, EntityFilteredRetriever
+from card_chunker import structured_split
+from corpus_builder import CORPUS_PATH
+from reranker import FastCrossEncoderReranker
+from stubs import HashEmbeddings, StubCrossEncoder
+from benchmarks.common import percentile, build_benefit_questions
+
+RECALL_AT = (1, 5, 10)
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "retrieval.jsonl")
+
+
+def create_embeddings(kind, dimension):
+    if kind == "hash":
+        return HashEmbeddings(dimension=dimension)
+    from langchain_openai import OpenAIEmbeddings
+    from embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"), model_name="text-embedding-ada-002")
+
+
+def create_scorer(kind):
+    if kind == "stub":
+        return StubCrossEncoder()
+    from reranker import CrossEncoderScorer
+    return CrossEncoderScorer()
+
+
+def gold_rank(docs, card_name, benefit):
+    """정답 (카드명, 혜택명) 청크의 순위 (1부터, 없으면 None)"""
+    return next((i for i, doc in enumerate(docs, start=1)
+                 if doc.metadata.get("card_name") == card_name and doc.metadata.get("benefit") == benefit), None)
+
+
+def quality(ranks):
+    metrics = {f"recall@{k}": sum(rank is not None and rank <= k for rank in ranks) / len(ranks) for k in RECALL_AT}
+    metrics["mrr"] = sum(1 / rank for rank in ranks if rank) / len(ranks)
+    return metrics
+
+
+def evaluate(retriever, reranker, questions):
+    candidate_ranks, reranked_ranks = [], []
+    retrieve_latencies, rerank_latencies, candidates = [], [], 0
+    start = time.perf_counter()
+    for question, card_name, benefit in questions:
+        t0 = time.perf_counter()
+        docs = retriever.invoke(question)
+        t1 = time.perf_counter()
+        reranked = reranker.compress_documents(docs, question) if docs else []
+        t2 = time.perf_counter()
+        retrieve_latencies.append(t1 - t0)
+        rerank_latencies.append(t2 - t1)
+        candidates += len(docs)
+        candidate_ranks.append(gold_rank(docs, card_name, benefit))
+        reranked_ranks.append(gold_rank(reranked, card_name, benefit))
+    elapsed = time.perf_counter() - start
+
+    before, after = quality(candidate_ranks), quality(reranked_ranks)
+    return {
+        "candidates": before,
+        "reranked": after,
+        "reranker_gain": {key: after[key] - before[key] for key in after},
+        "candidates_per_query": candidates / len(questions),
+        "latency_ms": {stage: {"p50": percentile(values, 50) * 1000, "p95": percentile(values, 95) * 1000}
+                       for stage, values in (("retrieve", retrieve_latencies), ("rerank", rerank_latencies))},
+        "queries_per_second": len(questions) / elapsed,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def previous_run(path, config):
+    """같은 설정으로 실행한 마지막 결과"""
+    if not os.path.exists(path):
+        return None
+    last = None
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["config"] == config:
+                last = record
+    return last
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default=CORPUS_PATH if os.path.exists(CORPUS_PATH) else "combined_card_info.json")
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunking", choices=["structured", "recursive"], default="structured")
+    parser.add_argument("--k", type=int, default=30, help="리랭커에 넘길 후보 수")
+    parser.add_argument("--top-n", type=int, default=15, help="리랭크 후 남길 문서 수")
+    parser.add_argument("--retrievers", nargs="+", choices=["dense", "hybrid", "entity"],
+                        default=["dense", "hybrid", "entity"])
+    parser.add_argument("--embeddings", choices=["hash", "openai"], default="hash")
+    parser.add_argument("--dimension", type=int, default=256, help="가짜 임베딩 차원")
+    parser.add_argument("--reranker", choices=["stub", "cross-encoder"], default="stub")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="결과를 한 줄씩 추가할 JSONL 파일")
+    args = parser.parse_args()
+
+    documents = list(load_documents(args.data_path))
+    questions = build_benefit_questions(documents, args.questions, args.seed)
+    if args.chunking == "structured":
+        chunks, _ = structured_split(documents)
+    else:
+        chunks = split_documents(documents)
+    chunks = assign_chunk_ids(chunks)
+
+    embeddings = create_embeddings(args.embeddings, args.dimension)
+    start = time.perf_counter()
+    vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in chunks], embeddings,
+                                              metadatas=[doc.metadata for doc in chunks],
+                                              ids=[doc.metadata["chunk_id"] for doc in chunks])
+    lexical_index = LexicalIndex.build(chunks)
+    entity_index = EntityIndex.build([doc.metadata for doc in chunks])
+    build_seconds = time.perf_counter() - start
+
+    retrievers = {
+        "dense": vectorstore.as_retriever(search_kwargs={"k": args.k}),
+        "hybrid": HybridRetriever(dense_retriever=vectorstore.as_retriever(search_kwargs={"k": args.k}),
+                                  lexical_index=lexical_index, k=args.k, lexical_k=args.k),
+        "entity": EntityFilteredRetriever(vectorstore=vectorstore, entity_index=entity_index,
+                                          lexical_index=lexical_index, k=args.k),
+    }
+    scorer = create_scorer(args.reranker)
+
+    config = {key: getattr(args, key) for key in ("data_path", "questions", "seed", "chunking", "k", "top_n",
+                                                  "embeddings", "dimension", "reranker")}
+    results = {}
+    for name in args.retrievers:
+        # 점수 캐시를 끄고 리트리버마다 새 리랭커를 써서 실행 순서가 결과에 영향을 주지 않게 함
+        reranker = FastCrossEncoderReranker(scorer=scorer, top_n=args.top_n, prefilter_n=0, cache_size=0)
+        results[name] = evaluate(retrievers[name], reranker, questions)
+
+    record = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(), "config": config,
+              "chunks": len(chunks), "index_build_seconds": build_seconds, "results": results}
+    previous = previous_run(args.output, config)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    print(f"questions={len(questions)} chunks={len(chunks)} k={args.k} top_n={args.top_n} "
+          f"embeddings={args.embeddings} reranker={args.reranker}")
+    header = "".join(f"{f'R@{k}':>8}" for k in RECALL_AT)
+    print(f"{'retriever':<10}{'stage':<11}{header}{'MRR':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'q/s':>8}")
+    for name, result in results.items():
+        for stage, latency_stage in (("candidates", "retrieve"), ("reranked", "rerank")):
+            metrics, latency = result[stage], result["latency_ms"][latency_stage]
+            recalls = "".join(f"{metrics[f'recall@{k}']:>8.3f}" for k in RECALL_AT)
+            throughput = f"{result['queries_per_second']:>8.1f}" if stage == "reranked" else ""
+            print(f"{name:<10}{stage:<11}{recalls}{metrics['mrr']:>8.3f}{latency['p50']:>10.1f}{latency['p95']:>10.1f}"
+                  f"{throughput}")
+        gain = result["reranker_gain"]
+        print(f"{'':<10}{'rerank +/-':<11}" + "".join(f"{gain[f'recall@{k}']:>+8.3f}" for k in RECALL_AT)
+              + f"{gain['mrr']:>+8.3f}")
+        if previous and name in previous["results"]:
+            before = previous["results"][name]["reranked"]
+            print(f"{'':<10}{'vs prev':<11}" + "".join(
+                f"{result['reranked'][f'recall@{k}'] - before[f'recall@{k}']:>+8.3f}" for k in RECALL_AT)
+                + f"{result['reranked']['mrr'] - before['mrr']:>+8.3f}  (commit {previous['commit']})")
+    print(f"결과를 {args.output}에 추가했습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""질문 재구성 라우터 on/off 턴별 지연 시간 벤치마크
+
+가짜 LLM(호출당 지연)과 지연을 준 임베더/리랭커로 대본이 있는 멀티턴 대화를 실행해,
+라우터 사용 여부에 따른 턴별 지연 시간과 재구성 LLM 호출 수를 비교한다.
+재구성이 필요한 턴(대본에 재구성 결과가 있는 턴)은 따로 모아, 라우터를 켰을 때 이 턴들이 느려지지 않는지 확인한다
+(미리 검색은 후보 검색만 하므로 리랭크 지연이 커도 재구성 턴에 리랭크가 두 번 실행되지 않아야 함).
+
+    python -m benchmarks.bench_router --llm-latency 0.6 --embed-latency 0.15 --rerank-latency 0.05
+"""
+import time
+import argparse
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+from chatbot_logic import rag_chain
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from query_router import needs_reformulation
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+from benchmarks.common import percentile
+
+# (질문, 재구성 결과) - 재구성이 필요 없는 질문은 None
+CONVERSATIONS = [
+    [
+        ("스타벅스 할인 카드 추천해줘", None),
+        ("그 카드 연회비는 얼마야?", "스타벅스 할인 카드의 연회비는 얼마야?"),
+        ("전월실적 없는 카드 중에 커피 할인 카드 알려줘", None),
+        ("그럼 주유 할인은?", "전월실적 없는 카드 중에 주유 할인 카드는?"),
+    ],
+    [
+        ("삼성카드 마일리지 적립 카드 알려줘", None),
+        ("공항 라운지 무료 이용 가능한 카드는 뭐가 있어?", None),
+        ("두 카드 비교해줘", "삼성카드 마일리지 적립 카드와 공항 라운지 카드 비교해줘"),
+        ("현대카드 M 연회비 알려줘", None),
+    ],
+    [
+        ("넷플릭스 할인되는 카드 있어?", None),
+        ("대중교통 10% 할인 카드 추천해줘", None),
+        ("해외 결제 수수료는 어때?", "대중교통 10% 할인 카드의 해외 결제 수수료는 어때?"),
+        ("신한카드 Deep Oil 주유 할인 조건 알려줘", None),
+        ("연회비는?", "신한카드 Deep Oil 연회비는?"),
+    ],
+]
+REWRITES = {question: rewritten for conversation in CONVERSATIONS for question, rewritten in conversation}
+
+
+def respond(messages):
+    # 재구성 프롬프트면 대본의 재구성 결과(없으면 원문)를, 아니면 고정 답변을 반환
+    if messages[0].content.startswith("Given a chat history"):
+        question = messages[-1].content
+        return REWRITES.get(question) or question
+    return "요청하신 카드 혜택 정보를 정리해 드리겠습니다."
+
+
+# 재구성이 필요한 턴인지 (run()이 돌려주는 턴 순서와 같음)
+REWRITE_TURNS = [rewritten is not None for conversation in CONVERSATIONS for _, rewritten in conversation]
+
+
+def mean_ms(latencies):
+    return sum(latencies) / len(latencies) * 1000 if latencies else 0.0
+
+
+def run(chain):
+    latencies = []
+    for conversation in CONVERSATIONS:
+        history = []
+        for question, _ in conversation:
+            start = time.perf_counter()
+            result = chain.invoke({"input": question, "chat_history": history})
+            latencies.append(time.perf_counter() - start)
+            history += [HumanMessage(content=question), AIMessage(content=result["answer"])]
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--llm-latency", type=float, default=0.6, help="LLM 호출당 첫 토큰까지의 지연(초)")
+    parser.add_argument("--embed-latency", type=float, default=0.15, help="질의 임베딩 지연(초)")
+    parser.add_argument("--rerank-latency", type=float, default=0.005, help="리랭크 쌍당 지연(초)")
+    args = parser.parse_args()
+
+    docs = assign_chunk_ids(split_documents(load_documents(args.data_path)))
+    build_embeddings = HashEmbeddings(dimension=256)
+    vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in docs], build_embeddings,
+                                              metadatas=[doc.metadata for doc in docs],
+                                              ids=[doc.metadata["chunk_id"] for doc in docs])
+    vectorstore.embedding = HashEmbeddings(dimension=256, latency=args.embed_latency)
+
+    labelled = [(q, rewritten is not None) for conversation in CONVERSATIONS
+                for i, (q, rewritten) in enumerate(conversation) if i > 0]
+    correct = sum(needs_reformulation(q, ["history"]) == label for q, label in labelled)
+    print(f"라우터 판단 정확도: {correct}/{len(labelled)} (첫 턴 제외)")
+
+    rewrite_means = {}
+    for use_router in (False, True):
+        llm = StubChatModel(responder=respond, latency=args.llm_latency)
+        chain = rag_chain(vectorstore, use_router=use_router, llm=llm,
+                          reranker_model=StubCrossEncoder(latency_per_pair=args.rerank_latency))
+        latencies = run(chain)
+        turns = len(latencies)
+        label = "router on " if use_router else "router off"
+        print(f"{label}: mean={sum(latencies) / turns * 1000:7.1f}ms  p50={percentile(latencies, 50) * 1000:7.1f}ms  "
+              f"p95={percentile(latencies, 95) * 1000:7.1f}ms  LLM calls={llm.calls} ({llm.calls - turns} rewrites / {turns} turns)")
+        print("  per turn (ms): " + " ".join(f"{latency * 1000:.0f}" for latency in latencies))
+        rewrite = [latency for latency, is_rewrite in zip(latencies, REWRITE_TURNS) if is_rewrite]
+        direct = [latency for latency, is_rewrite in zip(latencies, REWRITE_TURNS) if not is_rewrite]
+        rewrite_means[use_router] = mean_ms(rewrite)
+        print(f"  rewrite turns mean={mean_ms(rewrite):7.1f}ms (n={len(rewrite)})  "
+              f"other turns mean={mean_ms(direct):7.1f}ms (n={len(direct)})")
+
+    slower = rewrite_means[True] - rewrite_means[False]
+    print(f"재구성 턴 평균 (router on - off): {slower:+.1f}ms "
+          f"({'OK' if slower <= 0.05 * rewrite_means[False] else '라우터를 켠 쪽이 느림'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""비동기 서버(server.py) 부하 테스트
+
+가짜 LLM/임베더/리랭커로 만든 대화 체인을 넣은 서버를 프로세스 안에서 띄우고,
+동시 요청 수를 늘려 가며 처리량(req/s)과 지연 시간 꼬리(p50/p95/p99), 거절(429/503) 건수를 측정한다.
+--url을 주면 이미 실행 중인 서버에 부하를 건다.
+질문은 카드 데이터에서 만든 서로 다른 질문을 요청마다 하나씩 쓰고, 답변 캐시는 기본으로 끈다
+(같은 질문을 반복하면 캐시 적중률을 재게 됨). --answer-cache로 켜면 단계별 캐시 적중률을 함께 출력한다.
+
+    python -m benchmarks.bench_server --concurrency 1 4 16 64 --requests 64 --llm-latency 0.3
+"""
+import time
+import asyncio
+import argparse
+
+import aiohttp
+from aiohttp import web
+
+import chatbot_logic
+from chatbot_logic import initialize_conversation
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from server import create_app
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+from benchmarks.common import percentile, build_benefit_questions
+
+
+def build_conversation(args, documents):
+    docs = assign_chunk_ids(split_documents(documents))
+    embeddings = HashEmbeddings(dimension=256, latency=args.embed_latency)
+    vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in docs], embeddings,
+                                              metadatas=[doc.metadata for doc in docs],
+                                              ids=[doc.metadata["chunk_id"] for doc in docs])
+    llm = StubChatModel(latency=args.llm_latency, token_latency=args.token_latency)
+    return initialize_conversation(vectorstore, llm=llm, reranker_model=StubCrossEncoder(),
+                                   use_answer_cache=args.answer_cache)
+
+
+async def run_level(url, concurrency, questions, offset):
+    """동시 작업자 concurrency개가 questions를 한 건씩 /chat 요청으로 나눠 보낸다 (작업자마다 별도 세션)"""
+    latencies, statuses = [], {}
+    counter = iter(questions)
+
+    async def worker(client, index):
+        session_id = f"bench-{offset}-{index}"
+        for question in counter:
+            payload = {"session_id": session_id, "input": question}
+            start = time.perf_counter()
+            async with client.post(f"{url}/chat", json=payload) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                if response.status == 200:
+                    latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        await asyncio.gather(*(worker(client, i) for i in range(concurrency)))
+    return latencies, statuses, time.perf_counter() - start
+
+
+def cache_counts():
+    """프로세스 안에서 띄운 서버의 답변 캐시 (적중 수, 조회 수)"""
+    cache = chatbot_logic.answer_cache
+    if cache is None:
+        return 0, 0
+    return cache.hits, cache.hits + cache.misses
+
+
+async def main_async(args):
+    runner = None
+    url = args.url
+    documents = list(load_documents(args.data_path))
+    questions = [question for question, _, _ in
+                 build_benefit_questions(documents, args.requests * len(args.concurrency), args.seed)]
+    if url is None:
+        app = create_app(build_conversation(args, documents), max_concurrency=args.max_concurrency,
+                         max_queue=args.max_queue)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", args.port)
+        await site.start()
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        print(f"distinct questions={len(set(questions))} answer cache={'on' if args.answer_cache else 'off'}")
+        print(f"{'concurrency':>12}{'ok':>6}{'rejected':>10}{'req/s':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+              f"{'cache hit':>11}")
+        for level, concurrency in enumerate(args.concurrency):
+            before = cache_counts()
+            level_questions = questions[level * args.requests:(level + 1) * args.requests]
+            latencies, statuses, elapsed = await run_level(url, concurrency, level_questions, level)
+            rejected = sum(count for status, count in statuses.items() if status in (429, 503))
+            hits, lookups = (after - start for after, start in zip(cache_counts(), before))
+            hit_rate = f"{hits / lookups:>11.2f}" if lookups else f"{'-':>11}"
+            print(f"{concurrency:>12}{len(latencies):>6}{rejected:>10}{len(latencies) / elapsed:>9.1f}"
+                  f"{percentile(latencies, 50) * 1000:>10.0f}{percentile(latencies, 95) * 1000:>10.0f}"
+                  f"{percentile(latencies, 99) * 1000:>10.0f}{hit_rate}")
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="실행 중인 서버 주소 (없으면 가짜 백엔드로 서버를 직접 띄움)")
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="동시성 단계별 요청 수")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--answer-cache", action="store_true", help="답변 캐시를 켜고 적중률을 함께 출력")
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.005)
+    parser.add_argument("--embed-latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
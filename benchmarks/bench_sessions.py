@@ -0,0 +1,91 @@
+"""동시 세션 수에 따른 메모리 사용량 부하 테스트
+
+세션마다 대화 체인(리랭커 모델 포함)을 새로 만드는 기존 방식과 ResourceRegistry로 공유하는 방식을 비교한다.
+가짜 리랭커가 memory_mb 만큼 메모리를 점유해 모델 가중치를 흉내낸다.
+
+    python -m benchmarks.bench_sessions --sessions 1 4 8 16 --model-mb 32
+"""
+import argparse
+import resource
+import threading
+
+from chatbot_logic import initialize_conversation
+from pinecone_store import load_documents, split_documents
+from ingest_pipeline import assign_chunk_ids
+from local_vectorstore import LocalVectorStore
+from resources import ResourceRegistry
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+
+
+def rss_mb():
+    # 현재 프로세스의 RSS (Linux는 /proc, 그 외는 최대 RSS)
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_sessions(count, get_conversation, offset):
+    def session(i):
+        conversation = get_conversation(i)
+        config = {"configurable": {"session_id": f"load-{offset + i}"}}
+        for question in ["스타벅스 할인 카드 추천해줘", "공항 라운지 무료 카드 알려줘"]:
+            conversation.invoke({"input": question}, config)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--model-mb", type=int, default=32, help="가짜 리랭커 모델 크기(MB)")
+    args = parser.parse_args()
+
+    docs = assign_chunk_ids(split_documents(load_documents(args.data_path)))
+    embeddings = HashEmbeddings(dimension=256)
+    vectorstore = LocalVectorStore.from_texts([doc.page_content for doc in docs], embeddings,
+                                              metadatas=[doc.metadata for doc in docs],
+                                              ids=[doc.metadata["chunk_id"] for doc in docs])
+
+    def build_conversation():
+        return initialize_conversation(vectorstore, llm=StubChatModel(),
+                                       reranker_model=StubCrossEncoder(memory_mb=args.model_mb))
+
+    # 공유 방식을 먼저 측정 (RSS는 줄어들지 않으므로)
+    baseline = rss_mb()
+    registry = ResourceRegistry()
+    registry.register("conversation", build_conversation)
+    total = 0
+    print(f"{'mode':<12}{'sessions':>10}{'RSS(MB)':>10}{'delta':>10}")
+    for count in args.sessions:
+        run_sessions(count, lambda i: registry.get("conversation"), total)
+        total += count
+        print(f"{'shared':<12}{total:>10}{rss_mb():>10.0f}{rss_mb() - baseline:>10.0f}")
+
+    # 기존 방식: 세션마다 체인을 새로 만들고 세션 상태처럼 계속 보관
+    baseline = rss_mb()
+    per_session = []
+
+    def new_conversation(i):
+        conversation = build_conversation()
+        per_session.append(conversation)
+        return conversation
+
+    total = 0
+    for count in args.sessions:
+        run_sessions(count, new_conversation, 10000 + total)
+        total += count
+        print(f"{'per-session':<12}{total:>10}{rss_mb():>10.0f}{rss_mb() - baseline:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
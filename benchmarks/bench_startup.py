@@ -0,0 +1,134 @@
+"""시작 시간 벤치마크: chatbot_logic import 시간과 첫 답변까지의 시간(time-to-first-answer)
+
+매 측정마다 새 파이썬 프로세스를 띄워 다음을 잰다.
+  - import: `import chatbot_logic`에 걸린 시간 (UI가 그려지기 전에 반드시 기다려야 하는 시간)
+  - ui ready: import + warm_up() 반환까지 (background는 바로 반환, blocking은 모든 구성요소 로드 후 반환)
+  - first token / first answer: 프로세스 시작부터 첫 질문의 첫 토큰 / 답변 완료까지
+벡터 스토어/LLM/리랭커는 가짜 구현을 쓰고 --load-delay로 모델 로딩 시간을 흉내낸다.
+설치되어 있으면 실제 백엔드 라이브러리(langchain_openai, pinecone 등)도 로딩 단계에서 import해 그 비용을 포함한다.
+마지막에 `python -X importtime`으로 import 시간이 큰 모듈을 출력한다.
+
+    python -m benchmarks.bench_startup --runs 5 --load-delay 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+from benchmarks.common import percentile
+
+# 로딩 단계에서 import하는 실제 백엔드 라이브러리 (설치되지 않은 것은 건너뜀)
+BACKEND_MODULES = ["langchain_openai", "pinecone", "langchain_pinecone", "sentence_transformers"]
+
+
+def child(args):
+    """새 프로세스 안에서 실행되는 측정 (결과를 JSON 한 줄로 출력)"""
+    start = time.perf_counter()
+    import chatbot_logic
+    from resources import registry
+    imported = time.perf_counter()
+
+    def load_backends():
+        time.sleep(args.load_delay)
+        for name in BACKEND_MODULES:
+            try:
+                __import__(name)
+            except ImportError:
+                pass
+
+    def create_vectorstore():
+        from pinecone_store import load_documents, split_documents
+        from ingest_pipeline import assign_chunk_ids
+        from local_vectorstore import LocalVectorStore
+        from stubs import HashEmbeddings
+
+        load_backends()
+        docs = assign_chunk_ids(split_documents(load_documents(args.data_path)))
+        return LocalVectorStore.from_texts([doc.page_content for doc in docs], HashEmbeddings(dimension=256),
+                                           metadatas=[doc.metadata for doc in docs],
+                                           ids=[doc.metadata["chunk_id"] for doc in docs])
+
+    def create_llm():
+        from stubs import StubChatModel
+        return StubChatModel()
+
+    def create_reranker():
+        from stubs import StubCrossEncoder
+        return StubCrossEncoder()
+
+    registry.register("vectorstore", create_vectorstore)
+    registry.register("llm", create_llm)
+    registry.register("reranker_model", create_reranker)
+    chatbot_logic.warm_up(background=args.mode == "background")
+    ui_ready = time.perf_counter()
+
+    first_token = None
+    config = {"configurable": {"session_id": "startup-bench"}}
+    for event, _ in chatbot_logic.stream_conversation(chatbot_logic.get_conversation(),
+                                                      {"input": "스타벅스 할인 카드 추천해줘"}, config):
+        if event == "token" and first_token is None:
+            first_token = time.perf_counter()
+    done = time.perf_counter()
+    first_token = first_token or done
+
+    print(json.dumps({"import": imported - start, "ui ready": ui_ready - start,
+                      "first token": first_token - start, "first answer": done - start}))
+
+
+def run_child(args, mode, env):
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--child", "--mode", mode,
+               "--data-path", args.data_path, "--load-delay", str(args.load_delay)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    # 마지막 줄이 측정 결과 (그 앞은 chatbot_logic의 로그 출력)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def import_profile(env, top):
+    """python -X importtime 결과에서 누적 import 시간이 큰 모듈 top개"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import chatbot_logic"],
+                            env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data-path", default="combined_card_info.json")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--load-delay", type=float, default=2.0, help="모델/인덱스 로딩을 흉내내는 지연(초)")
+    parser.add_argument("--top", type=int, default=10, help="출력할 import 시간 상위 모듈 수")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["background", "blocking"], default="background")
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 대화 기록/임베딩 캐시가 저장소 디렉터리에 남지 않도록 임시 경로 사용
+        env = {**os.environ, "SESSION_DB_PATH": os.path.join(tmp_dir, "sessions.sqlite3"),
+               "EMBEDDING_CACHE_DIR": os.path.join(tmp_dir, "embedding_cache")}
+        print(f"{'mode':<12}{'metric':<14}{'p50':>10}{'p95':>10}")
+        for mode in ("blocking", "background"):
+            results = [run_child(args, mode, env) for _ in range(args.runs)]
+            for metric in results[0]:
+                values = [result[metric] for result in results]
+                print(f"{mode:<12}{metric:<14}{percentile(values, 50) * 1000:>8.0f}ms"
+                      f"{percentile(values, 95) * 1000:>8.0f}ms")
+
+        print(f"\nimport chatbot_logic: 누적 import 시간 상위 {args.top}개 모듈")
+        for cumulative, name in import_profile(env, args.top):
+            print(f"{cumulative / 1000:>10.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import math
+import random
+
+from card_chunker import split_sections
+
+
+def percentile(values, q):
+    """values의 q 백분위수 (선형 보간)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def format_latency(label, latencies):
+    return (f"{label:<30} p50={percentile(latencies, 50) * 1000:8.1f}ms  "
+            f"p95={percentile(latencies, 95) * 1000:8.1f}ms  n={len(latencies)}")
+
+
+def build_benefit_questions(documents, count, seed):
+    """load_documents()의 혜택 문서로 정답이 붙은 질문을 만든다 -> [(질문, 카드명, 혜택명)]
+
+    절반은 카드명+혜택명, 절반은 카드명 없이 혜택 요약 문구로 묻는다. 같은 seed면 항상 같은 질문 목록을 만든다.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for doc in rng.sample(documents, min(count, len(documents))):
+        card_name, benefit = doc.metadata["card_name"], doc.metadata["benefit"]
+        headline, _ = split_sections(doc.page_content.partition("\n")[2].split("\n")[0])
+        if len(questions) % 2 == 0 or not headline:
+            questions.append((f"{card_name} {benefit} 혜택 알려줘", card_name, benefit))
+        else:
+            questions.append((f"{headline[:40]} 되는 카드", card_name, benefit))
+    return questions
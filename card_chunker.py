@@ -0,0 +1,175 @@
+import os
+import re
+import json
+import hashlib
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# 청킹 방식: "structured" (혜택 문서의 섹션 단위 + 카드 요약은 부모 레코드에 한 번만 저장) 또는 "recursive" (기존 방식)
+CHUNKING_STRATEGY = os.getenv("CHUNKING_STRATEGY", "structured")
+# 섹션 청크의 최대 글자 수 (짧은 섹션은 이 길이까지 이어 붙이고, 긴 섹션은 나눔)
+SECTION_CHUNK_CHARS = int(os.getenv("SECTION_CHUNK_CHARS", "500"))
+# 카드별 부모 레코드(카드 요약) 저장 경로
+PARENT_STORE_PATH = os.getenv("PARENT_STORE_PATH", "parent_store.json")
+
+# 혜택 설명 안의 섹션 제목 ("서비스안내 - ...", "마일리지 적립 제외 대상 - ..." 형태)
+SECTION_PATTERN = re.compile(
+    r"(?:(?<=\s)|^)"
+    r"((?:(?:마일리지|포인트|서비스 공통|서비스|통합 월|통합|월|청구 할인\]|할인|적립) )*"
+    r"(?:서비스\s?안내|서비스 내용|적립\s?기준|할인\s?기준|적용\s?기준|제공\s?기준|이용\s?조건|실적 조건|"
+    r"이용\s?방법|이용 전 확인사항|유의\s?사항|대상점|대상 가맹점|제외 대상|합산 제외 기준|할인\s?한도|"
+    r"적립\s?한도|제공 기간|추가 혜택))"
+    r"\s+[-·]\s"
+)
+
+
+def split_sections(text):
+    """혜택 설명을 (요약 문구, [(섹션 제목, 본문), ...])으로 나눈다"""
+    matches = list(SECTION_PATTERN.finditer(text))
+    if not matches:
+        return text.strip(), []
+    headline = text[:matches[0].start()].strip()
+    sections = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[match.end():end].strip()
+        if body:
+            sections.append((match.group(1).strip(), "- " + body))
+    return headline, sections
+
+
+def parent_id(company, card_name):
+    return hashlib.sha256(f"{company}|{card_name}".encode("utf-8")).hexdigest()[:32]
+
+
+def _pack_sections(sections, max_chars):
+    """짧은 섹션은 max_chars까지 이어 붙이고, 그보다 긴 섹션은 문장 경계에서 나눈다 -> [(첫 섹션 제목, 텍스트)]"""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=max_chars, chunk_overlap=0,
+                                              separators=[" - ", " · ", ". ", " ", ""], keep_separator=True)
+    pieces = []
+    for header, body in sections:
+        text = f"[{header}] {body}"
+        if len(text) <= max_chars:
+            pieces.append((header, text))
+        else:
+            pieces.extend((header, f"[{header}] {part.strip()}") for part in splitter.split_text(body))
+
+    packed = []
+    for header, text in pieces:
+        if packed and len(packed[-1][1]) + 1 + len(text) <= max_chars:
+            packed[-1] = (packed[-1][0], f"{packed[-1][1]}\n{text}")
+        else:
+            packed.append((header, text))
+    return packed
+
+
+def structured_split(documents, max_chars=SECTION_CHUNK_CHARS):
+    """load_documents()의 혜택 문서를 섹션 단위 자식 청크와 카드별 부모 레코드로 나눈다
+
+    load_documents()는 첫 줄에 카드 요약, 다음 줄부터 혜택 설명을 담으므로 요약은 부모 레코드에 한 번만 저장하고,
+    자식 청크 본문에는 "카드명 - 혜택명" 제목만 붙여 검색에 필요한 문맥을 남긴다.
+    요약은 임베딩하지 않는 메타데이터(card_summary)에도 넣어, parent_store.json 없이도 카드 요약을 복원할 수 있게 한다.
+    반환값: (자식 Document 목록, {parent_id: {"company", "card_name", "summary"}})
+    """
+    children, parents = [], {}
+    for doc in documents:
+        summary, _, details = doc.page_content.partition("\n")
+        company, card_name, benefit = doc.metadata["company"], doc.metadata["card_name"], doc.metadata["benefit"]
+        pid = parent_id(company, card_name)
+        parents.setdefault(pid, {"company": company, "card_name": card_name, "summary": summary})
+
+        title = f"{card_name} - {benefit}"
+        for position, text in enumerate(details.split("\n")):
+            headline, sections = split_sections(text)
+            if headline:
+                sections = [("혜택 요약", headline)] + sections
+            for header, body in _pack_sections(sections, max(max_chars - len(title) - 1, 100)):
+                children.append(Document(page_content=f"{title}\n{body}",
+                                         metadata={**doc.metadata, "parent_id": pid, "card_summary": summary,
+                                                   "section": header, "position": position}))
+    return children, parents
+
+
+class ParentStore:
+    """카드별 부모 레코드(카드 요약)를 한 번만 저장하는 JSON 저장소"""
+
+    def __init__(self, parents=None):
+        self.parents = parents or {}
+
+    def save(self, path=PARENT_STORE_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.parents, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=PARENT_STORE_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def get(self, pid):
+        return self.parents.get(pid)
+
+    def __len__(self):
+        return len(self.parents)
+
+
+_warned_missing_parents = False
+
+
+def parent_summary(doc, parent_store=None):
+    """청크가 속한 카드의 요약 (부모 레코드 -> 청크 메타데이터의 card_summary 순, 부모가 없는 청크는 None)"""
+    global _warned_missing_parents
+    pid = doc.metadata.get("parent_id")
+    if not pid:
+        return None
+    parent = parent_store.get(pid) if parent_store is not None else None
+    if parent is not None:
+        return parent["summary"]
+    summary = doc.metadata.get("card_summary")
+    if summary is None and not _warned_missing_parents:
+        # card_summary가 없는 인덱스는 parent_store.json이 있어야 연회비/전월실적이 담긴 카드 요약을 붙일 수 있음
+        _warned_missing_parents = True
+        print(f"경고: 카드 요약을 찾을 수 없습니다 ({PARENT_STORE_PATH}가 없거나 오래됨). "
+              "카드 요약 없이 답변하므로 pinecone_store.py로 다시 적재하세요.")
+    return summary
+
+
+def expand_to_parents(documents, parent_store):
+    """검색된 자식 청크를 카드(부모) 단위 문서로 묶는다
+
+    카드 요약을 한 번 앞에 두고 그 카드에서 검색된 청크를 이어 붙이며, 문서 순서는 각 카드의 첫 청크 순위를 따른다.
+    카드 요약은 parent_store(없으면 청크의 card_summary 메타데이터)에서 가져오며,
+    parent_id가 없거나 요약을 찾을 수 없는 청크는 그대로 둔다.
+    """
+    groups, order, summaries = {}, [], {}
+    for doc in documents:
+        pid = doc.metadata.get("parent_id")
+        if pid not in summaries:
+            summaries[pid] = parent_summary(doc, parent_store)
+        if summaries[pid] is None:
+            order.append(doc)
+            continue
+        if pid not in groups:
+            groups[pid] = []
+            order.append(pid)
+        groups[pid].append(doc)
+
+    expanded = []
+    for item in order:
+        if isinstance(item, Document):
+            expanded.append(item)
+            continue
+        chunks = groups[item]
+        metadata = {key: value for key, value in chunks[0].metadata.items()
+                    if key not in ("section", "position", "card_summary")}
+        metadata["benefit"] = ", ".join(dict.fromkeys(chunk.metadata.get("benefit", "") for chunk in chunks))
+        scores = [chunk.metadata["relevance_score"] for chunk in chunks if "relevance_score" in chunk.metadata]
+        if scores:
+            metadata["relevance_score"] = max(scores)
+        metadata["chunk_ids"] = [chunk_id for chunk in chunks
+                                 for chunk_id in chunk.metadata.get("chunk_ids") or [chunk.metadata.get("chunk_id")]]
+        body = "\n".join(chunk.page_content for chunk in chunks)
+        expanded.append(Document(page_content=f"{summaries[item]}\n{body}", metadata=metadata))
+    return expanded
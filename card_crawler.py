@@ -1,140 +1,232 @@
+import os
 import json  # JSON 파일 저장을 위해 필요
+import queue
+import argparse
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
-import time
-from selenium.webdriver import ActionChains
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import NoSuchElementException, ElementClickInterceptedException, ElementNotInteractableException
-
-# 브라우저 꺼짐 방지 옵션
-chrome_options = Options()
-chrome_options.add_experimental_option("detach", True)
-# 크롬 드라이버 생성
-driver = webdriver.Chrome(options=chrome_options)
-
-time.sleep(4)
-
-action = ActionChains(driver)
-wait = WebDriverWait(driver, 10)
-
-def handle_ad():
-    """광고가 나타나는 경우 이를 감지하고 대기하거나 닫는 함수"""
-    try:
-        ad_close_button = driver.find_element(By.XPATH, '/html/body/div[4]/div[2]/div/button/div[2]/i')  # 광고 닫기 버튼의 XPATH
-        # 광고 닫기 버튼이 상호작용 가능한 상태인지 확인
-        wait.until(EC.element_to_be_clickable((By.XPATH, '/html/body/div[4]/div[2]/div/button/div[2]/i')))
-        ad_close_button.click()
-        print("광고를 닫았습니다.")
-    except NoSuchElementException:
-        print("광고가 나타나지 않았습니다.")
-    except ElementNotInteractableException:
-        print("광고 닫기 버튼이 현재 상호작용할 수 없는 상태입니다. 잠시 기다립니다.")
-        time.sleep(2)
-        ad_close_button.click()
-    except ElementClickInterceptedException:
-        print("광고를 닫는 데 실패했습니다. 계속 진행합니다.")
-        time.sleep(3)  # 광고가 사라질 때까지 잠시 대기
-
-# 전체 카드사 URL에 대해 반복문을 수행
-for card_number in range(11):  # 1번부터 10번까지 카드사에 대해 반복(조정할 것)
-    url = f'https://card-gorilla.com/team/detail/{card_number}'
-    driver.get(url)
-    time.sleep(4)
-
-    # 카드사 이름을 가져오기 위한 올바른 XPATH를 설정합니다.
-    card_company_name = driver.find_element(By.XPATH, f'//*[@id="q-app"]/section/div[1]/div/div[1]/div/b').text
-    company_info = {
-        "card_company": card_company_name,
-        "cards": []
-    }
-
-    for card in range(1, 11):  # 상위 카드 10개만 크롤링
-        cur_card_info = driver.find_element(By.XPATH, f'//*[@id="q-app"]/section/div[1]/section/div[2]/article[1]/div/div/ul/li[{card}]/div/div[2]').text.split('\n')
-        
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from corpus_builder import CARD_INFO_DIR, build_corpus
+from crawl_progress import CRAWL_PROGRESS_PATH, CrawlProgress
+
+# 크롤러 설정 (환경 변수로 조정 가능). 로컬 HTML fixture로 테스트할 때는 CRAWLER_BASE_URL을 바꾼다.
+BASE_URL = os.getenv("CRAWLER_BASE_URL", "https://card-gorilla.com")
+CRAWLER_WORKERS = int(os.getenv("CRAWLER_WORKERS", "4"))
+CRAWLER_TIMEOUT = float(os.getenv("CRAWLER_TIMEOUT", "10"))
+CARDS_PER_COMPANY = int(os.getenv("CARDS_PER_COMPANY", "10"))
+
+# 페이지 구조 (카드사 상세 페이지 / 카드 상세 페이지)
+COMPANY_NAME_XPATH = '//*[@id="q-app"]/section/div[1]/div/div[1]/div/b'
+CARD_LIST_XPATH = '//*[@id="q-app"]/section/div[1]/section/div[2]/article[1]/div/div/ul/li'
+BENEFIT_XPATH = '//*[@id="q-app"]/section/div[1]/section/div/article[2]/div[1]/dl'
+
+# 카드 목록을 한 번의 스크립트 실행으로 읽는다: [{"lines": [...], "href": "..."}]
+CARD_LIST_SCRIPT = """
+const items = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const cards = [];
+for (let i = 0; i < Math.min(items.snapshotLength, arguments[1]); i++) {
+    const info = items.snapshotItem(i).querySelector(':scope > div > div:nth-of-type(2)');
+    if (!info) continue;
+    const link = info.querySelector(':scope > div:nth-of-type(2) a');
+    cards.push({lines: info.innerText.split('\\n'), href: link ? link.getAttribute('href') : null});
+}
+return cards;
+"""
+
+# 주요 혜택 배너(dl)를 클릭하지 않고 한 번에 읽는다. 접힌 내용도 textContent에는 들어 있다: [[제목, 본문], ...]
+BENEFIT_SCRIPT = """
+const items = document.evaluate(arguments[0], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const clean = (text) => text.replace(/\\s+/g, ' ').trim();
+const benefits = [];
+for (let i = 0; i < items.snapshotLength; i++) {
+    const dl = items.snapshotItem(i);
+    const dt = dl.querySelector('dt');
+    const dd = dl.querySelector('dd');
+    // 배너 첫 줄이 혜택명, 나머지 줄과 펼침 영역(dd)이 혜택 설명
+    const lines = (dt || dl).innerText.split('\\n').map(clean).filter(Boolean);
+    const body = lines.slice(1).concat(dt && dd ? [clean(dd.textContent)] : []).filter(Boolean);
+    benefits.push([lines[0] || '', body.join(' ')]);
+}
+return benefits;
+"""
+
+
+def create_driver(headless=True):
+    """크롤링용 크롬 드라이버 (기본 headless, 이미지 로딩 생략)"""
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--window-size=1280,2000")
+    chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    # DOM이 준비되면 바로 진행 (필요한 요소는 명시적 대기로 확인)
+    chrome_options.page_load_strategy = "eager"
+    return webdriver.Chrome(options=chrome_options)
+
+
+class DriverPool:
+    """워커 스레드들이 나눠 쓰는 브라우저 풀 (필요할 때 size개까지 생성)"""
+
+    def __init__(self, size=CRAWLER_WORKERS, factory=create_driver):
+        self.size = size
+        self.factory = factory
+        self._idle = queue.Queue()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        with self._lock:
+            if self._idle.empty() and len(self._drivers) < self.size:
+                driver = self.factory()
+                self._drivers.append(driver)
+                self._idle.put(driver)
+        driver = self._idle.get()
+        broken = False
+        try:
+            yield driver
+        except WebDriverException as e:
+            # 대기 시간 초과가 아닌 드라이버 오류는 브라우저가 비정상 상태일 수 있으므로 풀에서 제거
+            broken = not isinstance(e, TimeoutException)
+            raise
+        finally:
+            if broken:
+                with self._lock:
+                    self._drivers.remove(driver)
+                try:
+                    driver.quit()
+                except WebDriverException:
+                    pass
+            else:
+                self._idle.put(driver)
+
+    def close(self):
+        with self._lock:
+            for driver in self._drivers:
+                try:
+                    driver.quit()
+                except WebDriverException:
+                    pass
+            self._drivers = []
+
+
+def wait_for(driver, xpath, timeout=CRAWLER_TIMEOUT):
+    """고정 sleep 대신 요소가 나타날 때까지 대기"""
+    return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.XPATH, xpath)))
+
+
+def parse_card_list(driver, limit):
+    cards = []
+    for item in driver.execute_script(CARD_LIST_SCRIPT, CARD_LIST_XPATH, limit):
+        lines = [line.strip() for line in item["lines"] if line.strip()]
         # '자세히 보기'가 리스트에 있으면 제거
-        if '자세히 보기' in cur_card_info:
-            cur_card_info.remove('자세히 보기')
-
-        card_details = {
-            "name": cur_card_info[0],
-            "summary": " ".join(cur_card_info[1:]),
-            "benefits": {}
-        }
-        
-        print(f'카드사 번호: {card_number}, iteration: {card}번째 카드 ', cur_card_info[0])
-        
-        detail_buttons = driver.find_element(By.XPATH, f'//*[@id="q-app"]/section/div[1]/section/div[2]/article[1]/div/div/ul/li[{card}]/div/div[2]/div[2]/a')
-        
-        # 광고 처리 함수 호출
-        handle_ad()
-        
-        detail_buttons.click()
-        
-        for i in range(1, 11):  # 주요 혜택 배너수가 10개 이하
+        lines = [line for line in lines if line != '자세히 보기']
+        if lines:
+            cards.append({"name": lines[0], "summary": " ".join(lines[1:]), "href": item["href"]})
+    return cards
+
+
+def parse_benefits(driver):
+    benefits = {}
+    for title, body in driver.execute_script(BENEFIT_SCRIPT, BENEFIT_XPATH):
+        if title == '유의사항':
+            break
+        if title:
+            benefits.setdefault(title, []).append(body)
+    return benefits
+
+
+def crawl_company(pool, company_id, progress, base_url=BASE_URL, cards_per_company=CARDS_PER_COMPANY,
+                  output_dir=CARD_INFO_DIR):
+    """카드사 한 곳의 상위 카드를 크롤링해 카드마다 진행 기록에 저장하고, 카드사 JSON 파일을 만든다"""
+    with pool.acquire() as driver:
+        company_url = urljoin(base_url + "/", f"team/detail/{company_id}")
+        driver.get(company_url)
+        card_company_name = wait_for(driver, COMPANY_NAME_XPATH).text.strip()
+        wait_for(driver, CARD_LIST_XPATH)
+        cards = parse_card_list(driver, cards_per_company)
+
+        company_cards = []
+        for rank, card in enumerate(cards, start=1):
+            if not card["href"]:
+                print(f"{card_company_name} {rank}번째 카드의 상세 링크가 없습니다: {card['name']}")
+                continue
+            done = progress.get(company_id, card["href"])
+            if done is not None:
+                company_cards.append(done)
+                continue
+            # 상세 버튼을 클릭하고 뒤로 가는 대신 상세 페이지로 바로 이동
+            driver.get(urljoin(company_url, card["href"]))
             try:
-                cur_benefit_r = f'//*[@id="q-app"]/section/div[1]/section/div/article[2]/div[1]/dl[{i}]'  # 주요혜택 배너 XPATH
-        
-                wait.until(EC.presence_of_all_elements_located((By.XPATH, cur_benefit_r))) 
-                cur_benefit = driver.find_element(By.XPATH, cur_benefit_r)
-                time.sleep(1)  
-                
-                action.move_to_element(cur_benefit)
-                action.click()
-                action.perform()
-                
-                cur_li = cur_benefit.text.split('\n')
-                
-                print(f'{card}번째 카드에서 선택된 주요혜택 배너명 : ', cur_li[0])
-                if cur_li[0] == '유의사항':
-                    break
-
-                if cur_li[0] not in card_details["benefits"]:
-                    card_details["benefits"][cur_li[0]] = []
-                card_details["benefits"][cur_li[0]].append(' '.join(cur_li[1:]))
-                
-            except Exception as e:
-                print(f'제외된 iteration: {i}, 오류: {str(e)}')
-                break
-        
-        driver.back()
-        
-        print({cur_card_info[0]: card_details})
-        company_info["cards"].append(card_details)
-
-    # 카드사 별로 JSON 파일 저장
-    output_file = f'CardInfo/{card_company_name}_info.json'
+                wait_for(driver, BENEFIT_XPATH)
+                benefits = parse_benefits(driver)
+            except TimeoutException:
+                print(f"{card_company_name} {rank}번째 카드의 혜택을 찾지 못했습니다: {card['name']}")
+                benefits = {}
+            card_details = {"name": card["name"], "summary": card["summary"], "benefits": benefits}
+            progress.add(company_id, card_company_name, card["href"], card_details)
+            company_cards.append(card_details)
+            print(f'카드사 번호: {company_id}, {rank}번째 카드 ', card["name"])
+
+    # 카드사 별로 JSON 파일 저장 (이번 목록에 있는 카드만, 현재 순위 순서로)
+    company_info = {"card_company": card_company_name, "cards": company_cards}
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f'{card_company_name}_info.json')
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(company_info, f, ensure_ascii=False, indent=4)
-
     print(f"{card_company_name} 정보를 {output_file} 파일로 저장했습니다.")
+    return output_file
 
 
-
-
-import os
-import json
-
-# JSON 파일들이 있는 디렉토리 경로
-directory_path = 'CardInfo'
-
-# 결과를 저장할 딕셔너리 초기화
-combined_data = {}
-
-# 디렉토리 내 모든 파일 순회
-for filename in os.listdir(directory_path):
-    if filename.endswith('_info.json'):
-        file_path = os.path.join(directory_path, filename)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            # 카드사 이름을 키로 설정하고 데이터를 병합
-            card_company_name = filename.split('_info.json')[0]
-            combined_data[card_company_name] = data
-
-# 결과를 하나의 JSON 파일로 저장
-output_file = 'combined_card_info.json'
-with open(output_file, 'w', encoding='utf-8') as f:
-    json.dump(combined_data, f, ensure_ascii=False, indent=4)
-
-print(f"JSON 파일이 성공적으로 병합되었습니다: {output_file}")
+def crawl(company_ids, workers=CRAWLER_WORKERS, base_url=BASE_URL, cards_per_company=CARDS_PER_COMPANY,
+          headless=True, progress_path=CRAWL_PROGRESS_PATH, output_dir=CARD_INFO_DIR):
+    """여러 카드사를 브라우저 풀로 병렬 크롤링. 중단 후 다시 실행하면 진행 기록에 없는 카드만 크롤링한다."""
+    progress = CrawlProgress(progress_path)
+    pool = DriverPool(workers, factory=lambda: create_driver(headless=headless))
+    output_files, failed = [], []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(crawl_company, pool, company_id, progress, base_url, cards_per_company,
+                                       output_dir): company_id
+                       for company_id in company_ids}
+            for future in as_completed(futures):
+                try:
+                    output_files.append(future.result())
+                except Exception as e:
+                    # 실패한 카드사는 다음 실행에서 이어서 크롤링
+                    failed.append(futures[future])
+                    print(f"카드사 번호 {futures[future]} 크롤링 실패: {e}")
+    finally:
+        pool.close()
+    # 모두 성공했으면 진행 기록을 지워 다음(예약) 실행이 예전 카드를 재사용하지 않고 새로 크롤링하게 함
+    if not failed:
+        progress.clear()
+    return output_files
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", type=int, nargs="+", default=list(range(11)), help="크롤링할 카드사 번호")
+    parser.add_argument("--cards", type=int, default=CARDS_PER_COMPANY, help="카드사별 상위 카드 수")
+    parser.add_argument("--workers", type=int, default=CRAWLER_WORKERS, help="동시에 실행할 브라우저 수")
+    parser.add_argument("--base-url", default=BASE_URL, help="크롤링 대상 주소 (로컬 fixture 서버 등)")
+    parser.add_argument("--show-browser", action="store_true", help="headless 대신 브라우저 창을 띄움")
+    parser.add_argument("--restart", action="store_true", help="진행 기록을 지우고 처음부터 크롤링")
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(CRAWL_PROGRESS_PATH):
+        os.remove(CRAWL_PROGRESS_PATH)
+    crawl(args.companies, workers=args.workers, base_url=args.base_url, cards_per_company=args.cards,
+          headless=not args.show_browser)
+    # 크롤링 결과를 검증해 한 줄 단위 코퍼스로 합침 (브라우저 없이 corpus_builder.py만 따로 실행해도 됨)
+    print(build_corpus(CARD_INFO_DIR))
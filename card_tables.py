@@ -0,0 +1,246 @@
+import os
+import re
+import json
+
+from langchain_core.documents import Document
+
+from corpus_builder import iter_cards
+from entity_index import EntityIndex, normalize
+
+# 카드 요약에서 뽑은 정형 정보(연회비, 전월실적, 혜택 목록) 표의 설정 (환경 변수로 조정 가능)
+CARD_TABLE_PATH = os.getenv("CARD_TABLE_PATH", "card_table.json")
+CARD_TABLE_ENABLED = os.getenv("CARD_TABLE_ENABLED", "true").lower() == "true"
+# 목록 답변에 보여줄 최대 카드 수
+CARD_TABLE_MAX_ROWS = int(os.getenv("CARD_TABLE_MAX_ROWS", "10"))
+
+# 카드 요약 끝부분: "국내전용 47,000원 / 해외겸용 49,000원 전월실적 30만원 이상" (금액 뒤 '원'이 빠진 경우도 있음)
+FEE_PATTERN = re.compile(r"(국내전용|해외겸용)\s*(없음|[\d,]+)\s*원?")
+MONTHLY_SPEND_PATTERN = re.compile(r"전월실적\s*(없음|([\d,.]+)\s*만\s*원\s*이상)")
+
+# 질문 의도 판별 패턴
+FEE_QUESTION = re.compile(r"연회비")
+SPEND_QUESTION = re.compile(r"전월\s*실적|실적\s*조건|실적")
+COMPARE_QUESTION = re.compile(r"비교|차이|vs|VS|어느\s*(게|것|쪽)|뭐가\s*더")
+LIST_QUESTION = re.compile(r"(어떤|어느|무슨)\s*카드|카드\s*(목록|리스트|종류|전부|모두|뭐|뭐가)|"
+                           r"(있는|되는|주는|제공하는|가능한)\s*카드|카드\s*(있어|있나|있을까|있니)")
+# 카드를 지정한 질문이라도 혜택 설명을 함께 물으면 RAG로 답함
+BENEFIT_DETAIL_QUESTION = re.compile(r"혜택|할인|적립|서비스|캐시백|추천")
+CHEAP_QUESTION = re.compile(r"연회비\s*(가|이)?\s*(가장|제일|젤)?\s*(싼|싸|저렴|낮은|적은|최저)")
+EXPENSIVE_QUESTION = re.compile(r"연회비\s*(가|이)?\s*(가장|제일|젤)?\s*(비싼|비싸|높은|최고)")
+NO_SPEND_QUESTION = re.compile(r"(전월\s*)?실적\s*(조건\s*)?(이\s*)?(없는|없이|무관|상관\s*없)|무실적")
+MAX_FEE_QUESTION = re.compile(r"연회비\s*([\d,.]+)\s*(만)?\s*원?\s*(이하|미만|아래|안쪽|까지|이내)")
+MAX_SPEND_QUESTION = re.compile(r"실적\s*([\d,.]+)\s*(만)?\s*원?\s*(이하|미만|아래|이내)")
+# 카드를 지정하지 않은 검색/정렬 질문은 이 길이 이하일 때만 표로 답함 (긴 질문은 혜택 설명을 옮겨 적은 경우가 많음)
+MAX_SEARCH_QUESTION_CHARS = 32
+# 조건 없이 혜택으로 카드를 찾는 질문에 금액/비율이 있으면 혜택 내용 자체를 묻는 것으로 보고 RAG로 답함
+SPECIFIC_AMOUNT = re.compile(r"\d|%|퍼센트")
+
+
+def name_parts(card_name):
+    """카드명을 이루는 단어 ("현대카드ZERO Edition3(할인형)" -> ["현대카드zero", "edition3", "할인형"])"""
+    return [part for part in map(normalize, re.split(r"[\s()\[\]]+", card_name)) if len(part) >= 2]
+
+
+def _won(amount, unit_man=False):
+    value = float(amount.replace(",", ""))
+    return int(value * 10000) if unit_man else int(value)
+
+
+def extract_card_record(company, card):
+    """카드 요약에서 연회비(국내전용/해외겸용)와 전월실적을 뽑아 표의 한 행을 만든다 (못 찾은 값은 None, '없음'은 0)"""
+    summary = card.get("summary", "")
+    fees = {}
+    for kind, amount in FEE_PATTERN.findall(summary):
+        fees[kind] = 0 if amount == "없음" else _won(amount)
+    spend = None
+    matches = MONTHLY_SPEND_PATTERN.findall(summary)
+    if matches:
+        text, amount = matches[-1]
+        spend = 0 if text == "없음" else _won(amount, unit_man=True)
+    return {
+        "company": company,
+        "card_name": card["name"],
+        "domestic_fee": fees.get("국내전용"),
+        "overseas_fee": fees.get("해외겸용"),
+        "monthly_spend": spend,
+        "benefits": list(card.get("benefits", {})),
+    }
+
+
+def annual_fee(record):
+    """정렬/필터에 쓰는 연회비 (국내전용/해외겸용 중 낮은 값, 정보가 없으면 None)"""
+    fees = [fee for fee in (record["domestic_fee"], record["overseas_fee"]) if fee is not None]
+    return min(fees) if fees else None
+
+
+def format_fee(record):
+    parts = [f"{kind} {'없음' if fee == 0 else f'{fee:,}원'}"
+             for kind, fee in (("국내전용", record["domestic_fee"]), ("해외겸용", record["overseas_fee"])) if fee is not None]
+    return " / ".join(parts) if parts else "정보 없음"
+
+
+def format_spend(record):
+    spend = record["monthly_spend"]
+    if spend is None:
+        return "정보 없음"
+    return "없음" if spend == 0 else f"{spend // 10000}만원 이상"
+
+
+class CardTable:
+    """카드별 정형 정보를 메모리에 올려 두고 카드명/카드사/혜택으로 바로 찾는 표
+
+    적재 시점에 카드 요약에서 연회비와 전월실적을 뽑아 JSON으로 저장하고, 챗봇은 이를 불러와
+    연회비/전월실적 조회, 조건 검색·정렬, 카드 비교 질문을 LLM 없이 답한다 (answer()가 None이면 RAG 체인으로 넘김).
+    """
+
+    def __init__(self, records, max_rows=CARD_TABLE_MAX_ROWS):
+        self.records = records
+        self.max_rows = max_rows
+        self.by_card = {record["card_name"]: record for record in records}
+        self.by_company = {}
+        self.by_benefit = {}
+        for record in records:
+            self.by_company.setdefault(record["company"], []).append(record)
+            for benefit in record["benefits"]:
+                self.by_benefit.setdefault(benefit, []).append(record)
+        # 질문 속 카드명/카드사/혜택 분류는 검색 필터와 같은 별칭 사전으로 찾음
+        self.entities = EntityIndex.build([{"company": record["company"], "card_name": record["card_name"],
+                                            "benefit": benefit}
+                                           for record in records for benefit in record["benefits"] or [None]])
+
+    @classmethod
+    def from_json(cls, data_path):
+        """카드 코퍼스(card_corpus.jsonl) 또는 통합 카드 JSON(combined_card_info.json)에서 표를 만든다"""
+        return cls([extract_card_record(company, card) for company, card in iter_cards(data_path)])
+
+    def save(self, path=CARD_TABLE_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.records, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=CARD_TABLE_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.records)
+
+    def select(self, companies=None, benefits=None, max_fee=None, max_spend=None):
+        """조건에 맞는 카드 목록 (benefits는 혜택명 중 하나라도 있으면 포함)"""
+        if benefits:
+            seen, rows = set(), []
+            for benefit in benefits:
+                for record in self.by_benefit.get(benefit, []):
+                    if record["card_name"] not in seen:
+                        seen.add(record["card_name"])
+                        rows.append(record)
+        elif companies:
+            rows = [record for company in companies for record in self.by_company.get(company, [])]
+        else:
+            rows = list(self.records)
+        if companies:
+            rows = [record for record in rows if record["company"] in companies]
+        if max_fee is not None:
+            rows = [record for record in rows if annual_fee(record) is not None and annual_fee(record) <= max_fee]
+        if max_spend is not None:
+            rows = [record for record in rows
+                    if record["monthly_spend"] is not None and record["monthly_spend"] <= max_spend]
+        return rows
+
+    def resolve_cards(self, question):
+        """질문이 가리키는 카드명 목록
+
+        한 별칭이 여러 카드에 해당하면("현대카드 ZERO" -> 할인형/포인트형) 카드명의 단어가 질문에 가장 많이 들어 있는
+        카드만 남기고("현대카드 ZERO 할인형" -> 할인형), 구분할 수 없을 때만 모두 남긴다.
+        """
+        query = normalize(question)
+        names = []
+        for group in self.entities.card_groups(question):
+            if len(group) > 1:
+                scores = {name: sum(len(part) for part in name_parts(name) if part in query) for name in group}
+                best = max(scores.values())
+                group = [name for name in group if scores[name] == best]
+            names.extend(name for name in group if name not in names)
+        return names
+
+    def answer(self, question):
+        """표로 답할 수 있는 질문이면 {"answer": 답변, "context": [Document]}, 아니면 None"""
+        if not self.records:
+            return None
+        matched = self.entities.match(question)
+        cards = [self.by_card[name] for name in self.resolve_cards(question) if name in self.by_card]
+        asks_fee, asks_spend = bool(FEE_QUESTION.search(question)), bool(SPEND_QUESTION.search(question))
+
+        if cards:
+            if len(cards) >= 2 and (COMPARE_QUESTION.search(question) or asks_fee or asks_spend):
+                return self._respond(cards, f"{', '.join(record['card_name'] for record in cards)} 비교입니다.")
+            # 카드명에 든 단어("zgm 할인카드"의 '할인', "ZERO 할인형"의 '할인')는 혜택 질문으로 보지 않음
+            rest = normalize(question)
+            for record in cards:
+                for part in sorted(name_parts(record["card_name"]), key=len, reverse=True):
+                    rest = rest.replace(part, " ")
+            if (asks_fee or asks_spend) and not BENEFIT_DETAIL_QUESTION.search(rest):
+                return self._respond(cards, None, fee=asks_fee, spend=asks_spend)
+            return None
+
+        # 카드를 지정하지 않은 질문: 혜택/카드사/연회비/실적 조건으로 찾거나 정렬하는 경우만 표로 답함
+        if len(question) > MAX_SEARCH_QUESTION_CHARS:
+            return None
+        max_fee = max_spend = None
+        fee_match = MAX_FEE_QUESTION.search(question)
+        if fee_match:
+            max_fee = _won(fee_match.group(1), unit_man=bool(fee_match.group(2)))
+        spend_match = MAX_SPEND_QUESTION.search(question)
+        if spend_match:
+            max_spend = _won(spend_match.group(1), unit_man=bool(spend_match.group(2)))
+        if NO_SPEND_QUESTION.search(question):
+            max_spend = 0
+        cheap, expensive = CHEAP_QUESTION.search(question), EXPENSIVE_QUESTION.search(question)
+        constrained = max_fee is not None or max_spend is not None or cheap or expensive
+        if not (constrained or LIST_QUESTION.search(question)):
+            return None
+        if not constrained and (SPECIFIC_AMOUNT.search(question) or not (matched["benefits"] or matched["companies"])):
+            return None
+
+        rows = self.select(matched["companies"], matched["benefits"], max_fee, max_spend)
+        if cheap or expensive:
+            rows = sorted((record for record in rows if annual_fee(record) is not None),
+                          key=annual_fee, reverse=bool(expensive))
+        conditions = []
+        if matched["companies"]:
+            conditions.append("/".join(matched["companies"]))
+        if matched["categories"]:
+            conditions.append(f"{'/'.join(matched['categories'])} 혜택")
+        if max_fee is not None:
+            conditions.append(f"연회비 {max_fee:,}원 이하")
+        if max_spend is not None:
+            conditions.append("전월실적 없음" if max_spend == 0 else f"전월실적 {max_spend // 10000}만원 이하")
+        order = " (연회비 낮은 순)" if cheap else " (연회비 높은 순)" if expensive else ""
+        if not rows:
+            return {"answer": f"{', '.join(conditions) or '조건'}에 맞는 카드를 찾지 못했습니다.", "context": []}
+        title = (f"{', '.join(conditions)} 조건에 맞는 카드는 {len(rows)}개입니다{order}." if conditions
+                 else f"전체 카드는 {len(rows)}개입니다{order}.")
+        return self._respond(rows, title)
+
+    def _respond(self, rows, title, fee=True, spend=True):
+        shown = rows[:self.max_rows]
+        lines = [title] if title else []
+        for record in shown:
+            details = []
+            if fee:
+                details.append(f"연회비 {format_fee(record)}")
+            if spend:
+                details.append(f"전월실적 {format_spend(record)}")
+            if title:
+                details.append(f"주요 혜택: {', '.join(record['benefits'][:6]) or '정보 없음'}")
+            lines.append(f"- **{record['card_name']}** ({record['company']}) · " + " · ".join(details))
+        if len(rows) > len(shown):
+            lines.append(f"외 {len(rows) - len(shown)}개 카드가 더 있습니다.")
+        context = [Document(page_content=f"{record['card_name']} 연회비 {format_fee(record)}, 전월실적 "
+                                         f"{format_spend(record)}, 혜택: {', '.join(record['benefits'])}",
+                            metadata={"company": record["company"], "card_name": record["card_name"],
+                                      "benefit": ", ".join(record["benefits"]), "source": "card_table"})
+                   for record in shown]
+        return {"answer": "\n".join(lines), "context": context}
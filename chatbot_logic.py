@@ -1,22 +1,30 @@
 import os
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
-from langchain.chains import create_history_aware_retriever
-from langchain.retrievers import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import CrossEncoderReranker
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
 from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain_community.chat_message_histories import ChatMessageHistory
-from langchain_core.runnables import RunnableLambda
-from langchain_community.document_transformers import LongContextReorder
-from langchain_pinecone import PineconeVectorStore
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough, RunnableParallel, RunnableGenerator
+from langchain_core.runnables.utils import AddableDict
 from operator import itemgetter
+import time
+from embedding_cache import CachedEmbeddings
+from local_vectorstore import LocalVectorStore, LOCAL_INDEX_PATH
+from lexical_index import LexicalIndex, HybridRetriever, LEXICAL_INDEX_PATH
+from entity_index import EntityIndex, EntityFilteredRetriever, ENTITY_INDEX_PATH, ENTITY_FILTER_ENABLED
+from reranker import FastCrossEncoderReranker
+from card_chunker import ParentStore, expand_to_parents, PARENT_STORE_PATH
+from context_assembly import assemble_context, CONTEXT_ASSEMBLY_ENABLED, CONTEXT_TOKEN_BUDGET
+from corpus_builder import CORPUS_PATH
+from card_tables import CardTable, CARD_TABLE_ENABLED, CARD_TABLE_PATH
+from answer_cache import SemanticAnswerCache, entity_key, ANSWER_CACHE_ENABLED
+from ingest_pipeline import load_index_version
+from query_router import needs_reformulation, same_question, QUERY_ROUTER_ENABLED
+from resources import registry
+from session_store import SessionHistoryManager, SUMMARY_MAX_CHARS
+from tracing import tracer, traced_lambda, TRACING_ENABLED
+
+# OpenAI/Pinecone 클라이언트, LangChain 체인, 리랭커 모델처럼 무거운 백엔드는 모듈을 불러올 때가 아니라
+# 아래 팩토리 함수가 처음 호출될 때 import한다 (UI가 먼저 뜨고 구성요소는 registry.warm_up()으로 백그라운드 로드)
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
@@ -25,25 +33,64 @@ load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# 벡터 저장소 백엔드 선택: "pinecone" (기본) 또는 "local" (네트워크 없이 로컬 인덱스로 검색)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+
+# 하이브리드(BM25 + dense) 검색 시 리랭커에 넘길 후보 수
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+
+# 인덱스 매니페스트 경로 (pinecone_store.py와 동일한 규칙, 답변 캐시 무효화에 사용)
+if VECTOR_BACKEND == "local":
+    INDEX_MANIFEST_PATH = os.path.join(LOCAL_INDEX_PATH, "manifest.json")
+else:
+    INDEX_MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", "index_manifest.json")
+
+# 매니페스트가 바뀐 경우에만 다시 읽기 위한 캐시
+_index_version = {"mtime": None, "version": None}
+
+def current_index_version():
+    try:
+        mtime = os.path.getmtime(INDEX_MANIFEST_PATH)
+    except OSError:
+        return None
+    if mtime != _index_version["mtime"]:
+        _index_version["mtime"] = mtime
+        _index_version["version"] = load_index_version(INDEX_MANIFEST_PATH)
+    return _index_version["version"]
+
 # Pinecone 설정
 def initialize_pinecone():
+    from langchain_openai import OpenAIEmbeddings
+
+    # OpenAI 임베딩 로드 (반복되는 질문은 디스크 캐시에서 바로 반환)
+    embeddings = CachedEmbeddings(
+        OpenAIEmbeddings(
+            model="text-embedding-ada-002",  # OpenAI의 임베딩 모델
+            api_key=OPENAI_API_KEY
+        ),
+        model_name="text-embedding-ada-002"
+    )
+
+    # 로컬 백엔드: 메모리 맵으로 불러온 인덱스에서 직접 검색
+    if VECTOR_BACKEND == "local":
+        return LocalVectorStore.load(embeddings, path=LOCAL_INDEX_PATH, text_key="page_content")
+
+    from pinecone import Pinecone
+    from langchain_pinecone import PineconeVectorStore
+
     pc = Pinecone(api_key=PINECONE_API_KEY)
     index_name = "card-chatbot"
 
     # 인덱스 가져오기
     index = pc.Index(index_name)
 
-    # OpenAI 임베딩 로드
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-ada-002",  # OpenAI의 임베딩 모델
-        api_key=OPENAI_API_KEY
-    )
-
     # Pinecone VectorStore 생성
     vectorstore = PineconeVectorStore(index=index, embedding=embeddings, text_key="page_content")
     return vectorstore
 
 def load_model():
+    from langchain_openai import ChatOpenAI
+
     model = ChatOpenAI(
         temperature=0.1,
         model_name="gpt-4o-mini", 
@@ -53,15 +100,53 @@ def load_model():
     print("model loaded...")
     return model 
 
-def rag_chain(vectorstore):
-    llm = load_model()
+def load_reranker():
+    # torch/sentence-transformers는 채점기를 만들 때 불러온다
+    from reranker import CrossEncoderScorer
+    return CrossEncoderScorer()
+
+# 체인 출력에서 숨길 내부 단계 값
+INTERNAL_KEYS = ("cached", "table_answer", "started_at", "needs_rewrite", "speculative_candidates")
+
+def rag_chain(vectorstore, answer_cache=None, use_router=QUERY_ROUTER_ENABLED, llm=None, reranker_model=None,
+              context_budget=CONTEXT_TOKEN_BUDGET if CONTEXT_ASSEMBLY_ENABLED else None, parent_store=None,
+              card_table=None):
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from langchain_community.document_transformers.long_context_reorder import LongContextReorder
+
+    # llm/reranker_model을 넘기면 테스트·벤치마크용 가짜 모델로 교체할 수 있음
+    llm = llm or load_model()
 
     # 리트리버 설정
-    reranker_model = HuggingFaceCrossEncoder(model_name="BAAI/bge-reranker-v2-m3")
-    compressor_15 = CrossEncoderReranker(model=reranker_model, top_n=15)
-    vs_retriever30 = vectorstore.as_retriever(search_kwargs={"k": 30})
-    retriever = ContextualCompressionRetriever(base_compressor=compressor_15, base_retriever=vs_retriever30)
-    
+    # 배치/길이 제한 채점 + (질의, 청크) 점수 캐시를 사용하는 리랭커
+    reranker_model = reranker_model or load_reranker()
+    compressor_15 = FastCrossEncoderReranker(scorer=reranker_model, top_n=15)
+    lexical_index = LexicalIndex.load(LEXICAL_INDEX_PATH) if os.path.exists(LEXICAL_INDEX_PATH) else None
+    if ENTITY_FILTER_ENABLED and os.path.exists(ENTITY_INDEX_PATH):
+        # 질문의 카드사/카드명/혜택으로 필터링해 더 적은 후보를 검색 (결과가 적으면 필터 없이 재검색)
+        base_retriever = EntityFilteredRetriever(
+            vectorstore=vectorstore,
+            entity_index=EntityIndex.load(ENTITY_INDEX_PATH),
+            lexical_index=lexical_index,
+            k=HYBRID_CANDIDATES if lexical_index else 30
+        )
+    elif lexical_index:
+        # BM25 결과와 dense 결과를 RRF로 합쳐 더 적은 후보만 리랭커에 전달
+        base_retriever = HybridRetriever(
+            dense_retriever=vectorstore.as_retriever(search_kwargs={"k": HYBRID_CANDIDATES}),
+            lexical_index=lexical_index,
+            k=HYBRID_CANDIDATES,
+            lexical_k=HYBRID_CANDIDATES
+        )
+    else:
+        base_retriever = vectorstore.as_retriever(search_kwargs={"k": 30})
+
+    # 리랭크: 검색 결과가 없으면 채점하지 않음
+    def rerank(inputs):
+        if not inputs["docs"]:
+            return []
+        return compressor_15.compress_documents(inputs["docs"], inputs["question"])
+
     # 리트리버 파이프라인
     system_prompt = (
         "Given a chat history and the latest user question "
@@ -77,21 +162,50 @@ def rag_chain(vectorstore):
         ("human", "{input}"),
     ])
 
-    history_aware_retriever_modified = create_history_aware_retriever(
-        llm,
-        retriever,
-        contextualize_prompt
-    )
+    # 대화 기록이 있으면 독립 질문으로 재구성, 없으면 원래 질문을 그대로 사용
+    contextualize_chain = (contextualize_prompt | llm | StrOutputParser()).with_config(run_name="rewrite")
+
+    # 라우터가 켜져 있으면 지시어가 없고 대상이 드러난 질문은 재구성 LLM 호출을 생략
+    def route_question(inputs):
+        if not use_router:
+            return bool(inputs.get("chat_history"))
+        return needs_reformulation(inputs["input"], inputs.get("chat_history"))
+
+    def contextualize_question(inputs):
+        if not inputs["needs_rewrite"]:
+            return inputs["input"]
+        return contextualize_chain
 
     # 문서 재정렬 추가
     reordering = LongContextReorder()
 
-    my_retriever = (
-        {"input": itemgetter("input"),
-         "chat_history": itemgetter("chat_history")
-        } | history_aware_retriever_modified | 
-        RunnableLambda(lambda docs: reordering.transform_documents(docs))
+    # 섹션 단위 청크로 검색한 뒤, 최종 context는 카드 요약(부모 레코드)을 한 번만 붙인 카드 단위 문서로 묶음
+    if parent_store is None and os.path.exists(PARENT_STORE_PATH):
+        parent_store = ParentStore.load(PARENT_STORE_PATH)
+
+    def expand_parents(docs):
+        return expand_to_parents(docs, parent_store)
+
+    # 리랭크된 청크의 중복을 없애고 토큰 예산 안에서 점수순으로 고른 뒤 같은 카드/혜택 청크를 이어 붙임
+    # (context_budget=None이면 리랭크 결과를 그대로 사용)
+    def assemble(docs):
+        if context_budget is None:
+            return docs
+        return assemble_context(docs, context_budget, parent_store)
+
+    # 각 단계에 이름을 붙여 tracing.py에서 단계별 시간을 기록
+    # 후보 검색(ANN/BM25)과 그 뒤의 리랭크~재정렬을 나눠, 미리 검색한 후보에도 리랭크 이후 단계만 실행할 수 있게 함
+    candidate_retriever = RunnableParallel(
+        question=itemgetter("standalone_question"),
+        docs=itemgetter("standalone_question") | base_retriever.with_config(run_name="retrieve")
+    )
+    post_retrieval = (
+        traced_lambda(rerank, "rerank") |
+        traced_lambda(assemble, "assemble_context") |
+        traced_lambda(expand_parents, "expand_parents") |
+        traced_lambda(reordering.transform_documents, "reorder")
     )
+    my_retriever = candidate_retriever | post_retrieval
     
     # LLM 체인 설정
     qa_system_prompt = """You are an assistant helping with question-answering tasks. 
@@ -108,22 +222,158 @@ def rag_chain(vectorstore):
         ("human", "{input}"),
     ])
 
-    question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
+    question_answer_chain = create_stuff_documents_chain(llm, qa_prompt).with_config(run_name="generate")
+
+    # 연회비/전월실적 조회, 조건 검색·정렬, 카드 비교처럼 정형 정보로 답할 수 있는 질문은
+    # 적재 시 만든 카드 표(card_tables.py)에서 바로 답하고 캐시/검색/리랭크/생성을 모두 건너뜀
+    if card_table is None and CARD_TABLE_ENABLED and os.path.exists(CARD_TABLE_PATH):
+        card_table = CardTable.load(CARD_TABLE_PATH)
+
+    def lookup_table(inputs):
+        if card_table is None:
+            return None
+        return card_table.answer(inputs["standalone_question"])
+
+    # 대화 중인데 재구성하지 않은 질문은 앞 턴의 대상을 전제할 수 있으므로 캐시를 조회/저장하지 않음
+    def cacheable(inputs):
+        return not (inputs.get("chat_history") and not inputs.get("needs_rewrite"))
+
+    # 답변 캐시 조회: 비슷한 독립 질문의 답변이 있으면 검색/리랭크/생성을 건너뜀
+    def lookup_answer(inputs):
+        if answer_cache is None or inputs["table_answer"] is not None or not cacheable(inputs):
+            return None
+        return answer_cache.lookup(inputs["standalone_question"])
+
+    # 재구성이 필요한 경우 재구성과 동시에 원래 질문으로 후보만 미리 검색해 두고,
+    # 재구성 결과가 원래 질문과 같을 때만 그 후보를 리랭크 (리랭크는 어느 쪽이든 한 번만 실행)
+    def speculative_retrieve(inputs):
+        if not (use_router and inputs["needs_rewrite"]):
+            return None
+        return candidate_retriever.invoke({"standalone_question": inputs["input"]})
+
+    def retrieve_context(inputs):
+        if inputs["table_answer"] is not None:
+            return inputs["table_answer"]["context"]
+        if inputs["cached"] is not None:
+            return inputs["cached"]["context"]
+        if inputs["speculative_candidates"] is not None and same_question(inputs["standalone_question"], inputs["input"]):
+            return post_retrieval.invoke(inputs["speculative_candidates"])
+        # 검색 단계는 스트리밍할 필요가 없으므로 한 번에 실행 (단계별 시간이 순서대로 기록됨)
+        return my_retriever.invoke(inputs)
+
+    def generate_answer(inputs):
+        if inputs["table_answer"] is not None:
+            return inputs["table_answer"]["answer"]
+        if inputs["cached"] is not None:
+            return inputs["cached"]["answer"]
+        return question_answer_chain
+
+    # 스트리밍 청크를 그대로 흘려보내면서, 새로 생성된 답변을 캐시에 저장
+    def merge_chunk(final, chunk):
+        for key, value in chunk.items():
+            if key == "answer" and key in final:
+                final[key] += value
+            else:
+                final[key] = value
+        output = AddableDict({k: v for k, v in chunk.items() if k not in INTERNAL_KEYS})
+        if "cached" in chunk:
+            output["cache_hit"] = chunk["cached"] is not None
+        if "table_answer" in chunk:
+            output["table_hit"] = chunk["table_answer"] is not None
+        return output
+
+    def store_answer(final):
+        # 표에서 만든 답변은 표를 다시 조회하는 편이 빠르므로 캐시에 넣지 않음
+        if (answer_cache is not None and final.get("cached") is None and final.get("table_answer") is None
+                and final.get("answer") and cacheable(final)):
+            answer_cache.store(final["standalone_question"], final["answer"], final["context"],
+                               latency=time.perf_counter() - final["started_at"])
+
+    def remember_answer(chunks):
+        final = {}
+        for chunk in chunks:
+            output = merge_chunk(final, chunk)
+            if output:
+                yield output
+        store_answer(final)
+
+    async def aremember_answer(chunks):
+        final = {}
+        async for chunk in chunks:
+            output = merge_chunk(final, chunk)
+            if output:
+                yield output
+        store_answer(final)
 
     # RAG 체인 생성
-    return create_retrieval_chain(my_retriever, question_answer_chain)
+    chain = (
+        RunnablePassthrough.assign(needs_rewrite=RunnableLambda(route_question),
+                                   started_at=RunnableLambda(lambda _: time.perf_counter()))
+        .assign(standalone_question=RunnableLambda(contextualize_question),
+                speculative_candidates=traced_lambda(speculative_retrieve, "speculative_retrieve"))
+        .assign(table_answer=traced_lambda(lookup_table, "table_lookup"))
+        .assign(cached=traced_lambda(lookup_answer, "cache_lookup"))
+        .assign(context=RunnableLambda(retrieve_context))
+        .assign(answer=RunnableLambda(generate_answer))
+        | RunnableGenerator(remember_answer, aremember_answer)
+    )
+    # 턴마다 단계별 시간/토큰 수/후보 수/캐시 적중을 기록 (tracing.tracer로 집계)
+    if TRACING_ENABLED:
+        chain = chain.with_config(callbacks=[tracer.handler()])
+    return chain
+
+# 오래된 대화를 요약하는 함수 (토큰 예산을 넘은 턴을 요약으로 압축)
+def summarize_history(previous_summary, messages):
+    summary_prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         "Summarize the conversation between a user and a credit card assistant in Korean. "
+         "Merge it with the previous summary and keep card names, companies and benefits the user asked about. "
+         f"Keep it under {SUMMARY_MAX_CHARS} characters.\n\nPrevious summary: {{summary}}"),
+        MessagesPlaceholder("messages"),
+    ])
+    chain = summary_prompt | registry.get("summary_llm") | StrOutputParser()
+    return chain.invoke({"summary": previous_summary or "(없음)", "messages": messages})
 
-# 세션 기록을 저장할 딕셔너리
-store = {}
+# 요약 모델은 기본으로 답변 LLM을 함께 씀 ("llm"을 교체하거나 initialize_conversation에 llm을 넘기면 요약도 그 모델 사용)
+registry.register("summary_llm", lambda: registry.get("llm"))
+
+# 세션 기록 저장소: 메모리(LRU/TTL) + SQLite 영구 저장, 토큰 예산을 넘으면 오래된 턴을 요약
+# (import만으로 data 디렉터리와 SQLite 파일을 만들지 않도록 첫 대화에서 생성)
+registry.register("session_histories", lambda: SessionHistoryManager(summarizer=summarize_history))
 
 # 세션 ID를 기반으로 세션 기록을 가져오는 함수
 def get_session_history(session_ids):
-    if session_ids not in store:  # 세션 ID가 store에 없는 경우
-        store[session_ids] = ChatMessageHistory()
-    return store[session_ids]  # 해당 세션 ID에 대한 세션 기록 반환
+    return registry.get("session_histories").get(session_ids)
+
+# 의미 기반 답변 캐시 (initialize_conversation에서 생성, answer_cache.metrics()로 적중률/절약 시간 확인)
+answer_cache = None
+
+# 답변 캐시 키에 쓸 카드사/카드명 사전 (적재 시 만든 entity_index.json, 없으면 카드 데이터에서 바로 생성)
+def load_entity_index():
+    if os.path.exists(ENTITY_INDEX_PATH):
+        return EntityIndex.load(ENTITY_INDEX_PATH)
+    data_path = CORPUS_PATH if os.path.exists(CORPUS_PATH) else "combined_card_info.json"
+    if os.path.exists(data_path):
+        return EntityIndex.from_json(data_path)
+    return None
+
+def initialize_conversation(vectorstore, llm=None, reranker_model=None, use_answer_cache=ANSWER_CACHE_ENABLED):
+    global answer_cache
+    if llm is not None:
+        registry.provide("summary_llm", llm)
+    if use_answer_cache and answer_cache is None:
+        # 카드사/카드명이 다른 질문끼리는 임베딩이 비슷해도 답변을 공유하지 않음
+        entity_index = load_entity_index()
+        if entity_index is None:
+            # 질문 텍스트만으로 키를 만들면 다른 카드의 답변을 돌려줄 수 있으므로 캐시를 끔
+            print("엔티티 사전(entity_index.json)과 카드 데이터가 없어 답변 캐시를 사용하지 않습니다.")
+            use_answer_cache = False
+        else:
+            answer_cache = SemanticAnswerCache(vectorstore.embeddings, version_fn=current_index_version,
+                                               entity_fn=entity_key(entity_index))
 
-def initialize_conversation(vectorstore):
-    base_rag_chain = rag_chain(vectorstore)
+    base_rag_chain = rag_chain(vectorstore, answer_cache if use_answer_cache else None, llm=llm,
+                               reranker_model=reranker_model)
     
     return RunnableWithMessageHistory(
         base_rag_chain,
@@ -132,3 +382,63 @@ def initialize_conversation(vectorstore):
         history_messages_key="chat_history",  # 기록 메시지의 키
         output_messages_key="answer",
     )
+
+# 프로세스 전역 리소스 등록: 모든 세션이 같은 벡터 스토어/LLM/리랭커를 공유
+# (세션별 상태는 session_id로 구분되는 대화 기록뿐)
+# 각 팩토리는 처음 get()될 때 한 번만 실행되며, 이때 해당 백엔드 라이브러리를 import한다
+registry.register("vectorstore", initialize_pinecone)
+registry.register("llm", load_model)
+registry.register("reranker_model", load_reranker)
+registry.register("conversation", lambda: initialize_conversation(
+    registry.get("vectorstore"), llm=registry.get("llm"), reranker_model=registry.get("reranker_model")))
+
+# 백그라운드 로드 순서: 대화 체인에 필요한 구성요소를 먼저 만들고 체인을 조립
+WARM_UP_ORDER = ["vectorstore", "llm", "reranker_model", "conversation"]
+
+def get_conversation():
+    return registry.get("conversation")
+
+def is_ready():
+    """대화 체인이 로드되어 첫 질문에 바로 답할 수 있는지"""
+    return registry.is_loaded("conversation")
+
+def warm_up(background=True):
+    """서버 시작 시 무거운 구성요소를 미리 로드 (background=True면 바로 반환하고 백그라운드 스레드에서 로드)"""
+    return registry.warm_up(WARM_UP_ORDER, background=background)
+
+def stream_conversation(conversation, input_data, config):
+    """대화 체인을 스트리밍으로 실행한다.
+
+    검색된 문서를 ("context", docs)로 먼저 내보내고, 답변은 ("token", text)로 생성되는 대로 내보낸다.
+    마지막에 ("done", {"ttft": 첫 토큰까지 걸린 시간, "total": 전체 시간})을 내보낸다.
+    """
+    start = time.perf_counter()
+    first_token_at = None
+    for chunk in conversation.stream(input_data, config):
+        if "context" in chunk:
+            yield "context", chunk["context"]
+        if chunk.get("answer"):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield "token", chunk["answer"]
+    yield "done", _log_latency(start, first_token_at)
+
+async def astream_conversation(conversation, input_data, config):
+    """stream_conversation의 비동기 버전 (astream 사용)"""
+    start = time.perf_counter()
+    first_token_at = None
+    async for chunk in conversation.astream(input_data, config):
+        if "context" in chunk:
+            yield "context", chunk["context"]
+        if chunk.get("answer"):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            yield "token", chunk["answer"]
+    yield "done", _log_latency(start, first_token_at)
+
+def _log_latency(start, first_token_at):
+    # 첫 토큰까지의 시간(TTFT)과 전체 응답 시간을 따로 기록
+    total = time.perf_counter() - start
+    ttft = (first_token_at - start) if first_token_at is not None else total
+    print(f"TTFT: {ttft:.2f}s, 전체 응답 시간: {total:.2f}s")
+    return {"ttft": ttft, "total": total}
@@ -0,0 +1,142 @@
+import os
+import re
+
+from langchain_core.documents import Document
+
+from session_store import estimate_tokens
+from card_chunker import parent_summary
+
+# 리랭크 결과를 LLM context로 조립하는 설정 (환경 변수로 조정 가능)
+CONTEXT_ASSEMBLY_ENABLED = os.getenv("CONTEXT_ASSEMBLY_ENABLED", "true").lower() == "true"
+# context 문서에 쓸 최대 토큰 수 (카드 요약 포함, estimate_tokens 기준)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+# 글자 shingle Jaccard 유사도가 이 값 이상이면 중복 청크로 보고 점수가 낮은 쪽을 버림
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+CONTEXT_SHINGLE_SIZE = int(os.getenv("CONTEXT_SHINGLE_SIZE", "5"))
+
+# 이 길이보다 짧은 줄은 반복되어도 지우지 않음 (구분용 짧은 제목 등)
+MIN_REPEATED_LINE_CHARS = 20
+# 이어지는 청크 사이의 중복 구간(분할 시 overlap)으로 인정하는 최소 길이
+MIN_OVERLAP_CHARS = 20
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def shingles(text, size=CONTEXT_SHINGLE_SIZE):
+    text = WHITESPACE_PATTERN.sub(" ", text).strip()
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _score(doc):
+    return doc.metadata.get("relevance_score", 0.0)
+
+
+def _card_key(doc):
+    return doc.metadata.get("parent_id") or (doc.metadata.get("company"), doc.metadata.get("card_name"))
+
+
+def _overlap(previous, text, max_chars=400):
+    """previous의 끝과 text의 앞이 겹치는 길이 (RecursiveCharacterTextSplitter의 chunk_overlap 구간)"""
+    for size in range(min(len(previous), len(text), max_chars), MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(text[:size]):
+            return size
+    return 0
+
+
+def deduplicate(documents, threshold=CONTEXT_DEDUP_THRESHOLD):
+    """같은 청크(chunk_id)와 내용이 거의 같은 청크를 제거한다 (입력 순서 = 리랭크 순서에서 앞선 것을 남김)"""
+    kept, kept_shingles, seen_ids = [], [], set()
+    for doc in documents:
+        chunk_id = doc.metadata.get("chunk_id")
+        if chunk_id is not None and chunk_id in seen_ids:
+            continue
+        grams = shingles(doc.page_content)
+        if any(jaccard(grams, other) >= threshold for other in kept_shingles):
+            continue
+        seen_ids.add(chunk_id)
+        kept.append(doc)
+        kept_shingles.append(grams)
+    return kept
+
+
+def select_within_budget(documents, token_budget=CONTEXT_TOKEN_BUDGET, parent_store=None):
+    """리랭크 점수가 높은 순서로 토큰 예산 안에 들어가는 청크를 고른다 -> [(청크, 새로 들어간 줄)]
+
+    같은 카드/혜택 묶음에서 이미 고른 줄(분할마다 반복되는 카드 요약, "카드명 - 혜택명" 제목 등)은 병합 시 한 번만
+    남으므로 비용에서 빼고, 카드가 처음 선택될 때 붙는 카드 요약(parent_store 또는 card_summary 메타데이터)의 토큰도 비용에 더한다.
+    예산보다 큰 청크는 건너뛰지만, 가장 점수가 높은 청크는 예산과 관계없이 항상 포함한다.
+    """
+    selected, used = [], 0
+    seen_lines, seen_cards = {}, set()
+    for doc in sorted(documents, key=_score, reverse=True):
+        card, group = _card_key(doc), (_card_key(doc), doc.metadata.get("benefit"))
+        group_lines = seen_lines.get(group, set())
+        lines = [line for line in doc.page_content.split("\n")
+                 if len(line) < MIN_REPEATED_LINE_CHARS or line not in group_lines]
+        cost = estimate_tokens("\n".join(lines))
+        if card not in seen_cards:
+            summary = parent_summary(doc, parent_store)
+            cost += estimate_tokens(summary) if summary else 0
+        if selected and used + cost > token_budget:
+            continue
+        used += cost
+        seen_cards.add(card)
+        seen_lines.setdefault(group, set()).update(line for line in lines if len(line) >= MIN_REPEATED_LINE_CHARS)
+        selected.append((doc, lines))
+    return selected
+
+
+def merge_adjacent(selected):
+    """같은 카드/혜택의 청크를 원래 순서(position)대로 이어 붙여 하나의 문서로 만든다
+
+    이어지는 청크 사이의 분할 overlap 구간은 한 번만 남기고, 문서 순서는 각 묶음의 최고 점수를 따른다.
+    """
+    groups, order = {}, []
+    for doc, lines in selected:
+        key = (_card_key(doc), doc.metadata.get("benefit"))
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append((doc, lines))
+
+    merged = []
+    for key in order:
+        items = sorted(groups[key], key=lambda item: item[0].metadata.get("position", 0))
+        text = ""
+        for _, lines in items:
+            part = "\n".join(lines)
+            if not text:
+                text = part
+                continue
+            overlap = _overlap(text, part)
+            if overlap:
+                text = text + part[overlap:]
+            elif _overlap(part, text):
+                # position이 없는 기존 방식 청크는 리랭크 순서라 뒤 청크가 먼저 올 수 있음
+                text = part + text[_overlap(part, text):]
+            else:
+                text = f"{text}\n{part}"
+        docs = [doc for doc, _ in items]
+        metadata = {k: v for k, v in docs[0].metadata.items() if k not in ("position", "section")}
+        metadata["relevance_score"] = max(_score(doc) for doc in docs)
+        metadata["chunk_ids"] = [chunk_id for doc in docs
+                                 for chunk_id in doc.metadata.get("chunk_ids") or [doc.metadata.get("chunk_id")]]
+        merged.append(Document(page_content=text, metadata=metadata))
+    return sorted(merged, key=_score, reverse=True)
+
+
+def assemble_context(documents, token_budget=CONTEXT_TOKEN_BUDGET, parent_store=None,
+                     dedup_threshold=CONTEXT_DEDUP_THRESHOLD):
+    """리랭크된 청크를 중복 제거 -> 토큰 예산 안에서 점수순 선택 -> 같은 카드/혜택 청크 병합 순서로 조립한다"""
+    if not documents:
+        return []
+    unique = deduplicate(documents, dedup_threshold)
+    return merge_adjacent(select_within_budget(unique, token_budget, parent_store))
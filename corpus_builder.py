@@ -0,0 +1,166 @@
+import os
+import json
+import argparse
+import hashlib
+
+# 카드사별 크롤링 결과(CardInfo/*_info.json)를 한 줄에 카드 하나씩 담은 코퍼스(JSONL)로 합치는 단계
+CARD_INFO_DIR = os.getenv("CARD_INFO_DIR", "CardInfo")
+CORPUS_PATH = os.getenv("CORPUS_PATH", "card_corpus.jsonl")
+CORPUS_MANIFEST_PATH = os.getenv("CORPUS_MANIFEST_PATH", "card_corpus_manifest.json")
+
+
+class CorpusValidationError(ValueError):
+    """카드사 파일이 코퍼스 스키마에 맞지 않음"""
+
+
+def validate_company(data, source):
+    """카드사 JSON을 검사해 (유효한 카드 목록, 오류 메시지 목록)을 반환한다
+
+    최상위 구조가 잘못되면 CorpusValidationError를 던지고, 일부 카드만 잘못된 경우에는 그 카드만 제외한다.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("cards"), list):
+        raise CorpusValidationError("'cards' 목록이 없습니다.")
+
+    cards, errors = [], []
+    for i, card in enumerate(data["cards"]):
+        problems = []
+        if not isinstance(card, dict):
+            problems.append("카드 항목이 객체가 아닙니다")
+        else:
+            if not isinstance(card.get("name"), str) or not card["name"].strip():
+                problems.append("name이 비어 있습니다")
+            if not isinstance(card.get("summary"), str):
+                problems.append("summary가 문자열이 아닙니다")
+            benefits = card.get("benefits")
+            if not isinstance(benefits, dict):
+                problems.append("benefits가 객체가 아닙니다")
+            elif not all(isinstance(title, str) and isinstance(texts, list) and all(isinstance(t, str) for t in texts)
+                         for title, texts in benefits.items()):
+                problems.append("benefits는 {혜택명: [설명, ...]} 형식이어야 합니다")
+        if problems:
+            errors.append(f"{source} cards[{i}]: {', '.join(problems)}")
+        else:
+            cards.append(card)
+    return cards, errors
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_corpus(path=CORPUS_PATH):
+    """코퍼스 파일을 한 줄(카드 하나)씩 읽는 제너레이터"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_cards(data_path):
+    """(카드사, 카드) 쌍을 순서대로 내보낸다. 한 줄 단위 코퍼스(.jsonl)와 기존 통합 JSON(.json)을 모두 지원한다."""
+    if data_path.endswith(".jsonl"):
+        for record in iter_corpus(data_path):
+            yield record["company"], record
+        return
+    with open(data_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    for company_name, company_data in data.items():
+        for card in company_data["cards"]:
+            yield company_name, card
+
+
+def _load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_if_changed(path, content):
+    """내용이 같으면 파일을 다시 쓰지 않는다 (원자적 교체). 새로 썼으면 True"""
+    data = content.encode("utf-8")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+def build_corpus(card_info_dir=CARD_INFO_DIR, corpus_path=CORPUS_PATH, manifest_path=CORPUS_MANIFEST_PATH):
+    """카드사 파일들을 검증해 코퍼스를 만든다
+
+    매니페스트에 기록된 해시와 같은 카드사 파일은 다시 파싱하지 않고 기존 코퍼스의 레코드를 재사용하며,
+    결과 코퍼스의 내용이 바뀌지 않았으면 파일을 다시 쓰지 않는다. 검증에 실패한 카드사는 이전 레코드를 유지한다.
+    """
+    manifest = _load_manifest(manifest_path)
+    previous = {}
+    if os.path.exists(corpus_path):
+        for record in iter_corpus(corpus_path):
+            previous.setdefault(record["company"], []).append(record)
+
+    stats = {"companies": 0, "cards": 0, "changed": 0, "unchanged": 0, "removed": 0, "invalid": 0, "written": False}
+    new_manifest, records = {}, []
+    filenames = sorted(name for name in os.listdir(card_info_dir) if name.endswith("_info.json"))
+    for filename in filenames:
+        # 카드사 이름은 파일명에서 가져옴 (기존 통합 JSON의 키와 같은 규칙)
+        company = filename.split("_info.json")[0]
+        path = os.path.join(card_info_dir, filename)
+        digest = file_hash(path)
+        entry = manifest.get(filename)
+        if entry and entry["hash"] == digest and company in previous:
+            records.extend(previous[company])
+            new_manifest[filename] = entry
+            stats["unchanged"] += 1
+            continue
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cards, errors = validate_company(json.load(f), filename)
+        except (json.JSONDecodeError, CorpusValidationError) as e:
+            print(f"코퍼스에서 제외: {filename}: {e}")
+            stats["invalid"] += 1
+            if company in previous:
+                # 이전에 검증된 레코드 유지 (매니페스트는 그대로 두어 다음 실행에서 다시 검사)
+                records.extend(previous[company])
+                if entry:
+                    new_manifest[filename] = entry
+            continue
+        for error in errors:
+            print(f"카드 제외: {error}")
+
+        company_records = [{"company": company, "name": card["name"], "summary": card["summary"],
+                            "benefits": card["benefits"]} for card in cards]
+        records.extend(company_records)
+        new_manifest[filename] = {"hash": digest, "company": company, "cards": len(company_records)}
+        stats["changed"] += 1
+
+    stats["removed"] = len(set(manifest) - set(new_manifest) - set(filenames))
+    stats["companies"] = len({record["company"] for record in records})
+    stats["cards"] = len(records)
+    content = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records)
+    stats["written"] = _write_if_changed(corpus_path, content)
+    _write_if_changed(manifest_path, json.dumps(new_manifest, ensure_ascii=False, indent=2))
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input-dir", default=CARD_INFO_DIR)
+    parser.add_argument("--output", default=CORPUS_PATH)
+    parser.add_argument("--manifest", default=CORPUS_MANIFEST_PATH)
+    args = parser.parse_args()
+
+    stats = build_corpus(args.input_dir, args.output, args.manifest)
+    print(stats)
+    if stats["written"]:
+        print(f"코퍼스를 저장했습니다: {args.output}")
+    else:
+        print(f"변경된 내용이 없어 코퍼스를 다시 쓰지 않았습니다: {args.output}")
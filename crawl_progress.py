@@ -0,0 +1,55 @@
+import os
+import json
+import time
+import threading
+
+from corpus_builder import CARD_INFO_DIR
+
+# 카드 단위로 결과를 바로 기록하는 진행 파일 (중단 후 이어서 크롤링할 때 사용, 모든 카드사가 끝나면 삭제)
+CRAWL_PROGRESS_PATH = os.getenv("CRAWL_PROGRESS_PATH", os.path.join(CARD_INFO_DIR, "crawl_progress.jsonl"))
+# 이보다 오래된 진행 기록은 이어받지 않고 다시 크롤링 (초)
+CRAWL_PROGRESS_TTL = float(os.getenv("CRAWL_PROGRESS_TTL", "86400"))
+
+
+class CrawlProgress:
+    """카드 한 장을 크롤링할 때마다 JSONL로 기록하고, 중단 후 재실행하면 이미 받은 카드는 건너뛰게 하는 진행 기록
+
+    카드는 순위가 아니라 상세 페이지 링크(href)로 구분하므로 순위가 바뀌어도 다른 카드를 건너뛰지 않는다.
+    ttl보다 오래된 기록은 읽지 않으며, 크롤링이 모두 성공하면 clear()로 파일을 지워 다음 실행은 처음부터 새로 받는다.
+    """
+
+    def __init__(self, path=CRAWL_PROGRESS_PATH, ttl=CRAWL_PROGRESS_TTL):
+        self.path = path
+        self.records = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            now = time.time()
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 기록 도중 중단된 마지막 줄은 무시
+                        continue
+                    if now - record.get("crawled_at", 0) > ttl:
+                        continue
+                    self.records[(record["company_id"], record["href"])] = record
+
+    def get(self, company_id, href):
+        record = self.records.get((company_id, href))
+        return record["card"] if record else None
+
+    def add(self, company_id, card_company, href, card):
+        record = {"company_id": company_id, "card_company": card_company, "href": href, "card": card,
+                  "crawled_at": time.time()}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.records[(company_id, href)] = record
+
+    def clear(self):
+        with self._lock:
+            self.records = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
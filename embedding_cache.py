@@ -0,0 +1,289 @@
+import os
+import json
+import hashlib
+import weakref
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    import fcntl
+except ImportError:  # Windows: 디렉터리 잠금 없이 사용
+    fcntl = None
+
+# 임베딩 캐시 설정 (환경 변수로 조정 가능)
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "20000"))
+# 질의 임베딩은 새 항목이 이만큼 쌓일 때마다 (그리고 종료 시) 디스크에 기록
+EMBEDDING_CACHE_FLUSH_EVERY = int(os.getenv("EMBEDDING_CACHE_FLUSH_EVERY", "32"))
+
+
+class DiskVectorStore:
+    """float32 벡터를 메모리 맵 파일에 저장하는 크기 제한 LRU 저장소
+
+    vectors.f32 에는 [capacity, dimension] 크기의 float32 행렬이, index.json 에는 키 -> 슬롯 매핑이
+    LRU 순서대로 저장된다. 가득 차면 가장 오래 사용되지 않은 항목의 슬롯을 재사용한다.
+    flush()는 새로 배정된 (키, 슬롯)만 index.log에 덧붙이고, 로그가 항목 수보다 길어지면 index.json으로 합친다.
+
+    캐시 디렉터리는 파일 잠금으로 한 프로세스만 쓴다. 적재 스크립트와 챗봇처럼 다른 프로세스가 이미 쓰고 있으면
+    이 프로세스 전용 임시 디렉터리를 대신 쓴다 (종료 시 삭제).
+    """
+
+    def __init__(self, cache_dir, max_entries=EMBEDDING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.dimension = None
+        self.capacity = 0
+        self.slots = OrderedDict()
+        self.free_slots = []
+        self._matrix = None
+        self._pending = []
+        self._journal_records = 0
+        self._tmp_dir = None
+        self._lock_file = None
+        os.makedirs(cache_dir, exist_ok=True)
+        if not self._acquire(cache_dir):
+            print(f"임베딩 캐시 {cache_dir}를 다른 프로세스가 사용 중이라 임시 캐시 디렉터리를 사용합니다.")
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix="embedding_cache-")
+            cache_dir = self._tmp_dir.name
+        self.cache_dir = cache_dir
+        self.vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.journal_path = os.path.join(cache_dir, "index.log")
+        self._load()
+
+    def _acquire(self, cache_dir):
+        if fcntl is None:
+            return True
+        lock_file = open(os.path.join(cache_dir, "lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _load(self):
+        if not os.path.exists(self.index_path) or not os.path.exists(self.vectors_path):
+            return
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.dimension = data["dimension"]
+        self.capacity = data["capacity"]
+        self.slots = OrderedDict((key, slot) for key, slot in data["entries"])
+        self._replay_journal()
+        used = set(self.slots.values())
+        self.free_slots = [slot for slot in range(self.capacity) if slot not in used]
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(self.capacity, self.dimension))
+        # 설정된 최대 크기가 줄어든 경우 오래된 항목부터 정리
+        while len(self.slots) > self.max_entries:
+            _, slot = self.slots.popitem(last=False)
+            self.free_slots.append(slot)
+
+    def _replay_journal(self):
+        # 마지막 합치기 이후 덧붙인 (키, 슬롯) 배정을 순서대로 반영 (같은 슬롯을 쓰던 이전 키는 제거, 슬롯이 null이면 제거 기록)
+        if not os.path.exists(self.journal_path):
+            return
+        owners = {slot: key for key, slot in self.slots.items()}
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    key, slot = json.loads(line)
+                except ValueError:
+                    break  # 기록 도중 중단된 마지막 줄
+                self._journal_records += 1
+                if slot is None:
+                    old_slot = self.slots.pop(key, None)
+                    if old_slot is not None and owners.get(old_slot) == key:
+                        del owners[old_slot]
+                    continue
+                if slot >= self.capacity:
+                    continue
+                previous = owners.get(slot)
+                if previous is not None and previous != key:
+                    del self.slots[previous]
+                old_slot = self.slots.pop(key, None)
+                if old_slot is not None and owners.get(old_slot) == key:
+                    del owners[old_slot]
+                self.slots[key] = slot
+                owners[slot] = key
+
+    def _grow(self, dimension):
+        # 파일 크기를 두 배씩(최대 max_entries) 늘려 슬롯을 확보
+        if self.dimension is None:
+            self.dimension = dimension
+        elif self.dimension != dimension:
+            raise ValueError(f"임베딩 차원이 캐시와 다릅니다: {dimension} != {self.dimension}")
+        new_capacity = min(self.max_entries, max(1024, self.capacity * 2))
+        if self._matrix is not None:
+            self._matrix.flush()
+            del self._matrix
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dimension * 4)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+",
+                                 shape=(new_capacity, self.dimension))
+        self.free_slots.extend(range(self.capacity, new_capacity))
+        self.capacity = new_capacity
+        # 용량이 바뀌면 index.json을 다시 써야 이후 로그를 읽을 수 있음
+        self._compact()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def get(self, key):
+        slot = self.slots.get(key)
+        if slot is None:
+            return None
+        self.slots.move_to_end(key)
+        return np.array(self._matrix[slot])
+
+    def put(self, key, vector):
+        if key in self.slots:
+            slot = self.slots[key]
+            self.slots.move_to_end(key)
+        else:
+            if not self.free_slots and self.capacity < self.max_entries:
+                self._grow(len(vector))
+            if self.free_slots:
+                slot = self.free_slots.pop()
+            else:
+                # 가장 오래 사용되지 않은 항목 제거. 슬롯의 벡터를 덮어쓰기 전에 제거 기록(슬롯 null)을 먼저 로그에 남겨야
+                # 비정상 종료 후 다시 열었을 때 제거된 키가 새 벡터를 가리키지 않음
+                evicted, slot = self.slots.popitem(last=False)
+                self._pending = [record for record in self._pending if record[0] != evicted]
+                self._write_journal([(evicted, None)])
+            self.slots[key] = slot
+            self._pending.append((key, slot))
+        self._matrix[slot] = np.asarray(vector, dtype=np.float32)
+
+    def flush(self):
+        if self._matrix is None:
+            return
+        # 벡터를 먼저 디스크에 쓴 뒤 슬롯 배정을 기록 (중단되어도 기록된 슬롯에는 항상 벡터가 있음)
+        self._matrix.flush()
+        if self._journal_records + len(self._pending) > max(len(self.slots), 1024):
+            self._compact()
+            return
+        if self._pending:
+            self._write_journal(self._pending)
+            self._pending = []
+
+    def _write_journal(self, records):
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+        self._journal_records += len(records)
+
+    def _compact(self):
+        """전체 매핑(LRU 순서 포함)을 index.json에 쓰고 로그를 비운다"""
+        if self._matrix is not None:
+            self._matrix.flush()
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "capacity": self.capacity,
+                       "entries": list(self.slots.items())}, f)
+        os.replace(tmp_path, self.index_path)
+        open(self.journal_path, "w").close()
+        self._journal_records = 0
+        self._pending = []
+
+    def close(self):
+        """남은 항목을 합쳐 저장하고 디렉터리 잠금을 푼다"""
+        if self._matrix is not None:
+            self._compact()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+        if self._tmp_dir is not None:
+            self._matrix = None
+            self._tmp_dir.cleanup()
+            self._tmp_dir = None
+
+
+class CachedEmbeddings(Embeddings):
+    """(모델명, 텍스트 해시)를 키로 임베딩 결과를 디스크에 캐시하는 Embeddings 래퍼
+
+    적재 스크립트와 챗봇이 같은 캐시 디렉터리를 쓰면, 요약이 겹치는 청크나 반복되는 질문을 다시 임베딩하지 않는다
+    (동시에 실행되면 나중에 시작한 프로세스는 임시 디렉터리를 씀).
+    문서 배치는 배치마다, 질의는 새 항목 flush_every개마다 디스크에 기록하고 종료 시 남은 항목을 기록한다.
+    """
+
+    def __init__(self, underlying, model_name, cache_dir=EMBEDDING_CACHE_DIR, max_entries=EMBEDDING_CACHE_SIZE,
+                 flush_every=EMBEDDING_CACHE_FLUSH_EVERY):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = DiskVectorStore(cache_dir, max_entries=max_entries)
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+        self._unflushed = 0
+        self._lock = threading.Lock()
+        # 객체가 사라지거나 프로세스가 끝날 때 남은 항목을 기록하고 잠금을 풂
+        self._finalizer = weakref.finalize(self, self.store.close)
+
+    def _key(self, text):
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self.store.get(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    results[i] = vector.tolist()
+            self.hits += len(texts) - sum(len(positions) for positions in missing.values())
+            self.misses += sum(len(positions) for positions in missing.values())
+
+        if missing:
+            # 캐시에 없는 텍스트만 (중복 제거 후) 실제 모델로 임베딩
+            miss_keys = list(missing)
+            vectors = self.underlying.embed_documents([texts[missing[key][0]] for key in miss_keys])
+            with self._lock:
+                for key, vector in zip(miss_keys, vectors):
+                    self.store.put(key, vector)
+                    for i in missing[key]:
+                        results[i] = list(vector)
+                self.store.flush()
+                self._unflushed = 0
+        return results
+
+    def embed_query(self, text):
+        key = self._key(text)
+        with self._lock:
+            vector = self.store.get(key)
+            if vector is not None:
+                self.hits += 1
+                return vector.tolist()
+            self.misses += 1
+        vector = self.underlying.embed_query(text)
+        with self._lock:
+            self.store.put(key, vector)
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self.store.flush()
+                self._unflushed = 0
+        return list(vector)
+
+    def flush(self):
+        with self._lock:
+            self.store.flush()
+            self._unflushed = 0
+
+    def close(self):
+        with self._lock:
+            self._finalizer()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "entries": len(self.store)}
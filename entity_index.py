@@ -0,0 +1,235 @@
+import os
+import re
+import json
+from typing import Optional
+
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from corpus_builder import iter_cards
+
+# 카드사/카드명/혜택 분류 사전 저장 경로와 필터 검색 설정 (환경 변수로 조정 가능)
+ENTITY_INDEX_PATH = os.getenv("ENTITY_INDEX_PATH", "entity_index.json")
+ENTITY_FILTER_ENABLED = os.getenv("ENTITY_FILTER_ENABLED", "true").lower() == "true"
+ENTITY_FILTERED_K = int(os.getenv("ENTITY_FILTERED_K", "10"))
+ENTITY_MIN_RESULTS = int(os.getenv("ENTITY_MIN_RESULTS", "5"))
+
+# 혜택 분류별 질문 키워드. 청크의 benefit 값(혜택명)에 키워드가 들어 있으면 그 분류에 속한다.
+BENEFIT_CATEGORIES = {
+    "항공": ["항공", "마일리지", "마일", "스카이패스", "아시아나", "진에어"],
+    "공항라운지": ["라운지", "공항", "pp"],
+    "주유": ["주유", "기름", "오일"],
+    "카페": ["카페", "커피", "스타벅스", "디저트", "베이커리"],
+    "교통": ["교통", "버스", "지하철", "택시", "기차", "하이패스"],
+    "통신": ["통신", "휴대폰", "핸드폰", "skt"],
+    "쇼핑": ["쇼핑", "백화점", "대형마트", "이마트", "면세점"],
+    "편의점": ["편의점"],
+    "배달": ["배달"],
+    "구독": ["구독", "넷플릭스", "유튜브", "ott"],
+    "영화/문화": ["영화", "문화", "공연", "전시", "테마파크", "놀이공원"],
+    "여행": ["여행", "숙박", "호텔"],
+    "해외": ["해외"],
+    "간편결제": ["간편결제", "페이"],
+    "음식점": ["음식점", "푸드", "레스토랑", "외식"],
+    "의료": ["병원", "약국"],
+    "교육": ["교육", "학원", "학습지", "유치원", "도서"],
+    "자동차": ["자동차", "정비"],
+    "골프": ["골프"],
+    "피트니스": ["피트니스", "헬스"],
+}
+
+# 일반 명사/유통사 이름과 겹쳐 카드사 약칭으로 쓰기 어려운 단어 ("현대백화점", "롯데마트", "하나 추천" 등)
+AMBIGUOUS_COMPANY_ALIASES = {"삼성", "현대", "롯데", "우리", "하나"}
+
+# 카드명 별칭의 최소 길이 (정규화 후 글자 수)
+MIN_CARD_ALIAS_CHARS = 4
+
+
+def normalize(text):
+    """공백·기호를 없애고 소문자로 바꾼 비교용 문자열"""
+    return re.sub(r"[\W_]", "", text.lower())
+
+
+def company_aliases(company):
+    aliases = {normalize(company)}
+    short = normalize(re.sub(r"카드$", "", company))
+    aliases.add(short)
+    # "KB국민카드" -> "kb", "국민" 처럼 영문/한글 부분도 약칭으로 사용
+    aliases.update(re.findall(r"[a-z]+|[가-힣]+", short))
+    return {alias for alias in aliases if len(alias) >= 2 and alias not in AMBIGUOUS_COMPANY_ALIASES}
+
+
+def card_aliases(card_name, company):
+    # 괄호 안 부가 설명("(스카이패스)")과 "Edition2" 같은 개정판 표기를 뗀 이름도 별칭으로 사용
+    base = re.sub(r"\(.*?\)", "", card_name)
+    base = re.sub(r"edition\s*\d*", "", base, flags=re.IGNORECASE)
+    aliases = {normalize(card_name), normalize(base)}
+    # 카드사명을 뺀 이름 ("현대카드 Summit" -> "summit")
+    for name in list(aliases):
+        for prefix in company_aliases(company) | {normalize(company)}:
+            if name.startswith(prefix):
+                aliases.add(name[len(prefix):])
+    return {alias for alias in aliases if len(alias) >= MIN_CARD_ALIAS_CHARS}
+
+
+def _keyword_in(keyword, benefit_key):
+    # 짧은 영문 키워드("pp")는 "app" 같은 단어 안에서 잘못 맞지 않도록 혜택명 전체와 일치해야 함
+    if keyword.isascii():
+        return keyword == benefit_key
+    return keyword in benefit_key
+
+
+class EntityIndex:
+    """질문에 나온 카드사/카드명/혜택 분류를 찾아 메타데이터 필터로 바꾸는 사전
+
+    별칭은 적재 시점에 청크 메타데이터(company, card_name, benefit)로부터 만들어 JSON으로 저장하고,
+    질의 시에는 길이순으로 정렬한 별칭 전체를 하나의 정규식으로 컴파일해 한 번에 찾는다.
+    """
+
+    def __init__(self, aliases, benefit_keys):
+        # aliases: 별칭 -> [[종류("company"/"card"/"benefit"), 값], ...]
+        self.aliases = aliases
+        self.benefit_keys = benefit_keys
+        ordered = sorted(aliases, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, ordered))) if ordered else None
+
+    @classmethod
+    def build(cls, metadatas):
+        aliases = {}
+
+        def add(alias, kind, value):
+            entries = aliases.setdefault(alias, [])
+            if [kind, value] not in entries:
+                entries.append([kind, value])
+
+        benefit_keys = {}
+        for metadata in metadatas:
+            company, card_name, benefit = metadata.get("company"), metadata.get("card_name"), metadata.get("benefit")
+            if company:
+                for alias in company_aliases(company):
+                    add(alias, "company", company)
+            if card_name and company:
+                for alias in card_aliases(card_name, company):
+                    add(alias, "card", card_name)
+            if benefit:
+                key = normalize(benefit)
+                for category, keywords in BENEFIT_CATEGORIES.items():
+                    if any(_keyword_in(keyword, key) for keyword in keywords) and benefit not in benefit_keys.get(category, []):
+                        benefit_keys.setdefault(category, []).append(benefit)
+
+        for category in benefit_keys:
+            for keyword in BENEFIT_CATEGORIES[category]:
+                add(keyword, "benefit", category)
+        return cls(aliases, benefit_keys)
+
+    @classmethod
+    def from_json(cls, data_path):
+        """카드 코퍼스(card_corpus.jsonl) 또는 통합 카드 JSON(combined_card_info.json)에서 바로 사전을 만든다"""
+        metadatas = [{"company": company, "card_name": card["name"], "benefit": benefit}
+                     for company, card in iter_cards(data_path)
+                     for benefit in card["benefits"]]
+        return cls.build(metadatas)
+
+    def save(self, path=ENTITY_INDEX_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"aliases": self.aliases, "benefit_keys": self.benefit_keys}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=ENTITY_INDEX_PATH):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["aliases"], data["benefit_keys"])
+
+    def match(self, query):
+        """질문에서 찾은 {"companies", "cards", "benefits", "categories"}
+
+        benefits는 청크의 benefit 값 목록, categories는 질문에 나온 혜택 분류(BENEFIT_CATEGORIES의 키)이다.
+        """
+        found = {"company": [], "card": [], "benefit": []}
+        if self._pattern is None:
+            return {"companies": [], "cards": [], "benefits": [], "categories": []}
+        for match in self._pattern.finditer(normalize(query)):
+            for kind, value in self.aliases[match.group()]:
+                if value not in found[kind]:
+                    found[kind].append(value)
+        benefits = []
+        for category in found["benefit"]:
+            benefits.extend(key for key in self.benefit_keys.get(category, []) if key not in benefits)
+        return {"companies": found["company"], "cards": found["card"], "benefits": benefits,
+                "categories": found["benefit"]}
+
+    def card_groups(self, query):
+        """질문에서 찾은 카드명 별칭마다 그 별칭에 해당하는 카드 목록 ("현대카드zero" -> 할인형/포인트형 두 카드)"""
+        if self._pattern is None:
+            return []
+        groups = []
+        for match in self._pattern.finditer(normalize(query)):
+            cards = [value for kind, value in self.aliases[match.group()] if kind == "card"]
+            if cards and cards not in groups:
+                groups.append(cards)
+        return groups
+
+    def filters(self, query):
+        """시도할 메타데이터 필터 목록 (카드명, 없으면 카드사 필터 -> 마지막은 항상 None = 필터 없음)
+
+        혜택 분류는 필터로 쓰지 않는다. 혜택명에 키워드가 없는 정답 청크(생활 혜택 안의 커피 할인 등)를 빠뜨리기 때문이다.
+        """
+        matched = self.match(query)
+        if matched["cards"]:
+            return [{"card_name": {"$in": matched["cards"]}}, None]
+        if matched["companies"]:
+            return [{"company": {"$in": matched["companies"]}}, None]
+        return [None]
+
+
+class EntityFilteredRetriever(BaseRetriever):
+    """질문의 카드명/카드사 필터 검색 결과를 필터 없는 검색 결과와 RRF로 합치는 리트리버
+
+    카드명(없으면 카드사) 필터로 filtered_k개를 검색해, 결과가 min_results 이상이면(카드명 필터는 1개 이상) 필터 없는 검색
+    결과(k개)와 RRF로 합친다. 필터가 잘못 걸려도 정답 후보가 빠지지 않고 필터에 맞는 후보만 위로 올라간다.
+    lexical_index가 있으면 각 검색에서 dense 결과와 BM25 결과를 RRF로 합친다.
+    """
+
+    vectorstore: VectorStore
+    entity_index: EntityIndex
+    lexical_index: Optional[LexicalIndex] = None
+    k: int = 20
+    filtered_k: int = ENTITY_FILTERED_K
+    min_results: int = ENTITY_MIN_RESULTS
+    rrf_k: int = 60
+    filtered: int = 0
+    fallback: int = 0
+    unfiltered: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _search(self, query, k, filter):
+        dense_docs = self.vectorstore.similarity_search(query, k=k, filter=filter)
+        if self.lexical_index is None:
+            return dense_docs
+        lexical_docs = [doc for doc, _ in self.lexical_index.search(query, k=k, filter=filter)]
+        return reciprocal_rank_fusion([dense_docs, lexical_docs], k=self.rrf_k, limit=k)
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        ranked = [self._search(query, self.k, None)]
+        filter = self.entity_index.filters(query)[0]
+        if filter is None:
+            self.unfiltered += 1
+        else:
+            docs = self._search(query, self.filtered_k, filter)
+            # 카드명이 일치하면 청크가 몇 개뿐이어도 그 카드의 전체 후보이므로 사용
+            required = 1 if "card_name" in filter else self.min_results
+            if len(docs) >= required:
+                self.filtered += 1
+                ranked.append(docs)
+            else:
+                self.fallback += 1
+        if len(ranked) == 1:
+            return ranked[0]
+        return reciprocal_rank_fusion(ranked, k=self.rrf_k, limit=self.k)
+
+    def stats(self):
+        return {"filtered": self.filtered, "fallback": self.fallback, "unfiltered": self.unfiltered}
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import random
+import hashlib
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from tqdm import tqdm
+
+# 기본 배치/동시성 설정 (환경 변수로 조정 가능)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "4"))
+MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+# 매니페스트 없이 이미 벡터가 들어 있는 네임스페이스를 처음 적재할 때 비우고 시작할지 여부 (uuid4 ID 시절 인덱스 이전용)
+RESET_UNTRACKED_INDEX = os.getenv("INGEST_RESET_INDEX", "false").lower() == "true"
+
+
+class UntrackedIndexError(RuntimeError):
+    """매니페스트가 없는데 대상 네임스페이스에 벡터가 남아 있어 적재하면 중복이 생기는 경우"""
+
+
+@dataclass
+class IngestStats:
+    """적재 결과 통계"""
+    total_chunks: int = 0
+    upserted_chunks: int = 0
+    skipped_chunks: int = 0
+    deleted_chunks: int = 0
+    batches: int = 0
+    retries: int = 0
+    elapsed: float = 0.0
+    index_version: str = None
+
+    @property
+    def chunks_per_sec(self):
+        return self.upserted_chunks / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"총 {self.total_chunks}개 청크 중 {self.upserted_chunks}개 업서트, "
+                f"{self.skipped_chunks}개 변경 없음, {self.deleted_chunks}개 삭제 (배치 {self.batches}회, 재시도 {self.retries}회, "
+                f"{self.elapsed:.2f}초, {self.chunks_per_sec:.1f} chunks/sec)")
+
+
+def call_with_retry(fn, *args, max_retries=MAX_RETRIES, base_delay=0.5, max_delay=20.0, **kwargs):
+    """지수 백오프(+지터)로 재시도하며 함수를 호출하고 (결과, 재시도 횟수)를 반환"""
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs), attempt
+        except Exception:
+            if attempt >= max_retries:
+                raise
+            delay = min(max_delay, base_delay * (2 ** attempt))
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+def chunk_id(doc):
+    """(카드사, 카드명, 혜택, 청크 텍스트)의 해시로 결정적인 청크 ID를 만든다"""
+    key = "\x1f".join([
+        doc.metadata.get("company", ""),
+        doc.metadata.get("card_name", ""),
+        doc.metadata.get("benefit", ""),
+        doc.page_content,
+    ])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def assign_chunk_ids(documents):
+    """각 청크의 metadata에 chunk_id를 기록하고, 완전히 같은 청크는 하나만 남긴다"""
+    unique = {}
+    for doc in documents:
+        doc_id = chunk_id(doc)
+        if doc_id not in unique:
+            doc.metadata["chunk_id"] = doc_id
+            unique[doc_id] = doc
+    return list(unique.values())
+
+
+class IndexManifest:
+    """인덱스에 업서트된 청크 ID 목록을 기록하는 로컬 매니페스트
+
+    배치가 끝날 때마다 저장되므로 중단된 실행도 다음 실행에서 남은 청크만 이어서 처리한다.
+    ID 집합의 해시(version)는 인덱스 내용이 바뀌었는지 판단하는 데 쓰인다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = set()
+        self._lock = threading.Lock()
+        self.exists = bool(path) and os.path.exists(path)
+        if self.exists:
+            with open(path, "r", encoding="utf-8") as f:
+                self.ids = set(json.load(f).get("ids", []))
+
+    @property
+    def version(self):
+        return self.compute_version(self.ids)
+
+    @staticmethod
+    def compute_version(ids):
+        digest = hashlib.sha256()
+        for chunk_id in sorted(ids):
+            digest.update(chunk_id.encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def add(self, ids):
+        with self._lock:
+            self.ids.update(ids)
+            self._save()
+
+    def remove(self, ids):
+        with self._lock:
+            self.ids.difference_update(ids)
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.compute_version(self.ids), "ids": sorted(self.ids)}, f)
+        os.replace(tmp_path, self.path)
+
+
+def load_index_version(manifest_path):
+    """매니페스트에 기록된 인덱스 버전을 읽는다 (없으면 None)"""
+    if not manifest_path or not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f).get("version")
+
+
+def _field(obj, name, default=None):
+    # Pinecone 응답 객체와 dict(가짜/로컬 인덱스)를 같은 방식으로 읽음
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def namespace_vector_count(index, namespace=None):
+    """인덱스의 해당 네임스페이스에 들어 있는 벡터 수 (describe_index_stats가 없으면 len(index))"""
+    if not hasattr(index, "describe_index_stats"):
+        return len(index)
+    stats = index.describe_index_stats()
+    namespaces = _field(stats, "namespaces")
+    if namespaces:
+        summary = namespaces.get(namespace or "")
+        return _field(summary, "vector_count", 0) if summary else 0
+    return _field(stats, "total_vector_count", 0)
+
+
+def _batched(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def ingest_documents(documents, embeddings, index, batch_size=EMBED_BATCH_SIZE, max_workers=UPSERT_WORKERS,
+                     max_retries=MAX_RETRIES, manifest_path=None, text_key="page_content",
+                     namespace=None, show_progress=True, reset_untracked=RESET_UNTRACKED_INDEX):
+    """문서를 매니페스트와 비교해 새로 추가/변경된 청크만 임베딩·업서트하고, 사라진 청크는 삭제한다.
+
+    매니페스트 파일이 없는데 네임스페이스에 벡터가 있으면(매니페스트 도입 전에 무작위 ID로 적재한 인덱스) 예전 벡터를
+    지울 방법이 없어 전체가 중복되므로, reset_untracked(INGEST_RESET_INDEX=true)일 때만 네임스페이스를 한 번 비우고
+    적재하며 아니면 UntrackedIndexError를 낸다.
+
+    embeddings는 LangChain Embeddings 인터페이스(embed_documents)를,
+    index는 Pinecone Index 인터페이스(upsert/delete)를 따르면 되므로 테스트용 가짜 객체로 교체할 수 있다.
+    """
+    start_time = time.perf_counter()
+    documents = assign_chunk_ids(documents)
+    manifest = IndexManifest(manifest_path)
+    stats = IngestStats(total_chunks=len(documents))
+
+    if manifest_path and not manifest.exists:
+        existing = namespace_vector_count(index, namespace)
+        if existing and not reset_untracked:
+            raise UntrackedIndexError(
+                f"매니페스트({manifest_path})가 없는데 인덱스에 벡터 {existing}개가 있습니다. 그대로 적재하면 "
+                f"예전 벡터가 지워지지 않아 중복됩니다. INGEST_RESET_INDEX=true로 네임스페이스를 비우고 다시 적재하세요.")
+        if existing:
+            print(f"매니페스트가 없어 네임스페이스의 기존 벡터 {existing}개를 삭제하고 다시 적재합니다.")
+            call_with_retry(index.delete, delete_all=True, namespace=namespace, max_retries=max_retries)
+            stats.deleted_chunks += existing
+
+    current_ids = {doc.metadata["chunk_id"] for doc in documents}
+    pending = [doc for doc in documents if doc.metadata["chunk_id"] not in manifest.ids]
+    stale_ids = sorted(manifest.ids - current_ids)
+    stats.skipped_chunks = len(documents) - len(pending)
+
+    # 더 이상 존재하지 않는 청크 삭제
+    for batch in _batched(stale_ids, 1000):
+        _, retries = call_with_retry(index.delete, ids=batch, namespace=namespace, max_retries=max_retries)
+        manifest.remove(batch)
+        stats.deleted_chunks += len(batch)
+        stats.retries += retries
+
+    def process_batch(batch):
+        # 배치 임베딩 -> 업서트 (각 단계 개별 재시도)
+        vectors, embed_retries = call_with_retry(
+            embeddings.embed_documents, [doc.page_content for doc in batch], max_retries=max_retries)
+        records = [
+            {"id": doc.metadata["chunk_id"], "values": vector, "metadata": {**doc.metadata, text_key: doc.page_content}}
+            for doc, vector in zip(batch, vectors)
+        ]
+        _, upsert_retries = call_with_retry(index.upsert, vectors=records, namespace=namespace,
+                                            max_retries=max_retries)
+        manifest.add([doc.metadata["chunk_id"] for doc in batch])
+        return len(batch), embed_retries + upsert_retries
+
+    progress = tqdm(total=len(pending), desc="Pinecone에 문서 추가 중", disable=not show_progress)
+    # 동시에 처리 중인 배치 수를 워커 수의 2배로 제한 (메모리 사용량 제한)
+    max_in_flight = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = set()
+        for batch in _batched(pending, batch_size):
+            if len(in_flight) >= max_in_flight:
+                completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                _collect(completed, stats, progress)
+            in_flight.add(executor.submit(process_batch, batch))
+        completed, _ = wait(in_flight)
+        _collect(completed, stats, progress)
+    progress.close()
+
+    stats.index_version = manifest.version
+    stats.elapsed = time.perf_counter() - start_time
+    return stats
+
+
+def _collect(futures, stats, progress):
+    for future in futures:
+        count, retries = future.result()
+        stats.upserted_chunks += count
+        stats.batches += 1
+        stats.retries += retries
+        progress.update(count)
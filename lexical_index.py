@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from local_vectorstore import metadata_filter_mask
+
+# 어휘(BM25) 인덱스 저장 경로
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "lexical_index")
+
+# 한글은 글자 bigram, 영문/숫자는 단어 단위로 토큰화 (숫자의 천 단위 쉼표는 제거)
+TOKEN_PATTERN = re.compile(r"[가-힣]+|[a-z]+|\d[\d,]*")
+
+
+def tokenize(text):
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if word[0].isdigit():
+            tokens.append(word.replace(",", ""))
+        elif "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class LexicalIndex:
+    """카드 청크에 대한 사전 계산된 BM25 역색인
+
+    용어별 posting(문서 번호, 빈도)을 하나의 연속 배열에 저장하고 offsets로 구간을 찾는다.
+    build()로 적재 시점에 만들고 save()/load()로 디스크에 보관한다.
+    """
+
+    def __init__(self, vocab, offsets, doc_ids, term_freqs, doc_lengths, documents, k1=1.2, b=0.75):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        self._columns = {}
+
+    @classmethod
+    def build(cls, documents):
+        postings = {}
+        doc_lengths = []
+        for position, doc in enumerate(documents):
+            # 카드명/혜택명도 검색되도록 본문과 함께 색인
+            text = " ".join([doc.metadata.get("card_name", ""), doc.metadata.get("benefit", ""), doc.page_content])
+            tokens = tokenize(text)
+            doc_lengths.append(len(tokens))
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, []).append((position, count))
+
+        vocab = {}
+        offsets = [0]
+        doc_ids, term_freqs = [], []
+        for token in sorted(postings):
+            vocab[token] = len(vocab)
+            for position, count in postings[token]:
+                doc_ids.append(position)
+                term_freqs.append(count)
+            offsets.append(len(doc_ids))
+
+        records = [{"metadata": doc.metadata, "page_content": doc.page_content} for doc in documents]
+        return cls(vocab, np.array(offsets, dtype=np.int64), np.array(doc_ids, dtype=np.int32),
+                   np.array(term_freqs, dtype=np.float32), np.array(doc_lengths, dtype=np.float32), records)
+
+    def save(self, path=LEXICAL_INDEX_PATH):
+        os.makedirs(path, exist_ok=True)
+        np.savez(os.path.join(path, "postings.npz"), offsets=self.offsets, doc_ids=self.doc_ids,
+                 term_freqs=self.term_freqs, doc_lengths=self.doc_lengths)
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f, ensure_ascii=False)
+        with open(os.path.join(path, "docs.jsonl"), "w", encoding="utf-8") as f:
+            for record in self.documents:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path=LEXICAL_INDEX_PATH):
+        arrays = np.load(os.path.join(path, "postings.npz"))
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        with open(os.path.join(path, "docs.jsonl"), "r", encoding="utf-8") as f:
+            documents = [json.loads(line) for line in f]
+        return cls(vocab, arrays["offsets"], arrays["doc_ids"], arrays["term_freqs"], arrays["doc_lengths"], documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def scores(self, query):
+        """질의에 대한 전체 문서의 BM25 점수 배열"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        n_docs = len(self.documents)
+        for token in set(tokenize(query)):
+            term = self.vocab.get(token)
+            if term is None:
+                continue
+            start, end = self.offsets[term], self.offsets[term + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            idf = np.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length)
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def _column(self, field):
+        # 메타데이터 필터링용 필드 값 배열 (한 번 만들어 재사용)
+        if field not in self._columns:
+            self._columns[field] = np.array([record["metadata"].get(field) for record in self.documents], dtype=object)
+        return self._columns[field]
+
+    def search(self, query, k=20, filter=None):
+        """BM25 상위 k개의 (Document, score) 목록 (filter는 LocalIndex와 같은 Pinecone 스타일 메타데이터 필터)"""
+        scores = self.scores(query)
+        if filter:
+            scores[~metadata_filter_mask(filter, self._column, len(self.documents))] = 0
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) == 0:
+            return []
+        k = min(k, len(hits))
+        top = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        top = top[np.argsort(-scores[top])]
+        return [(self._to_document(i), float(scores[i])) for i in top]
+
+    def _to_document(self, position):
+        record = self.documents[position]
+        return Document(id=record["metadata"].get("chunk_id"), page_content=record["page_content"],
+                        metadata=dict(record["metadata"]))
+
+
+def document_key(doc):
+    # 결과 병합용 키: chunk_id가 있으면 사용, 없으면 본문 해시
+    return doc.metadata.get("chunk_id") or hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+
+
+def reciprocal_rank_fusion(result_lists, k=60, limit=None):
+    """여러 순위 목록을 RRF(sum 1 / (k + rank))로 합친다"""
+    scores, documents = {}, {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [documents[key] for key in ranked[:limit]]
+
+
+class HybridRetriever(BaseRetriever):
+    """dense 검색 결과와 BM25 결과를 RRF로 합쳐 상위 k개를 반환하는 리트리버"""
+
+    dense_retriever: BaseRetriever
+    lexical_index: LexicalIndex
+    k: int = 20
+    lexical_k: int = 20
+    rrf_k: int = 60
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        dense_docs = self.dense_retriever.invoke(query)
+        lexical_docs = [doc for doc, _ in self.lexical_index.search(query, k=self.lexical_k)]
+        return reciprocal_rank_fusion([dense_docs, lexical_docs], k=self.rrf_k, limit=self.k)
@@ -0,0 +1,230 @@
+import os
+import json
+import threading
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+# 로컬 벡터 인덱스 저장 경로
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "local_index")
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def metadata_filter_mask(filter, column, size):
+    """Pinecone 스타일 필터({"company": "현대카드"}, {"$in": [...]}, $eq/$ne/$nin, $and/$or)를 마스크로 변환
+
+    column(field)은 문서 순서대로 해당 메타데이터 값을 담은 배열을 반환해야 한다.
+    """
+    mask = np.ones(size, dtype=bool)
+    for field, condition in filter.items():
+        if field == "$and":
+            for sub in condition:
+                mask &= metadata_filter_mask(sub, column, size)
+            continue
+        if field == "$or":
+            any_mask = np.zeros(size, dtype=bool)
+            for sub in condition:
+                any_mask |= metadata_filter_mask(sub, column, size)
+            mask &= any_mask
+            continue
+        values = column(field)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for op, value in condition.items():
+            if op == "$eq":
+                mask &= values == value
+            elif op == "$ne":
+                mask &= values != value
+            elif op == "$in":
+                mask &= np.isin(values, list(value))
+            elif op == "$nin":
+                mask &= ~np.isin(values, list(value))
+            else:
+                raise ValueError(f"지원하지 않는 필터 연산자입니다: {op}")
+    return mask
+
+
+class LocalIndex:
+    """정규화된 float32 임베딩 행렬과 메타데이터를 보관하는 인프로세스 벡터 인덱스
+
+    Pinecone Index와 같은 upsert/delete 인터페이스를 제공하므로 적재 파이프라인의 대상이 될 수 있고,
+    저장된 행렬은 memory-map으로 불러와 코사인 top-k 질의를 행렬곱 + argpartition으로 처리한다.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ids = []
+        self.metadata = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._positions = {}
+        self._columns = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path=LOCAL_INDEX_PATH):
+        index = cls(path)
+        vectors_path = os.path.join(path, "embeddings.npy")
+        records_path = os.path.join(path, "records.jsonl")
+        if os.path.exists(vectors_path) and os.path.exists(records_path):
+            index.matrix = np.load(vectors_path, mmap_mode="r")
+            with open(records_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    index.ids.append(record["id"])
+                    index.metadata.append(record["metadata"])
+            index._positions = {vector_id: i for i, vector_id in enumerate(index.ids)}
+        return index
+
+    def save(self, path=None):
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            vectors_tmp = os.path.join(path, "embeddings.tmp.npy")
+            records_tmp = os.path.join(path, "records.jsonl.tmp")
+            np.save(vectors_tmp, np.ascontiguousarray(self.matrix, dtype=np.float32))
+            with open(records_tmp, "w", encoding="utf-8") as f:
+                for vector_id, metadata in zip(self.ids, self.metadata):
+                    f.write(json.dumps({"id": vector_id, "metadata": metadata}, ensure_ascii=False) + "\n")
+            os.replace(vectors_tmp, os.path.join(path, "embeddings.npy"))
+            os.replace(records_tmp, os.path.join(path, "records.jsonl"))
+        self.path = path
+
+    def __len__(self):
+        return len(self.ids)
+
+    def upsert(self, vectors, namespace=None):
+        with self._lock:
+            new_rows, new_ids, new_metadata = [], [], []
+            matrix = np.array(self.matrix) if len(self.ids) else None
+            for record in vectors:
+                row = _normalize(np.asarray(record["values"], dtype=np.float32))
+                position = self._positions.get(record["id"])
+                if position is None:
+                    new_ids.append(record["id"])
+                    new_metadata.append(record.get("metadata", {}))
+                    new_rows.append(row)
+                else:
+                    matrix[position] = row
+                    self.metadata[position] = record.get("metadata", {})
+            if new_rows:
+                stacked = np.vstack(new_rows)
+                matrix = stacked if matrix is None else np.vstack([matrix, stacked])
+                for vector_id in new_ids:
+                    self._positions[vector_id] = len(self.ids)
+                    self.ids.append(vector_id)
+                self.metadata.extend(new_metadata)
+            if matrix is not None:
+                self.matrix = matrix
+            self._columns = {}
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids=None, namespace=None, delete_all=False):
+        with self._lock:
+            if delete_all:
+                ids = list(self.ids)
+            drop = {self._positions[vector_id] for vector_id in ids or [] if vector_id in self._positions}
+            if drop:
+                keep = [i for i in range(len(self.ids)) if i not in drop]
+                self.matrix = np.array(self.matrix[keep])
+                self.ids = [self.ids[i] for i in keep]
+                self.metadata = [self.metadata[i] for i in keep]
+                self._positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+                self._columns = {}
+        return {}
+
+    def _column(self, field):
+        # 메타데이터 필터링용 필드 값 배열 (한 번 만들어 재사용)
+        if field not in self._columns:
+            self._columns[field] = np.array([m.get(field) for m in self.metadata], dtype=object)
+        return self._columns[field]
+
+    def _filter_mask(self, filter):
+        return metadata_filter_mask(filter, self._column, len(self.ids))
+
+    def query(self, vector, top_k=10, filter=None):
+        """코사인 유사도 상위 top_k개의 (id, score, metadata) 목록을 반환"""
+        with self._lock:
+            if not self.ids:
+                return []
+            scores = self.matrix @ _normalize(np.asarray(vector, dtype=np.float32))
+            candidates = np.arange(len(self.ids))
+            if filter:
+                candidates = candidates[self._filter_mask(filter)]
+                scores = scores[candidates]
+            if len(candidates) == 0:
+                return []
+            top_k = min(top_k, len(candidates))
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[candidates[i]], float(scores[i]), self.metadata[candidates[i]]) for i in top]
+
+
+class LocalVectorStore(VectorStore):
+    """LocalIndex를 사용하는 LangChain VectorStore (PineconeVectorStore 대체용)
+
+    as_retriever(search_kwargs={"k": 30, "filter": {...}})를 그대로 사용할 수 있다.
+    """
+
+    def __init__(self, index, embedding, text_key="page_content"):
+        self.index = index
+        self.embedding = embedding
+        self.text_key = text_key
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    @classmethod
+    def load(cls, embedding, path=LOCAL_INDEX_PATH, text_key="page_content"):
+        return cls(LocalIndex.load(path), embedding, text_key=text_key)
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, *, ids=None, path=None, **kwargs):
+        store = cls(LocalIndex(path), embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        if path:
+            store.index.save(path)
+        return store
+
+    def add_texts(self, texts, metadatas=None, *, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(i + len(self.index)) for i in range(len(texts))]
+        vectors = self.embedding.embed_documents(texts)
+        self.index.upsert([
+            {"id": vector_id, "values": vector, "metadata": {**metadata, self.text_key: text}}
+            for vector_id, vector, metadata, text in zip(ids, vectors, metadatas, texts)
+        ])
+        return ids
+
+    def delete(self, ids=None, **kwargs):
+        self.index.delete(ids or [])
+        return True
+
+    def _to_document(self, vector_id, metadata):
+        metadata = dict(metadata)
+        text = metadata.pop(self.text_key, "")
+        return Document(id=vector_id, page_content=text, metadata=metadata)
+
+    def similarity_search_by_vector_with_score(self, embedding, k=4, filter=None, **kwargs):
+        return [(self._to_document(vector_id, metadata), score)
+                for vector_id, score, metadata in self.index.query(embedding, top_k=k, filter=filter)]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search_by_vector(self, embedding, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # 점수가 이미 코사인 유사도이므로 그대로 사용
+        return lambda score: score
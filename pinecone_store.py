@@ -1,15 +1,20 @@
 import os
 from dotenv import load_dotenv
-import json
 import time
-from tqdm import tqdm
-from uuid import uuid4
 from pinecone import Pinecone, ServerlessSpec
 
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain.schema import Document
+from embedding_cache import CachedEmbeddings
+from ingest_pipeline import ingest_documents, assign_chunk_ids, EMBED_BATCH_SIZE, UPSERT_WORKERS
+from lexical_index import LexicalIndex, LEXICAL_INDEX_PATH
+from entity_index import EntityIndex, ENTITY_INDEX_PATH
+from corpus_builder import iter_cards, CORPUS_PATH
+from card_chunker import structured_split, ParentStore, CHUNKING_STRATEGY, PARENT_STORE_PATH
+from local_vectorstore import LocalIndex, LocalVectorStore, LOCAL_INDEX_PATH
+from card_tables import CardTable, CARD_TABLE_PATH
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
@@ -21,41 +26,34 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 # 임베딩 모델 차원 확인 (예: OpenAI의 'text-embedding-ada-002'는 1536차원)
 EMBEDDING_DIMENSION = 1536  # OpenAI 임베딩 모델 차원
 
+# 벡터 저장소 백엔드 선택: "pinecone" (기본) 또는 "local"
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+
+# 인덱스에 업서트된 청크 ID를 기록하는 매니페스트 경로 (증분 재색인에 사용)
+MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", "index_manifest.json")
+
 def load_documents(data_path):
-    documents = []
-
-    with open(data_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    for company_name, company_data in data.items():
-        for card in company_data['cards']:
-            for benefit, details in card['benefits'].items():
-                metadata = {
-                    'company': company_name,
-                    'card_name': card['name'],
-                    'benefit': benefit
-                }
-                page_content = card['summary'] + "\n" + "\n".join(details)
-                documents.append(Document(metadata=metadata, page_content=page_content))
-
-    return documents
-
-def create_embeddings_and_db(documents):
-    # 문서 분할
+    """카드 혜택마다 Document를 하나씩 내보내는 제너레이터 (코퍼스 .jsonl과 기존 통합 .json 모두 지원)"""
+    for company_name, card in iter_cards(data_path):
+        for benefit, details in card['benefits'].items():
+            metadata = {
+                'company': company_name,
+                'card_name': card['name'],
+                'benefit': benefit
+            }
+            page_content = card['summary'] + "\n" + "\n".join(details)
+            yield Document(metadata=metadata, page_content=page_content)
+
+def split_documents(documents):
+    # 문서 분할 (기존 방식: 카드 요약 + 혜택 설명을 글자 수 기준으로 분할)
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, 
                                                    chunk_overlap=100,
                                                    length_function=len)
-    split_docs = text_splitter.split_documents(documents)
-
-    # OpenAI 임베딩 생성
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-ada-002",  # OpenAI의 임베딩 모델 사용
-        api_key=OPENAI_API_KEY
-    )
+    return text_splitter.split_documents(documents)
 
+def get_pinecone_index(index_name="card-chatbot"):
     # Pinecone 인스턴스 생성 및 초기화
     pc = Pinecone(api_key=PINECONE_API_KEY)
-    index_name = "card-chatbot"
     
     # 인덱스가 이미 존재하는 경우 생성하지 않고 사용
     if index_name not in pc.list_indexes().names():
@@ -70,22 +68,69 @@ def create_embeddings_and_db(documents):
             time.sleep(1)
 
     # 인덱스 가져오기
-    index = pc.Index(index_name)
-
-    # PineconeVectorStore를 사용하여 벡터 스토어 생성
-    vectorstore = PineconeVectorStore(index=index, embedding=embeddings, text_key="page_content")
-
-    # 문서에 UUID 할당
-    uuids = [str(uuid4()) for _ in range(len(split_docs))]
+    return pc.Index(index_name)
+
+def create_embeddings_and_db(documents, batch_size=EMBED_BATCH_SIZE, max_workers=UPSERT_WORKERS,
+                             manifest_path=None):
+    if CHUNKING_STRATEGY == "structured":
+        # 혜택 설명의 섹션 단위로 분할하고, 카드 요약은 부모 레코드에 한 번만 저장
+        split_docs, parents = structured_split(documents)
+        ParentStore(parents).save(PARENT_STORE_PATH)
+    else:
+        split_docs = split_documents(documents)
+    split_docs = assign_chunk_ids(split_docs)
+
+    # 하이브리드 검색용 BM25 역색인 생성 (dense 인덱스와 같은 chunk_id 사용)
+    LexicalIndex.build(split_docs).save(LEXICAL_INDEX_PATH)
+    # 질문의 카드사/카드명/혜택을 메타데이터 필터로 바꾸는 엔티티 사전 생성
+    EntityIndex.build([doc.metadata for doc in split_docs]).save(ENTITY_INDEX_PATH)
+
+    # OpenAI 임베딩 생성 (디스크 캐시를 거쳐 이미 임베딩한 텍스트는 재사용)
+    embeddings = CachedEmbeddings(
+        OpenAIEmbeddings(
+            model="text-embedding-ada-002",  # OpenAI의 임베딩 모델 사용
+            api_key=OPENAI_API_KEY
+        ),
+        model_name="text-embedding-ada-002"
+    )
 
-    # 벡터 스토어에 문서 추가 (진행 상황 표시)
-    for doc, uuid in tqdm(zip(split_docs, uuids), total=len(split_docs), desc="Pinecone에 문서 추가 중"):
-        vectorstore.add_documents(documents=[doc], ids=[uuid])
+    if VECTOR_BACKEND == "local":
+        # 로컬 인덱스 사용 (매니페스트도 인덱스 디렉터리에 함께 저장)
+        os.makedirs(LOCAL_INDEX_PATH, exist_ok=True)
+        index = LocalIndex.load(LOCAL_INDEX_PATH)
+        manifest_path = manifest_path or os.path.join(LOCAL_INDEX_PATH, "manifest.json")
+    else:
+        index = get_pinecone_index()
+        manifest_path = manifest_path or MANIFEST_PATH
+
+    # 변경된 청크만 배치 임베딩 + 동시 업서트, 사라진 청크는 삭제
+    try:
+        stats = ingest_documents(split_docs, embeddings, index,
+                                 batch_size=batch_size,
+                                 max_workers=max_workers,
+                                 manifest_path=manifest_path)
+    finally:
+        # 중단되더라도 매니페스트와 로컬 인덱스 내용이 어긋나지 않도록 저장
+        if VECTOR_BACKEND == "local":
+            index.save()
+    print(stats)
+    print(f"임베딩 캐시: {embeddings.stats()}")
+
+    if VECTOR_BACKEND == "local":
+        vectorstore = LocalVectorStore(index, embeddings, text_key="page_content")
+    else:
+        # PineconeVectorStore를 사용하여 벡터 스토어 생성
+        vectorstore = PineconeVectorStore(index=index, embedding=embeddings, text_key="page_content")
 
     print("문서 저장이 완료되었습니다.")
     return vectorstore
 
 if __name__ == "__main__":
-    data_path = "combined_card_info.json"
+    # corpus_builder.py로 만든 코퍼스가 있으면 사용, 없으면 기존 통합 JSON 사용
+    data_path = CORPUS_PATH if os.path.exists(CORPUS_PATH) else "combined_card_info.json"
+    # 연회비/전월실적/혜택 목록 질문에 LLM 없이 답하는 카드 표 생성
+    card_table = CardTable.from_json(data_path)
+    card_table.save(CARD_TABLE_PATH)
+    print(f"카드 표 저장: {len(card_table)}개 카드 -> {CARD_TABLE_PATH}")
     documents = load_documents(data_path)
     create_embeddings_and_db(documents)
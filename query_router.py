@@ -0,0 +1,49 @@
+import os
+import re
+
+# 질문 재구성(contextualize) LLM 호출 생략 여부를 판단하는 라우터 설정
+QUERY_ROUTER_ENABLED = os.getenv("QUERY_ROUTER_ENABLED", "true").lower() == "true"
+SHORT_QUESTION_CHARS = int(os.getenv("SHORT_QUESTION_CHARS", "8"))
+
+# 이전 대화를 가리키는 지시어/대명사 (어절 단위로 비교)
+DEICTIC_WORDS = {
+    "그", "이", "저", "그거", "그것", "그게", "그건", "그걸", "이거", "이것", "이게", "이건", "이걸",
+    "저거", "저것", "저게", "저건", "거기", "여기", "해당", "위", "위의", "위에", "앞", "앞의", "앞에서",
+    "방금", "아까", "그중", "이중", "둘", "둘다", "둘중", "나머지", "마지막", "첫번째", "두번째",
+}
+# 앞 대화에 이어지는 질문의 시작 표현
+CONTINUATION_PREFIXES = ("그럼", "그러면", "그리고", "그래서", "그런데", "근데", "또 ", "그밖에", "그 외", "그외", "다른 건", "다른건")
+# "그 카드는", "두 카드" 처럼 지시어 + 명사 형태
+DEICTIC_PATTERN = re.compile(r"(^|\s)(그|이|저|두|세|해당)\s*(카드|혜택|회사|카드사|상품|서비스)")
+
+# 질문 자체에 대상이 드러나는 표현 (카드명/카드사/금액, 새로운 카드 추천·검색 요청 등)
+EXPLICIT_ENTITY_PATTERN = re.compile(r"[가-힣A-Za-z0-9]+카드|[A-Za-z]{2,}|\d[\d,]*\s*(원|%|마일)|카드\s*(은|는|를|가|도)?\s*(추천|찾|알려|있|뭐)")
+
+
+def _words(question):
+    return [re.sub(r"[^\w]", "", word) for word in question.split()]
+
+
+def needs_reformulation(question, chat_history):
+    """대화 기록을 참고해 질문을 재구성해야 하는지 로컬 규칙으로 판단한다.
+
+    대화 기록이 없거나 질문에 지시어가 없고 대상(카드명/카드사 등)이 명시된 질문은 그대로 검색한다.
+    """
+    if not chat_history:
+        return False
+    stripped = question.strip()
+    if stripped.startswith(CONTINUATION_PREFIXES) or DEICTIC_PATTERN.search(stripped):
+        return True
+    if any(word in DEICTIC_WORDS for word in _words(stripped)):
+        return True
+    # 짧은 질문("연회비는?")은 앞 대화의 대상을 전제하는 경우가 대부분
+    if len(re.sub(r"\s", "", stripped)) < SHORT_QUESTION_CHARS:
+        return True
+    # 대상이 드러나지 않는 질문은 길이와 관계없이 이전 턴의 카드/카드사를 이어받는 것으로 본다
+    # ("전월실적 조건은 어떻게 되나요 자세히요"를 그대로 검색하면 세션마다 다른 카드를 물어도 같은 질문이 됨)
+    return not EXPLICIT_ENTITY_PATTERN.search(stripped)
+
+
+def same_question(a, b):
+    """재구성 결과가 원래 질문과 사실상 같은지 (공백/문장부호 무시)"""
+    return re.sub(r"[\s\W_]", "", a) == re.sub(r"[\s\W_]", "", b)
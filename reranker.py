@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from langchain_core.documents import Document, BaseDocumentCompressor
+
+from lexical_index import tokenize, document_key, reciprocal_rank_fusion
+
+# 리랭커 설정 (환경 변수로 조정 가능)
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "BAAI/bge-reranker-v2-m3")
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "torch")  # "torch" 또는 "onnx"
+RERANKER_ONNX_FILE = os.getenv("RERANKER_ONNX_FILE")  # 예: "onnx/model_qint8_avx512.onnx" (양자화 모델)
+RERANKER_MAX_LENGTH = int(os.getenv("RERANKER_MAX_LENGTH", "512"))
+RERANKER_BATCH_SIZE = int(os.getenv("RERANKER_BATCH_SIZE", "16"))
+RERANKER_PREFILTER = int(os.getenv("RERANKER_PREFILTER", "0"))  # 0이면 1차 필터링 없이 모든 후보 채점
+RERANKER_CACHE_SIZE = int(os.getenv("RERANKER_CACHE_SIZE", "8192"))
+
+
+class CrossEncoderScorer:
+    """CPU에서 cross-encoder를 배치 단위로 실행하는 채점기
+
+    입력은 max_length 토큰으로 잘라 계산량을 제한한다.
+    backend="onnx"이면 sentence-transformers의 ONNX Runtime 경로를 사용하며,
+    onnx_file로 양자화된 모델 파일을 지정할 수 있다 (optimum, onnxruntime 필요).
+    """
+
+    def __init__(self, model_name=RERANKER_MODEL, max_length=RERANKER_MAX_LENGTH, batch_size=RERANKER_BATCH_SIZE,
+                 backend=RERANKER_BACKEND, onnx_file=RERANKER_ONNX_FILE):
+        # torch/onnxruntime 로딩이 무거우므로 채점기를 만들 때 불러온다
+        from sentence_transformers import CrossEncoder
+
+        kwargs = {"max_length": max_length, "device": "cpu"}
+        if backend == "onnx":
+            kwargs["backend"] = "onnx"
+            if onnx_file:
+                kwargs["model_kwargs"] = {"file_name": onnx_file}
+        self.model = CrossEncoder(model_name, **kwargs)
+        self.batch_size = batch_size
+
+    def score(self, pairs):
+        return [float(s) for s in self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)]
+
+
+def lexical_overlap(query_tokens, text):
+    """질의 토큰이 문서에 얼마나 포함되는지 (1차 필터링용 저비용 점수)"""
+    if not query_tokens:
+        return 0.0
+    return len(query_tokens & set(tokenize(text))) / len(query_tokens)
+
+
+class FastCrossEncoderReranker(BaseDocumentCompressor):
+    """점수 캐시와 1차 필터링을 갖춘 cross-encoder 리랭커 (CrossEncoderReranker 대체)
+
+    (질의, chunk_id)별 점수를 LRU로 캐시하고, prefilter_n이 설정되면 입력 순위와 어휘 중복도를
+    RRF로 합친 순위 상위 후보만 cross-encoder로 채점한다. 결과 문서의 metadata에 relevance_score를 기록한다.
+    """
+
+    scorer: Any
+    top_n: int = 15
+    prefilter_n: int = RERANKER_PREFILTER
+    cache_size: int = RERANKER_CACHE_SIZE
+    cache: Any = None
+    lock: Any = None
+    hits: int = 0
+    misses: int = 0
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def prefilter(self, documents, query):
+        if not self.prefilter_n or len(documents) <= self.prefilter_n:
+            return list(documents)
+        query_tokens = set(tokenize(query))
+        by_overlap = sorted(documents, key=lambda doc: lexical_overlap(query_tokens, doc.page_content), reverse=True)
+        return reciprocal_rank_fusion([list(documents), by_overlap], limit=self.prefilter_n)
+
+    def score_documents(self, documents, query):
+        keys = [(query, document_key(doc)) for doc in documents]
+        scores = [None] * len(documents)
+        with self.lock:
+            for i, key in enumerate(keys):
+                if key in self.cache:
+                    self.cache.move_to_end(key)
+                    scores[i] = self.cache[key]
+            missing = [i for i, score in enumerate(scores) if score is None]
+            self.hits += len(documents) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            new_scores = self.scorer.score([(query, documents[i].page_content) for i in missing])
+            with self.lock:
+                for i, score in zip(missing, new_scores):
+                    scores[i] = score
+                    self.cache[keys[i]] = score
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        return scores
+
+    def compress_documents(self, documents, query, callbacks=None):
+        candidates = self.prefilter(documents, query)
+        if not candidates:
+            return []
+        scores = self.score_documents(candidates, query)
+        ranked = sorted(zip(candidates, scores), key=lambda pair: pair[1], reverse=True)[:self.top_n]
+        return [
+            Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, "relevance_score": score})
+            for doc, score in ranked
+        ]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
@@ -0,0 +1,77 @@
+import threading
+
+
+class ResourceRegistry:
+    """무거운 구성요소(벡터 스토어, LLM, 리랭커 모델 등)를 프로세스당 한 번만 만들어 공유하는 레지스트리
+
+    get()은 스레드 안전하며, 여러 세션이 동시에 요청해도 팩토리는 한 번만 실행된다.
+    warm_up()으로 서버 시작 시 백그라운드에서 미리 로드할 수 있다.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._warm_up_thread = None
+        self.errors = {}
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def provide(self, name, instance):
+        """이미 만든 객체를 리소스로 등록한다 (테스트·벤치마크에서 가짜 모델로 교체할 때 사용)"""
+        with self._lock:
+            self._factories[name] = lambda: instance
+            self._locks.setdefault(name, threading.Lock())
+            self._instances[name] = instance
+
+    def get(self, name):
+        if name in self._instances:
+            return self._instances[name]
+        with self._lock:
+            if name not in self._factories:
+                raise KeyError(f"등록되지 않은 리소스입니다: {name}")
+            lock = self._locks[name]
+        # 리소스별 잠금: 다른 리소스 로딩을 막지 않고, 같은 리소스는 한 번만 생성
+        with lock:
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+                self.errors.pop(name, None)
+        return self._instances[name]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    def warm_up(self, names=None, background=True):
+        """등록된 리소스를 미리 로드한다 (background=True면 한 번만 백그라운드 스레드로 실행)"""
+        names = list(names or self._factories)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    # 실패한 리소스는 첫 요청 시 다시 시도
+                    self.errors[name] = e
+                    print(f"{name} 로딩 실패: {e}")
+
+        if not background:
+            load_all()
+            return None
+        with self._lock:
+            if self._warm_up_thread is None:
+                self._warm_up_thread = threading.Thread(target=load_all, name="resource-warm-up", daemon=True)
+                self._warm_up_thread.start()
+        return self._warm_up_thread
+
+    def clear(self):
+        with self._lock:
+            self._instances.clear()
+            self._warm_up_thread = None
+
+
+# 프로세스 전역 레지스트리
+registry = ResourceRegistry()
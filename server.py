@@ -0,0 +1,237 @@
+import os
+import json
+import asyncio
+import argparse
+import contextlib
+from aiohttp import web, WSMsgType
+from dotenv import load_dotenv
+
+from chatbot_logic import astream_conversation, get_conversation
+from tracing import tracer
+
+# .env 파일에서 환경 변수 로드
+load_dotenv()
+
+# 서버 설정 (환경 변수로 조정 가능)
+MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "8"))
+MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "32"))
+REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "120"))
+SHUTDOWN_TIMEOUT = float(os.getenv("SERVER_SHUTDOWN_TIMEOUT", "30"))
+
+
+class Overloaded(Exception):
+    """대기열이 가득 찼거나 서버가 종료 중이라 요청을 받을 수 없음"""
+
+    def __init__(self, reason, status):
+        super().__init__(reason)
+        self.status = status
+
+
+class AdmissionController:
+    """동시 실행 수를 제한하고, 대기 요청이 max_queue를 넘으면 즉시 거절(backpressure)한다.
+
+    같은 세션의 요청은 세션별 잠금으로 도착 순서대로 하나씩 처리된다.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._session_locks = {}
+        self._session_refs = {}
+
+    @contextlib.asynccontextmanager
+    async def admit(self, session_id):
+        if self.draining:
+            self.rejected += 1
+            raise Overloaded("서버가 종료 중입니다.", 503)
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded("요청이 많아 잠시 후 다시 시도해 주세요.", 429)
+
+        self.waiting += 1
+        self._idle.clear()
+        acquired = False
+        lock = self._session_locks.setdefault(session_id, asyncio.Lock())
+        self._session_refs[session_id] = self._session_refs.get(session_id, 0) + 1
+        try:
+            async with lock:
+                async with self.semaphore:
+                    self.waiting -= 1
+                    self.active += 1
+                    acquired = True
+                    yield
+        finally:
+            if acquired:
+                self.active -= 1
+            else:
+                self.waiting -= 1
+            self._session_refs[session_id] -= 1
+            if not self._session_refs[session_id]:
+                del self._session_refs[session_id]
+                del self._session_locks[session_id]
+            if not self.waiting and not self.active:
+                self._idle.set()
+
+    async def drain(self, timeout=SHUTDOWN_TIMEOUT):
+        """새 요청을 거절하고 처리 중인 요청이 끝날 때까지 기다린다"""
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"종료 대기 시간 초과: 처리 중 {self.active}건, 대기 {self.waiting}건")
+
+    def stats(self):
+        return {"active": self.active, "waiting": self.waiting, "rejected": self.rejected,
+                "max_concurrency": self.max_concurrency, "max_queue": self.max_queue, "draining": self.draining}
+
+
+def serialize_documents(documents):
+    return [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in documents]
+
+
+async def _parse_request(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text="JSON 형식의 요청 본문이 필요합니다.")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="요청 본문은 JSON 객체여야 합니다.")
+    session_id, question = body.get("session_id"), body.get("input")
+    if not session_id or not question:
+        raise web.HTTPBadRequest(text="session_id와 input이 필요합니다.")
+    return str(session_id), str(question)
+
+
+async def run_turn(conversation, session_id, question):
+    """한 턴을 astream으로 실행하며 (event, payload)를 내보낸다"""
+    config = {"configurable": {"session_id": session_id}}
+    async for event, payload in astream_conversation(conversation, {"input": question}, config):
+        yield event, payload
+
+
+async def handle_chat(request):
+    session_id, question = await _parse_request(request)
+    app = request.app
+    try:
+        async with app["admission"].admit(session_id):
+            async def collect():
+                answer, context, timing = "", [], {}
+                async for event, payload in run_turn(app["conversation"], session_id, question):
+                    if event == "context":
+                        context = payload
+                    elif event == "token":
+                        answer += payload
+                    else:
+                        timing = payload
+                return answer, context, timing
+
+            try:
+                answer, context, timing = await asyncio.wait_for(collect(), app["request_timeout"])
+            except asyncio.TimeoutError:
+                # 실행 중인 턴은 wait_for가 취소하고, async with를 빠져나가며 실행 슬롯과 세션 잠금을 돌려줌
+                return web.json_response({"error": "응답 시간이 초과되었습니다."}, status=504)
+    except Overloaded as e:
+        return web.json_response({"error": str(e)}, status=e.status, headers={"Retry-After": "1"})
+    return web.json_response({"session_id": session_id, "answer": answer,
+                              "context": serialize_documents(context), **timing})
+
+
+async def handle_chat_stream(request):
+    """줄 단위 JSON(NDJSON)으로 context -> token... -> done 이벤트를 스트리밍"""
+    session_id, question = await _parse_request(request)
+    app = request.app
+    try:
+        async with app["admission"].admit(session_id):
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            async for event, payload in run_turn(app["conversation"], session_id, question):
+                data = serialize_documents(payload) if event == "context" else payload
+                await response.write((json.dumps({"type": event, "data": data}, ensure_ascii=False) + "\n").encode("utf-8"))
+            await response.write_eof()
+            return response
+    except Overloaded as e:
+        return web.json_response({"error": str(e)}, status=e.status, headers={"Retry-After": "1"})
+
+
+async def handle_websocket(request):
+    """WebSocket: {"session_id", "input"} 메시지마다 context/token/done 이벤트를 보낸다"""
+    app = request.app
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+    app["websockets"].add(ws)
+    try:
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            try:
+                body = json.loads(message.data)
+                session_id, question = str(body["session_id"]), str(body["input"])
+            except (json.JSONDecodeError, KeyError, TypeError):
+                await ws.send_json({"type": "error", "data": "session_id와 input이 필요합니다."})
+                continue
+            try:
+                async with app["admission"].admit(session_id):
+                    async for event, payload in run_turn(app["conversation"], session_id, question):
+                        data = serialize_documents(payload) if event == "context" else payload
+                        await ws.send_json({"type": event, "data": data})
+            except Overloaded as e:
+                await ws.send_json({"type": "error", "status": e.status, "data": str(e)})
+    finally:
+        app["websockets"].discard(ws)
+    return ws
+
+
+async def handle_health(request):
+    app = request.app
+    status = 503 if app["admission"].draining or app["conversation"] is None else 200
+    return web.json_response({"ready": status == 200, **app["admission"].stats()}, status=status)
+
+
+async def handle_metrics(request):
+    # 단계별 지연 시간(p50/p95/p99)과 토큰/후보/캐시 적중 카운터 (Prometheus 텍스트 형식)
+    return web.Response(text=tracer.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+
+def create_app(conversation=None, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE,
+               request_timeout=REQUEST_TIMEOUT):
+    """aiohttp 앱 생성. conversation을 넘기지 않으면 시작 시 공유 리소스에서 대화 체인을 로드한다."""
+    app = web.Application()
+    app["conversation"] = conversation
+    app["request_timeout"] = request_timeout
+    app["websockets"] = set()
+
+    async def on_startup(app):
+        app["admission"] = AdmissionController(max_concurrency, max_queue)
+        if app["conversation"] is None:
+            # 모델 로딩은 블로킹 작업이므로 스레드에서 실행
+            app["conversation"] = await asyncio.get_running_loop().run_in_executor(None, get_conversation)
+
+    async def on_shutdown(app):
+        # 새 요청을 막고 처리 중인 턴이 끝나길 기다린 뒤 WebSocket 종료
+        await app["admission"].drain()
+        for ws in list(app["websockets"]):
+            await ws.close(code=1001, message=b"server shutdown")
+
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.router.add_post("/chat", handle_chat)
+    app.router.add_post("/chat/stream", handle_chat_stream)
+    app.router.add_get("/ws", handle_websocket)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port, shutdown_timeout=SHUTDOWN_TIMEOUT)
@@ -0,0 +1,188 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+
+# 실행 중에 쌓이는 대화 기록/추적 로그를 두는 디렉터리 (작업 디렉터리에 파일을 흩어 놓지 않음)
+CHATBOT_DATA_DIR = os.getenv("CHATBOT_DATA_DIR", "data")
+
+# 세션 기록 설정 (환경 변수로 조정 가능)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join(CHATBOT_DATA_DIR, "chat_history.sqlite3"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1000"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+SUMMARY_MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "800"))
+
+HANGUL_PATTERN = re.compile(r"[가-힣]")
+
+
+def estimate_tokens(text):
+    """토크나이저 없이 쓰는 대략적인 토큰 수 (한글은 글자당 1토큰, 그 외는 4글자당 1토큰)"""
+    hangul = len(HANGUL_PATTERN.findall(text))
+    return hangul + (len(text) - hangul) // 4 + 1
+
+
+class SQLiteHistoryStore:
+    """세션별 메시지와 요약을 저장하는 SQLite 저장소"""
+
+    def __init__(self, path=SESSION_DB_PATH):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL, "
+                "role TEXT NOT NULL, content TEXT NOT NULL, created_at REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_session ON messages(session_id, id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "session_id TEXT PRIMARY KEY, summary TEXT NOT NULL, last_message_id INTEGER NOT NULL, "
+                "updated_at REAL NOT NULL)")
+
+    def load(self, session_id):
+        """(요약, 요약 이후의 [(id, message)]) 반환"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary, last_message_id FROM summaries WHERE session_id = ?", (session_id,)).fetchone()
+            summary, last_id = row if row else ("", 0)
+            rows = self._conn.execute(
+                "SELECT id, role, content FROM messages WHERE session_id = ? AND id > ? ORDER BY id",
+                (session_id, last_id)).fetchall()
+        return summary, [(message_id, _to_message(role, content)) for message_id, role, content in rows]
+
+    def append(self, session_id, messages):
+        now = time.time()
+        ids = []
+        with self._lock, self._conn:
+            for message in messages:
+                cursor = self._conn.execute(
+                    "INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                    (session_id, message.type, message.content, now))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def save_summary(self, session_id, summary, last_message_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO summaries (session_id, summary, last_message_id, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET summary = excluded.summary, "
+                "last_message_id = excluded.last_message_id, updated_at = excluded.updated_at",
+                (session_id, summary, last_message_id, time.time()))
+
+    def clear(self, session_id):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+            self._conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+
+
+def _to_message(role, content):
+    if role == "human":
+        return HumanMessage(content=content)
+    if role == "system":
+        return SystemMessage(content=content)
+    return AIMessage(content=content)
+
+
+def truncate_summary(previous_summary, messages):
+    """LLM 없이 쓰는 기본 요약: 이전 요약 뒤에 사용자 질문을 이어 붙이고 최근 내용 위주로 자른다"""
+    questions = [message.content for message in messages if message.type == "human"]
+    summary = " / ".join(filter(None, [previous_summary] + questions))
+    return summary[-SUMMARY_MAX_CHARS:]
+
+
+class BoundedChatMessageHistory(BaseChatMessageHistory):
+    """토큰 예산 안에서 최근 대화만 유지하고, 오래된 턴은 요약으로 압축하는 대화 기록
+
+    messages는 [요약(SystemMessage)] + 최근 메시지를 반환하므로, 대화가 길어져도 프롬프트 크기가 제한된다.
+    모든 메시지는 SQLite에 저장되어 프로세스가 재시작되어도 이어서 대화할 수 있다.
+    """
+
+    def __init__(self, session_id, store, summarizer=None, token_budget=HISTORY_TOKEN_BUDGET,
+                 token_counter=estimate_tokens):
+        self.session_id = session_id
+        self.store = store
+        self.summarizer = summarizer or truncate_summary
+        self.token_budget = token_budget
+        self.token_counter = token_counter
+        self.summary, self.window = store.load(session_id)
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self):
+        recent = [message for _, message in self.window]
+        if self.summary:
+            return [SystemMessage(content=f"이전 대화 요약: {self.summary}")] + recent
+        return recent
+
+    def add_messages(self, messages):
+        with self._lock:
+            ids = self.store.append(self.session_id, messages)
+            self.window.extend(zip(ids, messages))
+            self._compact()
+
+    def _window_tokens(self):
+        return sum(self.token_counter(message.content) for _, message in self.window)
+
+    def _compact(self):
+        if self._window_tokens() + self.token_counter(self.summary) <= self.token_budget:
+            return
+        # 예산의 절반 이하가 될 때까지 오래된 메시지를 요약으로 옮김 (최근 한 턴은 항상 유지)
+        old = []
+        while len(self.window) > 2 and self._window_tokens() > self.token_budget // 2:
+            old.append(self.window.pop(0))
+        if not old:
+            return
+        try:
+            summary = self.summarizer(self.summary, [message for _, message in old])
+        except Exception as e:
+            print(f"대화 요약 실패, 기본 요약 사용: {e}")
+            summary = truncate_summary(self.summary, [message for _, message in old])
+        self.summary = summary[-SUMMARY_MAX_CHARS:]
+        self.store.save_summary(self.session_id, self.summary, old[-1][0])
+
+    def clear(self):
+        with self._lock:
+            self.store.clear(self.session_id)
+            self.summary, self.window = "", []
+
+
+class SessionHistoryManager:
+    """세션 ID별 대화 기록을 LRU/TTL 메모리 계층에 두고, 없으면 SQLite에서 불러온다"""
+
+    def __init__(self, db_path=SESSION_DB_PATH, max_sessions=SESSION_CACHE_SIZE, ttl=SESSION_TTL, **history_kwargs):
+        self.store = SQLiteHistoryStore(db_path)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.history_kwargs = history_kwargs
+        self.sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.time()
+        with self._lock:
+            # 오래 사용되지 않은 세션은 메모리에서 제거 (SQLite에는 남아 있음)
+            while self.sessions:
+                oldest_id, (_, last_access) = next(iter(self.sessions.items()))
+                if now - last_access <= self.ttl:
+                    break
+                del self.sessions[oldest_id]
+
+            if session_id in self.sessions:
+                history, _ = self.sessions.pop(session_id)
+            else:
+                history = BoundedChatMessageHistory(session_id, self.store, **self.history_kwargs)
+            self.sessions[session_id] = (history, now)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return history
+
+    def __len__(self):
+        return len(self.sessions)
@@ -2,13 +2,15 @@ import os
 from dotenv import load_dotenv
 import streamlit as st
 from datetime import datetime
-from chatbot_logic import initialize_conversation, initialize_pinecone
+from uuid import uuid4
+from chatbot_logic import get_conversation, warm_up, is_ready, stream_conversation
+from tracing import tracer
 
 # .env 파일에서 환경 변수 로드
 load_dotenv()
 
-# 앱 로드 시 캐시 삭제
-st.cache_data.clear()
+# 무거운 구성요소는 프로세스당 한 번만 백그라운드에서 로드 (모든 세션이 공유)
+warm_up()
 
 # 필요한 환경 변수 불러오기
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
@@ -22,16 +24,31 @@ st.divider()
 st.sidebar.title("Settings")
 st.sidebar.subheader("옵션")
 st.sidebar.checkbox("참조된 문서 확인하기", key="show_docs")
-
-# 모델 로딩 진행 상황 표시
-with st.spinner("모델을 로딩 중입니다... 잠시만 기다려 주세요."):
-    # Pinecone 설정 및 초기화
-    if 'vectorstore' not in st.session_state:
-        st.session_state.vectorstore = initialize_pinecone()
-
-    # 대화 초기화
-    if 'conversation' not in st.session_state:
-        st.session_state.conversation = initialize_conversation(st.session_state.vectorstore)
+st.sidebar.checkbox("단계별 응답 시간 보기", key="show_trace")
+
+# 화면은 바로 그리고 모델은 백그라운드에서 계속 로드 (첫 질문 때까지 로드가 끝나지 않았으면 그때 기다림)
+if is_ready():
+    st.sidebar.success("모델 준비 완료")
+else:
+    st.sidebar.info("모델을 백그라운드에서 로딩 중입니다. 바로 질문을 입력하셔도 됩니다.")
+
+# 브라우저 세션마다 고유한 대화 세션 ID 발급 (대화 기록은 이 ID로 구분되어 저장됨)
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = str(uuid4())
+
+# 마지막 답변의 단계별 소요 시간, 토큰 수, 검색 후보 수 (tracing.py에서 기록)
+if st.session_state.show_trace:
+    trace = tracer.last(st.session_state['session_id'])
+    if trace is None:
+        st.sidebar.caption("아직 답변 기록이 없습니다.")
+    else:
+        rows = "\n".join(f"| {stage} | {seconds * 1000:.0f} |" for stage, seconds in trace["stages"].items())
+        st.sidebar.markdown(f"| 단계 | ms |\n|---|---:|\n{rows}\n| **첫 토큰** | {trace['ttft'] * 1000:.0f} |\n"
+                            f"| **전체** | {trace['total'] * 1000:.0f} |")
+        st.sidebar.caption(f"토큰: 입력 {trace['tokens']['prompt']} / 출력 {trace['tokens']['completion']} · "
+                           f"후보 {trace['candidates'] or 0}개 → 리랭크 {trace['reranked'] or 0}개 · "
+                           f"캐시 {'적중' if trace['cache_hit'] else '미적중'}"
+                           + (" · 카드 표에서 답변" if trace.get("table_hit") else ""))
 
 # 대화 기록 초기화
 if 'messages' not in st.session_state:
@@ -80,6 +97,9 @@ def send_message():
             st.markdown(display_message("user", user_input, timestamp), unsafe_allow_html=True)
 
         with input_container:
+            if not is_ready():
+                with st.spinner("모델을 로딩 중입니다... 잠시만 기다려 주세요."):
+                    get_conversation()
             with st.spinner("답변 생성 중..."):
                 # 대화 입력 데이터를 구성합니다.
                 input_data = {
@@ -88,25 +108,34 @@ def send_message():
 
                 # 구성 가능한 설정을 추가합니다.
                 config = {
-                    "configurable": {"session_id": "session123"}  # 예시 세션 ID 사용
+                    "configurable": {"session_id": st.session_state['session_id']}  # 사용자별 세션 ID 사용
                 }
 
                 try:
-                    # invoke 호출
-                    result = st.session_state.conversation.invoke(input_data, config)
+                    # 답변 말풍선을 먼저 만들어 두고, 토큰이 도착할 때마다 내용을 갱신
+                    with chat_container:
+                        placeholder = st.empty()
 
-                    # LLM의 응답 추출 (마크다운 지원)
-                    full_response = result.get("answer", "죄송합니다. 답변을 생성할 수 없습니다.")
+                    full_response = ""
+                    context_docs = []
                     response_timestamp = datetime.now().strftime('%p %I:%M')
+                    for event, payload in stream_conversation(get_conversation(), input_data, config):
+                        if event == "context":
+                            context_docs = payload
+                        elif event == "token":
+                            full_response += payload
+                            placeholder.markdown(display_message("assistant", full_response + " ▌", response_timestamp), unsafe_allow_html=True)
+
+                    # LLM의 응답 추출 (마크다운 지원)
+                    full_response = full_response or "죄송합니다. 답변을 생성할 수 없습니다."
                     st.session_state['messages'].append({"role": "assistant", "content": full_response, "timestamp": response_timestamp})
 
-                    # 봇의 응답을 출력
-                    with chat_container:
-                        st.markdown(display_message("assistant", full_response, response_timestamp), unsafe_allow_html=True)
+                    # 봇의 최종 응답을 출력
+                    placeholder.markdown(display_message("assistant", full_response, response_timestamp), unsafe_allow_html=True)
 
-                    if st.session_state.show_docs and result.get("context"):
+                    if st.session_state.show_docs and context_docs:
                         with st.expander("🔍 참조된 문서들"):
-                            for idx, doc in enumerate(result["context"]):
+                            for idx, doc in enumerate(context_docs):
                                 st.markdown(
                                     f"""
                                     <div style='padding: 10px; border: 1px solid #ddd; border-radius: 5px; margin-bottom: 10px;'>
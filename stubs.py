@@ -0,0 +1,191 @@
+import math
+import time
+import asyncio
+import random
+import hashlib
+import threading
+from typing import Any, Callable, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from session_store import estimate_tokens
+
+# 외부 API 없이 파이프라인을 테스트/벤치마크하기 위한 인프로세스 가짜 구현들
+
+
+class HashEmbeddings(Embeddings):
+    """문자 n-gram 해싱 기반의 결정적(deterministic) 임베딩
+
+    같은 텍스트는 항상 같은 벡터를 반환하고, 글자가 많이 겹치는 텍스트일수록 코사인 유사도가 높다.
+    """
+
+    def __init__(self, dimension=1536, ngram=2, latency=0.0):
+        self.dimension = dimension
+        self.ngram = ngram
+        self.latency = latency
+        self.calls = 0
+        self.embedded_texts = 0
+        self._lock = threading.Lock()
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimension
+        text = " ".join(text.split())
+        for i in range(max(1, len(text) - self.ngram + 1)):
+            gram = text[i:i + self.ngram]
+            digest = hashlib.md5(gram.encode("utf-8")).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            self.embedded_texts += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class InMemoryIndex:
+    """Pinecone Index의 upsert/delete/fetch 인터페이스를 흉내내는 가짜 인덱스
+
+    latency로 네트워크 왕복 지연을, fail_rate로 일시적 오류를 재현할 수 있다.
+    """
+
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.vectors = {}
+        self.upsert_calls = 0
+        self.delete_calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _maybe_fail(self):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failed = self._random.random() < self.fail_rate
+        if failed:
+            raise ConnectionError("일시적인 인덱스 오류 (stub)")
+
+    def upsert(self, vectors, namespace=None):
+        self._maybe_fail()
+        with self._lock:
+            self.upsert_calls += 1
+            for record in vectors:
+                self.vectors[record["id"]] = record
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids=None, namespace=None, delete_all=False):
+        self._maybe_fail()
+        with self._lock:
+            self.delete_calls += 1
+            if delete_all:
+                self.vectors.clear()
+            for vector_id in ids or []:
+                self.vectors.pop(vector_id, None)
+        return {}
+
+    def fetch(self, ids, namespace=None):
+        with self._lock:
+            return {"vectors": {i: self.vectors[i] for i in ids if i in self.vectors}}
+
+    def describe_index_stats(self):
+        with self._lock:
+            return {"total_vector_count": len(self.vectors)}
+
+
+class StubCrossEncoder:
+    """CrossEncoderScorer 대신 쓰는 가짜 채점기 (글자 bigram 겹침 비율, 쌍당 지연과 모델 메모리 재현)"""
+
+    def __init__(self, latency_per_pair=0.0, memory_mb=0):
+        self.latency_per_pair = latency_per_pair
+        self.scored_pairs = 0
+        # 모델 가중치 크기를 흉내내는 메모리 (메모리 사용량 부하 테스트용)
+        self.weights = bytearray(memory_mb * 1024 * 1024)
+        for i in range(0, len(self.weights), 4096):
+            self.weights[i] = 1
+
+    def score(self, pairs):
+        self.scored_pairs += len(pairs)
+        if self.latency_per_pair:
+            time.sleep(self.latency_per_pair * len(pairs))
+        scores = []
+        for query, text in pairs:
+            query_grams = {query[i:i + 2] for i in range(len(query) - 1)}
+            text_grams = {text[i:i + 2] for i in range(len(text) - 1)}
+            scores.append(len(query_grams & text_grams) / (len(query_grams) or 1))
+        return scores
+
+
+class StubChatModel(BaseChatModel):
+    """ChatOpenAI 대신 쓰는 가짜 채팅 모델
+
+    responder(messages)가 응답 텍스트를 만들며(기본: 고정 문장), latency는 첫 토큰까지의 지연,
+    prompt_token_latency는 입력 토큰당 추가되는 첫 토큰 지연(prefill), token_latency는 토큰(어절)당 지연을 재현한다.
+    스트리밍 시 어절 단위로 청크를 내보낸다.
+    """
+
+    responder: Optional[Callable] = None
+    response: str = "요청하신 카드 혜택 정보를 정리해 드리겠습니다."
+    latency: float = 0.0
+    prompt_token_latency: float = 0.0
+    token_latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self):
+        return "stub-chat"
+
+    def _respond(self, messages):
+        self.calls += 1
+        return self.responder(messages) if self.responder else self.response
+
+    def _first_token_delay(self, messages):
+        if not self.prompt_token_latency:
+            return self.latency
+        prompt = "\n".join(str(message.content) for message in messages)
+        return self.latency + self.prompt_token_latency * estimate_tokens(prompt)
+
+    def _tokens(self, text):
+        words = text.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text = self._respond(messages)
+        time.sleep(self._first_token_delay(messages) + self.token_latency * len(self._tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text = self._respond(messages)
+        time.sleep(self._first_token_delay(messages))
+        for token in self._tokens(text):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        text = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay(messages) + self.token_latency * len(self._tokens(text)))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs: Any):
+        # 비동기 서버에서 이벤트 루프를 막지 않도록 asyncio.sleep으로 지연을 재현
+        text = self._respond(messages)
+        await asyncio.sleep(self._first_token_delay(messages))
+        for token in self._tokens(text):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
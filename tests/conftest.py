@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# 테스트가 저장소의 data/에 대화 기록(SQLite)과 트레이스를 남기지 않도록 임시 디렉터리를 씀
+# (모듈 상수로 경로를 읽으므로 테스트 모듈을 import하기 전에 설정)
+os.environ.setdefault("CHATBOT_DATA_DIR", tempfile.mkdtemp(prefix="chatbot-test-"))
@@ -0,0 +1,129 @@
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage
+
+from answer_cache import SemanticAnswerCache, entity_key
+from card_tables import CardTable
+from chatbot_logic import rag_chain
+from entity_index import EntityIndex
+from local_vectorstore import LocalVectorStore
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+
+
+class ConstantEmbeddings:
+    """모든 질문에 같은 벡터를 돌려주는 임베더 (유사도만으로는 질문을 구분할 수 없는 최악의 경우)"""
+
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+class TableEmbeddings:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def card_entities():
+    return EntityIndex.build([
+        {"company": "삼성카드", "card_name": "삼성카드 taptap O", "benefit": "카페"},
+        {"company": "신한카드", "card_name": "신한카드 Mr.Life", "benefit": "통신"},
+    ])
+
+
+def test_hit_and_miss_by_similarity():
+    embeddings = TableEmbeddings({"스타벅스 할인 카드": [1.0, 0.0], "스타벅스 할인 카드 알려줘": [0.99, 0.05],
+                                  "주유 할인 카드": [0.0, 1.0]})
+    cache = SemanticAnswerCache(embeddings, threshold=0.95)
+    assert cache.lookup("스타벅스 할인 카드") is None
+    cache.store("스타벅스 할인 카드", "답변", [], latency=1.0)
+
+    hit = cache.lookup("스타벅스 할인 카드 알려줘")
+    assert hit["answer"] == "답변"
+    assert cache.lookup("주유 할인 카드") is None
+    assert cache.metrics()["hits"] == 1
+    assert cache.metrics()["misses"] == 2
+    assert cache.metrics()["latency_saved_seconds"] == 1.0
+
+
+def test_index_version_change_invalidates_entries():
+    version = {"value": "v1"}
+    cache = SemanticAnswerCache(ConstantEmbeddings(), version_fn=lambda: version["value"])
+    cache.store("연회비 알려줘", "답변", [], latency=0.5)
+    assert cache.lookup("연회비 알려줘") is not None
+
+    version["value"] = "v2"
+    assert cache.lookup("연회비 알려줘") is None
+    assert cache.metrics()["invalidations"] == 1
+    assert cache.metrics()["entries"] == 0
+
+
+def test_ttl_and_size_eviction():
+    cache = SemanticAnswerCache(ConstantEmbeddings(), ttl=0.0, max_entries=1)
+    cache.store("a", "답변 a", [], latency=0.1)
+    cache.store("b", "답변 b", [], latency=0.1)
+    assert cache.metrics()["entries"] == 1
+    assert cache.lookup("b") is None
+
+
+def test_questions_about_different_cards_do_not_share_an_entry():
+    cache = SemanticAnswerCache(ConstantEmbeddings(), entity_fn=entity_key(card_entities()))
+    cache.store("삼성카드 taptap O 연회비", "taptap O 연회비는 10,000원입니다.", [], latency=1.0)
+
+    assert cache.lookup("신한카드 Mr.Life 연회비") is None
+    assert cache.lookup("삼성카드 taptap O 연회비 얼마야")["answer"] == "taptap O 연회비는 10,000원입니다."
+
+    cache.store("신한카드 Mr.Life 연회비", "Mr.Life 연회비는 15,000원입니다.", [], latency=1.0)
+    assert cache.lookup("신한카드 Mr.Life 연회비")["answer"] == "Mr.Life 연회비는 15,000원입니다."
+    assert cache.metrics()["entries"] == 2
+
+
+def test_without_entity_fn_similar_questions_share_an_entry():
+    cache = SemanticAnswerCache(ConstantEmbeddings())
+    cache.store("삼성카드 taptap O 연회비", "답변", [], latency=1.0)
+    assert cache.lookup("신한카드 Mr.Life 연회비") is not None
+    assert np.isclose(cache.lookup("아무 질문")["similarity"], 1.0)
+
+
+def test_questions_without_card_or_company_are_not_cached():
+    cache = SemanticAnswerCache(ConstantEmbeddings(), entity_fn=entity_key(card_entities()))
+    cache.store("연회비는 얼마나 되는지 궁금합니다", "답변", [], latency=1.0)
+    assert cache.metrics()["entries"] == 0
+    assert cache.lookup("연회비는 얼마나 되는지 궁금합니다") is None
+    assert cache.metrics()["skipped"] == 1
+    assert cache.metrics()["misses"] == 0
+
+
+def test_follow_ups_in_different_sessions_get_their_own_card():
+    entities = card_entities()
+    vectorstore = LocalVectorStore.from_texts(
+        ["삼성카드 taptap O 국내전용 10,000원", "신한카드 Mr.Life 국내전용 15,000원"], HashEmbeddings(dimension=64),
+        metadatas=[{"company": "삼성카드", "card_name": "삼성카드 taptap O", "benefit": "카페"},
+                   {"company": "신한카드", "card_name": "신한카드 Mr.Life", "benefit": "통신"}], ids=["a", "b"])
+
+    def respond(messages):
+        # 재구성 프롬프트면 앞 턴의 카드명을 붙여 독립 질문을 만듦
+        if messages[0].content.startswith("Given a chat history"):
+            return f"{messages[1].content.split(' 혜택')[0]} {messages[-1].content}"
+        return "답변"
+
+    cache = SemanticAnswerCache(ConstantEmbeddings(), entity_fn=entity_key(entities))
+    chain = rag_chain(vectorstore, cache, llm=StubChatModel(responder=respond), reranker_model=StubCrossEncoder(),
+                      card_table=CardTable([]))
+    follow_up = "전월실적 조건은 어떻게 되나요 자세히요"
+    outputs = {}
+    for session_id, card in (("a", "삼성카드 taptap O"), ("b", "신한카드 Mr.Life")):
+        history = [HumanMessage(content=f"{card} 혜택 알려줘"), AIMessage(content="답변")]
+        outputs[session_id] = chain.invoke({"input": follow_up, "chat_history": history},
+                                           {"configurable": {"session_id": session_id}})
+
+    assert outputs["b"]["standalone_question"] == f"신한카드 Mr.Life {follow_up}"
+    assert not outputs["b"]["cache_hit"]
+    assert cache.metrics()["entries"] == 2
+
+    # 대화 중에 재구성 없이 그대로 검색한 질문은 저장하지 않음
+    history = [HumanMessage(content="신한카드 Mr.Life 혜택 알려줘"), AIMessage(content="답변")]
+    output = chain.invoke({"input": "삼성카드 taptap O 연회비 알려줘", "chat_history": history},
+                          {"configurable": {"session_id": "b"}})
+    assert not output["cache_hit"]
+    assert cache.metrics()["entries"] == 2
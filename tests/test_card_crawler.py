@@ -0,0 +1,52 @@
+import os
+import json
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+
+pytest.importorskip("selenium")
+from selenium.common.exceptions import WebDriverException  # noqa: E402
+
+from card_crawler import crawl, create_driver  # noqa: E402
+
+FIXTURE_SITE = os.path.join(os.path.dirname(__file__), "fixtures", "card_site")
+
+
+@pytest.fixture
+def card_site():
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=FIXTURE_SITE)
+    handler.log_message = lambda *args: None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.fixture
+def browser_available():
+    try:
+        create_driver().quit()
+    except WebDriverException as e:
+        pytest.skip(f"headless Chrome을 실행할 수 없습니다: {e.msg}")
+
+
+def test_crawl_fixture_site(card_site, browser_available, tmp_path):
+    progress_path = str(tmp_path / "progress.jsonl")
+    output_files = crawl([0], workers=1, base_url=card_site, progress_path=progress_path,
+                         output_dir=str(tmp_path))
+
+    assert output_files == [str(tmp_path / "테스트카드_info.json")]
+    with open(output_files[0], encoding="utf-8") as f:
+        company = json.load(f)
+    assert company["card_company"] == "테스트카드"
+    assert company["cards"] == [
+        {"name": "테스트 카페 카드", "summary": "국내전용 10,000원 / 해외겸용 12,000원 전월실적 30만원 이상",
+         "benefits": {"카페": ["스타벅스 10% 할인 월 최대 5천원 할인"]}},
+        {"name": "테스트 주유 카드", "summary": "해외겸용 20,000원 전월실적 없음",
+         "benefits": {"주유": ["리터당 60원 할인 전월실적 조건 없음"]}},
+    ]
+    # 모두 성공했으므로 다음 실행은 처음부터 새로 크롤링
+    assert not os.path.exists(progress_path)
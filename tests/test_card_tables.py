@@ -0,0 +1,56 @@
+from card_tables import CardTable, extract_card_record
+
+
+def card_table():
+    cards = [
+        ("현대카드", {"name": "현대카드ZERO Edition3(할인형)", "summary": "국내전용 15,000원 / 해외겸용 15,000원 전월실적 없음",
+                   "benefits": {"할인": [], "카페": []}}),
+        ("현대카드", {"name": "현대카드ZERO Edition3(포인트형)", "summary": "국내전용 15,000원 / 해외겸용 20,000원 전월실적 없음",
+                   "benefits": {"포인트 적립": []}}),
+        ("삼성카드", {"name": "삼성카드 taptap O", "summary": "국내전용 10,000원 / 해외겸용 10,000원 전월실적 30만원 이상",
+                   "benefits": {"카페/디저트": [], "베이커리": [], "통신": []}}),
+    ]
+    return CardTable([extract_card_record(company, card) for company, card in cards])
+
+
+def test_extract_card_record():
+    record = card_table().by_card["삼성카드 taptap O"]
+    assert (record["domestic_fee"], record["overseas_fee"], record["monthly_spend"]) == (10000, 10000, 300000)
+
+
+def test_fee_lookup_for_named_card():
+    result = card_table().answer("삼성카드 taptap O 연회비 얼마야?")
+    assert "국내전용 10,000원" in result["answer"]
+    assert "전월실적" not in result["answer"]
+    assert result["context"][0].metadata["card_name"] == "삼성카드 taptap O"
+
+
+def test_ambiguous_alias_prefers_the_card_the_question_names():
+    table = card_table()
+    result = table.answer("현대카드 ZERO 할인형 연회비")
+    assert "비교" not in result["answer"]
+    assert [doc.metadata["card_name"] for doc in result["context"]] == ["현대카드ZERO Edition3(할인형)"]
+
+    # 종류를 말하지 않으면 두 카드를 비교
+    result = table.answer("현대카드 ZERO 연회비")
+    assert len(result["context"]) == 2
+
+
+def test_compare_named_cards():
+    result = card_table().answer("현대카드ZERO Edition3(포인트형)이랑 삼성카드 taptap O 비교해줘")
+    assert "비교입니다" in result["answer"]
+    assert len(result["context"]) == 2
+
+
+def test_search_title_lists_each_category_once():
+    result = card_table().answer("카페 혜택 있는 카드 중에 연회비 싼 카드")
+    title = result["answer"].splitlines()[0]
+    assert title.startswith("카페 혜택 조건에 맞는 카드는 2개입니다")
+    assert [doc.metadata["card_name"] for doc in result["context"]] == ["삼성카드 taptap O", "현대카드ZERO Edition3(할인형)"]
+
+
+def test_benefit_detail_questions_go_to_rag():
+    table = card_table()
+    assert table.answer("삼성카드 taptap O 카페 할인 혜택 자세히 알려줘") is None
+    assert table.answer("스타벅스 할인 카드 추천해줘") is None
+    assert CardTable([]).answer("삼성카드 taptap O 연회비") is None
@@ -0,0 +1,85 @@
+from langchain_core.documents import Document
+
+import card_chunker
+from card_chunker import ParentStore, expand_to_parents
+from context_assembly import assemble_context, deduplicate, select_within_budget
+from session_store import estimate_tokens
+
+SUMMARY = "삼성카드 taptap O 국내전용 10,000원 / 해외겸용 10,000원 전월실적 30만원 이상"
+
+
+def chunk(chunk_id, text, score, card="삼성카드 taptap O", benefit="카페", position=0, parent_id=None):
+    metadata = {"chunk_id": chunk_id, "company": "삼성카드", "card_name": card, "benefit": benefit,
+                "relevance_score": score, "position": position}
+    if parent_id:
+        metadata["parent_id"] = parent_id
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_selects_by_score_within_budget():
+    docs = [chunk("a", "가" * 30, 0.2, benefit="통신"), chunk("b", "나" * 30, 0.9), chunk("c", "다" * 30, 0.5, benefit="주유")]
+    selected = select_within_budget(docs, token_budget=70)
+    assert [doc.metadata["chunk_id"] for doc, _ in selected] == ["b", "c"]
+
+
+def test_skips_oversized_chunk_but_keeps_smaller_later_ones():
+    docs = [chunk("a", "가" * 10, 0.9), chunk("b", "나" * 100, 0.8, benefit="통신"),
+            chunk("c", "다" * 10, 0.7, benefit="주유")]
+    selected = select_within_budget(docs, token_budget=40)
+    assert [doc.metadata["chunk_id"] for doc, _ in selected] == ["a", "c"]
+
+
+def test_top_chunk_is_kept_even_over_budget():
+    selected = select_within_budget([chunk("a", "가" * 100, 0.9)], token_budget=10)
+    assert [doc.metadata["chunk_id"] for doc, _ in selected] == ["a"]
+
+
+def test_repeated_summary_line_is_charged_once_per_group():
+    first, second = f"{SUMMARY}\n" + "가" * 20, f"{SUMMARY}\n" + "나" * 20
+    budget = estimate_tokens(first) + estimate_tokens("나" * 20)
+    selected = select_within_budget([chunk("a", first, 0.9), chunk("b", second, 0.8, position=1)], token_budget=budget)
+    assert len(selected) == 2
+    assert selected[1][1] == ["나" * 20]
+
+
+def test_parent_summary_counts_toward_budget_once_per_card():
+    parents = ParentStore({"p1": {"summary": SUMMARY}})
+    docs = [chunk("a", "가" * 20, 0.9, parent_id="p1"), chunk("b", "나" * 20, 0.8, benefit="통신", parent_id="p1")]
+    budget = estimate_tokens(SUMMARY) + estimate_tokens("가" * 20) + estimate_tokens("나" * 20)
+    assert len(select_within_budget(docs, token_budget=budget, parent_store=parents)) == 2
+    assert len(select_within_budget(docs, token_budget=budget - 1, parent_store=parents)) == 1
+
+
+def test_summary_from_metadata_without_parent_store():
+    docs = [chunk("a", "가" * 20, 0.9, parent_id="p1"), chunk("b", "나" * 20, 0.8, benefit="통신", parent_id="p1")]
+    for doc in docs:
+        doc.metadata["card_summary"] = SUMMARY
+    budget = estimate_tokens(SUMMARY) + estimate_tokens("가" * 20) + estimate_tokens("나" * 20)
+    assert len(select_within_budget(docs, token_budget=budget - 1)) == 1
+
+    expanded = expand_to_parents(docs, None)
+    assert len(expanded) == 1
+    assert expanded[0].page_content.startswith(SUMMARY + "\n")
+    assert "card_summary" not in expanded[0].metadata
+
+
+def test_warns_when_card_summary_is_missing(monkeypatch, capsys):
+    monkeypatch.setattr(card_chunker, "_warned_missing_parents", False)
+    docs = [chunk("a", "가" * 20, 0.9, parent_id="p1")]
+    assert expand_to_parents(docs, None) == docs
+    assert "카드 요약을 찾을 수 없습니다" in capsys.readouterr().out
+    expand_to_parents(docs, None)
+    assert capsys.readouterr().out == ""
+
+
+def test_deduplicate_and_merge_overlapping_chunks():
+    text = "스타벅스 50% 결제일 할인, 일 1회 월 최대 1만원까지 할인됩니다. 전월실적 30만원 이상 시 제공."
+    first, second = text[:40], text[20:]
+    docs = [chunk("b", second, 0.8, position=1), chunk("a", first, 0.9, position=0), chunk("a", first, 0.7)]
+    assert [doc.metadata["chunk_id"] for doc in deduplicate(docs)] == ["b", "a"]
+
+    merged = assemble_context(docs, token_budget=1000)
+    assert len(merged) == 1
+    assert merged[0].page_content == text
+    assert merged[0].metadata["chunk_ids"] == ["a", "b"]
+    assert merged[0].metadata["relevance_score"] == 0.9
@@ -0,0 +1,25 @@
+import os
+
+from crawl_progress import CrawlProgress
+
+
+def test_progress_is_keyed_by_card_link(tmp_path):
+    path = str(tmp_path / "progress.jsonl")
+    progress = CrawlProgress(path)
+    progress.add(0, "테스트카드", "/card/detail/101", {"name": "A"})
+
+    resumed = CrawlProgress(path)
+    assert resumed.get(0, "/card/detail/101") == {"name": "A"}
+    # 순위가 바뀌어 다른 카드가 같은 자리에 와도 건너뛰지 않음
+    assert resumed.get(0, "/card/detail/102") is None
+
+
+def test_progress_ignores_stale_records_and_is_cleared(tmp_path):
+    path = str(tmp_path / "progress.jsonl")
+    CrawlProgress(path).add(0, "테스트카드", "/card/detail/101", {"name": "A"})
+    assert CrawlProgress(path, ttl=-1).get(0, "/card/detail/101") is None
+
+    progress = CrawlProgress(path)
+    progress.clear()
+    assert not os.path.exists(path)
+    assert CrawlProgress(path).get(0, "/card/detail/101") is None
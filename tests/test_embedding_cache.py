@@ -0,0 +1,77 @@
+import os
+import json
+
+from embedding_cache import CachedEmbeddings, DiskVectorStore
+from stubs import HashEmbeddings
+
+
+def test_query_misses_are_flushed_in_batches(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    embeddings = CachedEmbeddings(HashEmbeddings(dimension=8), "stub", cache_dir=cache_dir, flush_every=4)
+    for i in range(3):
+        embeddings.embed_query(f"질문 {i}")
+    journal = os.path.join(cache_dir, "index.log")
+    assert os.path.getsize(journal) == 0
+
+    embeddings.embed_query("질문 3")
+    with open(journal, encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 4
+    with open(os.path.join(cache_dir, "index.json"), encoding="utf-8") as f:
+        # 새 항목은 로그에만 덧붙고 index.json은 다시 쓰지 않음
+        assert json.load(f)["entries"] == []
+    embeddings.close()
+
+
+def test_reload_replays_journal_and_evictions(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    store = DiskVectorStore(cache_dir, max_entries=2)
+    store.put("a", [1.0, 0.0])
+    store.put("b", [0.0, 1.0])
+    store.flush()
+    store.put("c", [1.0, 1.0])  # 가장 오래된 "a"의 슬롯을 재사용
+    store.flush()
+    store._lock_file.close()  # 종료 시 합치기 없이 중단된 경우
+
+    reloaded = DiskVectorStore(cache_dir, max_entries=2)
+    assert set(reloaded.slots) == {"b", "c"}
+    assert reloaded.get("c").tolist() == [1.0, 1.0]
+    assert reloaded.get("a") is None
+    reloaded.close()
+
+
+def test_unflushed_eviction_does_not_map_old_key_to_new_vector(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    store = DiskVectorStore(cache_dir, max_entries=2)
+    store.put("a", [1.0, 0.0])
+    store.put("b", [0.0, 1.0])
+    store.flush()
+    store.put("c", [1.0, 1.0])  # "a"의 슬롯을 재사용하고 flush 전에 비정상 종료
+    store._matrix.flush()
+    store._lock_file.close()
+
+    reloaded = DiskVectorStore(cache_dir, max_entries=2)
+    assert reloaded.get("a") is None
+    assert reloaded.get("b").tolist() == [0.0, 1.0]
+    assert reloaded.get("c") is None
+    reloaded.close()
+
+
+def test_second_process_uses_its_own_directory(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    first = CachedEmbeddings(HashEmbeddings(dimension=8), "stub", cache_dir=cache_dir)
+    second = CachedEmbeddings(HashEmbeddings(dimension=8), "stub", cache_dir=cache_dir)
+    assert first.store.cache_dir == cache_dir
+    assert second.store.cache_dir != cache_dir
+    second.close()
+    first.close()
+
+    # 잠금이 풀리면 다시 같은 디렉터리를 쓰고, 저장된 임베딩을 재사용
+    underlying = HashEmbeddings(dimension=8)
+    third = CachedEmbeddings(underlying, "stub", cache_dir=cache_dir)
+    assert third.store.cache_dir == cache_dir
+    third.embed_query("질문")
+    third.close()
+    fourth = CachedEmbeddings(underlying, "stub", cache_dir=cache_dir)
+    fourth.embed_query("질문")
+    assert underlying.calls == 1
+    fourth.close()
@@ -0,0 +1,34 @@
+from entity_index import EntityIndex, EntityFilteredRetriever
+from local_vectorstore import LocalVectorStore
+from stubs import HashEmbeddings
+
+CHUNKS = [
+    ("삼성카드 taptap O 생활 혜택: 스타벅스 커피 50% 결제일 할인", "삼성카드", "삼성카드 taptap O", "생활"),
+    ("삼성카드 taptap O 카페/디저트 혜택: 베이커리 10% 할인", "삼성카드", "삼성카드 taptap O", "카페/디저트"),
+    ("신한카드 Mr.Life 카페 혜택: 커피 전문점 10% 할인", "신한카드", "신한카드 Mr.Life", "카페"),
+    ("신한카드 Mr.Life 통신 혜택: 통신요금 10% 할인", "신한카드", "신한카드 Mr.Life", "통신"),
+]
+
+
+def build():
+    metadatas = [{"company": company, "card_name": card, "benefit": benefit} for _, company, card, benefit in CHUNKS]
+    vectorstore = LocalVectorStore.from_texts([text for text, *_ in CHUNKS], HashEmbeddings(dimension=64),
+                                              metadatas=metadatas, ids=[str(i) for i in range(len(CHUNKS))])
+    return vectorstore, EntityIndex.build(metadatas)
+
+
+def test_filters_use_card_or_company_only():
+    _, entities = build()
+    assert entities.filters("삼성카드 taptap O 커피 할인") == [{"card_name": {"$in": ["삼성카드 taptap O"]}}, None]
+    assert entities.filters("신한카드 카페 할인 카드") == [{"company": {"$in": ["신한카드"]}}, None]
+    assert entities.filters("커피 할인 카드") == [None]
+
+
+def test_gold_chunk_outside_the_benefit_category_is_kept():
+    vectorstore, entities = build()
+    retriever = EntityFilteredRetriever(vectorstore=vectorstore, entity_index=entities, k=4, filtered_k=2)
+    docs = retriever.invoke("삼성카드 taptap O 커피 할인")
+    assert ("삼성카드 taptap O", "생활") in [(doc.metadata["card_name"], doc.metadata["benefit"]) for doc in docs]
+    # 필터에 맞는 카드의 후보가 다른 카드 후보보다 위에 옴
+    assert [doc.metadata["card_name"] for doc in docs[:2]] == ["삼성카드 taptap O"] * 2
+    assert retriever.stats()["filtered"] == 1
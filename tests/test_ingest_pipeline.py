@@ -0,0 +1,66 @@
+import json
+
+import pytest
+from langchain_core.documents import Document
+
+from ingest_pipeline import chunk_id, assign_chunk_ids, ingest_documents, load_index_version, UntrackedIndexError
+from stubs import HashEmbeddings, InMemoryIndex
+
+
+def make_doc(text, card_name="카드A", benefit="카페"):
+    return Document(page_content=text, metadata={"company": "삼성카드", "card_name": card_name, "benefit": benefit})
+
+
+def ingest(docs, index, manifest_path, **kwargs):
+    return ingest_documents(docs, HashEmbeddings(dimension=8), index, batch_size=2, max_workers=2,
+                            manifest_path=str(manifest_path), show_progress=False, **kwargs)
+
+
+def test_chunk_id_depends_on_content_and_metadata():
+    assert chunk_id(make_doc("스타벅스 10% 할인")) == chunk_id(make_doc("스타벅스 10% 할인"))
+    assert chunk_id(make_doc("스타벅스 10% 할인")) != chunk_id(make_doc("스타벅스 20% 할인"))
+    assert chunk_id(make_doc("스타벅스 10% 할인")) != chunk_id(make_doc("스타벅스 10% 할인", card_name="카드B"))
+
+
+def test_assign_chunk_ids_drops_exact_duplicates():
+    docs = assign_chunk_ids([make_doc("a"), make_doc("a"), make_doc("b")])
+    assert [doc.page_content for doc in docs] == ["a", "b"]
+    assert all(doc.metadata["chunk_id"] == chunk_id(doc) for doc in docs)
+
+
+def test_reingest_upserts_only_changed_chunks_and_deletes_stale(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    index = InMemoryIndex()
+    first = ingest([make_doc("a"), make_doc("b"), make_doc("c")], index, manifest_path)
+    assert first.upserted_chunks == 3
+    version = load_index_version(str(manifest_path))
+
+    second = ingest([make_doc("a"), make_doc("b"), make_doc("c2")], index, manifest_path)
+    assert (second.upserted_chunks, second.skipped_chunks, second.deleted_chunks) == (1, 2, 1)
+    assert set(index.vectors) == {chunk_id(make_doc(text)) for text in ("a", "b", "c2")}
+    assert set(json.loads(manifest_path.read_text())["ids"]) == set(index.vectors)
+    assert load_index_version(str(manifest_path)) != version
+
+    third = ingest([make_doc("a"), make_doc("b"), make_doc("c2")], index, manifest_path)
+    assert (third.upserted_chunks, third.deleted_chunks) == (0, 0)
+    assert third.index_version == second.index_version
+
+
+def test_missing_manifest_with_existing_vectors_fails_loudly(tmp_path):
+    index = InMemoryIndex()
+    index.upsert([{"id": "legacy-uuid", "values": [0.0] * 8, "metadata": {}}])
+    with pytest.raises(UntrackedIndexError):
+        ingest([make_doc("a")], index, tmp_path / "manifest.json")
+    assert set(index.vectors) == {"legacy-uuid"}
+
+
+def test_missing_manifest_reset_clears_namespace_once(tmp_path):
+    index = InMemoryIndex()
+    index.upsert([{"id": "legacy-uuid", "values": [0.0] * 8, "metadata": {}}])
+    stats = ingest([make_doc("a"), make_doc("b")], index, tmp_path / "manifest.json", reset_untracked=True)
+    assert set(index.vectors) == {chunk_id(make_doc("a")), chunk_id(make_doc("b"))}
+    assert stats.deleted_chunks == 1
+
+    # 매니페스트가 생겼으므로 다음 실행은 초기화 없이 증분 적재
+    stats = ingest([make_doc("a"), make_doc("b")], index, tmp_path / "manifest.json")
+    assert (stats.upserted_chunks, stats.deleted_chunks) == (0, 0)
@@ -0,0 +1,37 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from query_router import needs_reformulation, same_question
+
+HISTORY = [HumanMessage(content="삼성카드 taptap O 혜택 알려줘"), AIMessage(content="카페, 통신 할인이 있습니다.")]
+
+
+@pytest.mark.parametrize("question", [
+    "연회비는 얼마나 되는지 궁금합니다",
+    "전월실적 조건은 어떻게 되나요 자세히요",
+    "해외에서 결제할 때도 할인이 적용되는지 알려주세요",
+    "연회비는?",
+    "그 카드 전월실적은?",
+    "그럼 주유 할인은 얼마나 돼?",
+])
+def test_follow_up_without_entity_is_rewritten(question):
+    assert needs_reformulation(question, HISTORY)
+
+
+@pytest.mark.parametrize("question", [
+    "신한카드 Mr.Life 연회비는 얼마나 되는지 궁금합니다",
+    "공항 라운지 무료 카드 추천해줘",
+    "스타벅스 할인 되는 카드 있어?",
+    "공항 라운지 무료 이용 가능한 카드는 뭐가 있어?",
+])
+def test_question_with_explicit_target_is_searched_as_is(question):
+    assert not needs_reformulation(question, HISTORY)
+
+
+def test_first_turn_is_never_rewritten():
+    assert not needs_reformulation("연회비는 얼마나 되는지 궁금합니다", [])
+
+
+def test_same_question_ignores_spacing_and_punctuation():
+    assert same_question("연회비는 얼마야?", "연회비는얼마야")
+    assert not same_question("연회비는 얼마야?", "삼성카드 taptap O 연회비는 얼마야?")
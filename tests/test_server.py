@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import server
+from chatbot_logic import get_session_history, initialize_conversation
+from local_vectorstore import LocalVectorStore
+from resources import registry
+from server import AdmissionController, Overloaded, create_app
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+
+
+def test_admission_rejects_when_queue_is_full():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold(session_id):
+            async with admission.admit(session_id):
+                await release.wait()
+
+        running = asyncio.create_task(hold("a"))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold("b"))
+        await asyncio.sleep(0)
+        assert admission.stats()["active"] == 1 and admission.stats()["waiting"] == 1
+
+        with pytest.raises(Overloaded) as excinfo:
+            async with admission.admit("c"):
+                pass
+        assert excinfo.value.status == 429
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert admission.stats()["active"] == 0 and admission.stats()["waiting"] == 0
+        assert admission.rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_admission_rejects_while_draining():
+    async def scenario():
+        admission = AdmissionController(max_concurrency=1, max_queue=1)
+        await admission.drain(timeout=0.1)
+        with pytest.raises(Overloaded) as excinfo:
+            async with admission.admit("a"):
+                pass
+        assert excinfo.value.status == 503
+
+    asyncio.run(scenario())
+
+
+async def post_chat(app, payload):
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post("/chat", json=payload)
+        return response.status, app["admission"].stats()
+
+
+def test_chat_rejects_non_object_body():
+    app = create_app(conversation=object())
+    status, _ = asyncio.run(post_chat(app, ["session_id", "input"]))
+    assert status == 400
+
+
+def test_chat_timeout_returns_504_and_releases_slot(monkeypatch):
+    async def slow_turn(conversation, session_id, question):
+        await asyncio.sleep(10)
+        yield "token", "늦은 답변"
+
+    monkeypatch.setattr(server, "run_turn", slow_turn)
+    app = create_app(conversation=object(), max_concurrency=1, max_queue=1, request_timeout=0.05)
+    status, stats = asyncio.run(post_chat(app, {"session_id": "s1", "input": "연회비 얼마야?"}))
+    assert status == 504
+    assert stats["active"] == 0 and stats["waiting"] == 0
+    assert not app["admission"]._session_locks
+
+
+def test_concurrent_turns_in_one_session_run_the_real_chain():
+    vectorstore = LocalVectorStore.from_texts(
+        ["삼성카드 taptap O 카페 스타벅스 50% 할인", "신한카드 Mr.Life 통신 요금 10% 할인"], HashEmbeddings(dimension=64),
+        metadatas=[{"company": "삼성카드", "card_name": "삼성카드 taptap O", "benefit": "카페"},
+                   {"company": "신한카드", "card_name": "신한카드 Mr.Life", "benefit": "통신"}], ids=["a", "b"])
+    # 답변에 질문을 담아 어느 턴의 답변인지 확인
+    llm = StubChatModel(responder=lambda messages: f"답변: {messages[-1].content}", latency=0.05)
+    questions = ["삼성카드 taptap O 카페 할인 혜택 자세히 알려줘", "신한카드 Mr.Life 통신 할인 혜택 자세히 알려줘"]
+
+    async def scenario(app):
+        async with TestClient(TestServer(app)) as client:
+            async def ask(question):
+                response = await client.post("/chat", json={"session_id": "concurrent", "input": question})
+                return response.status, await response.json()
+            return await asyncio.gather(*(ask(question) for question in questions))
+
+    try:
+        conversation = initialize_conversation(vectorstore, llm=llm, reranker_model=StubCrossEncoder(),
+                                               use_answer_cache=False)
+        results = asyncio.run(scenario(create_app(conversation=conversation)))
+        messages = get_session_history("concurrent").messages
+    finally:
+        registry.register("summary_llm", lambda: registry.get("llm"))
+        registry.clear()
+
+    for question, (status, body) in zip(questions, results):
+        assert status == 200
+        assert body["answer"] == f"답변: {question}"
+        assert body["context"]
+    # 같은 세션의 턴은 차례로 실행되어 질문/답변이 섞이지 않고 쌍으로 기록됨
+    assert len(messages) == 4
+    for human, ai in zip(messages[::2], messages[1::2]):
+        assert (human.type, ai.type) == ("human", "ai")
+        assert ai.content == f"답변: {human.content}"
+    assert {message.content for message in messages[::2]} == set(questions)
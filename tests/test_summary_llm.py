@@ -0,0 +1,25 @@
+from langchain_core.messages import AIMessage, HumanMessage
+
+from chatbot_logic import initialize_conversation, summarize_history
+from local_vectorstore import LocalVectorStore
+from resources import registry
+from stubs import HashEmbeddings, StubChatModel, StubCrossEncoder
+
+
+def test_summary_uses_injected_llm():
+    vectorstore = LocalVectorStore.from_texts(["삼성카드 taptap O 카페 할인"], HashEmbeddings(dimension=16),
+                                              metadatas=[{"company": "삼성카드", "card_name": "삼성카드 taptap O",
+                                                          "benefit": "카페"}], ids=["c1"])
+    llm = StubChatModel(response="이전 대화 요약")
+    try:
+        initialize_conversation(vectorstore, llm=llm, reranker_model=StubCrossEncoder(), use_answer_cache=False)
+        summary = summarize_history("", [HumanMessage(content="taptap O 혜택 알려줘"), AIMessage(content="카페 할인")])
+        # 요약 때문에 실제 ChatOpenAI("llm")를 만들지 않음
+        real_llm_loaded = registry.is_loaded("llm")
+    finally:
+        registry.register("summary_llm", lambda: registry.get("llm"))
+        registry.clear()
+
+    assert summary == "이전 대화 요약"
+    assert llm.calls == 1
+    assert not real_llm_loaded
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import RunnableLambda
+
+from session_store import estimate_tokens, CHATBOT_DATA_DIR
+
+# 단계별 추적 설정 (환경 변수로 조정 가능)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# 턴마다 추적 결과를 한 줄씩 남기는 JSONL 파일 (빈 문자열이면 파일로 남기지 않음)
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", os.path.join(CHATBOT_DATA_DIR, "traces.jsonl"))
+# 백분위수 계산에 쓰는 단계별 최근 측정값 개수
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "1000"))
+
+# rag_chain에서 run_name으로 구분하는 단계 (중첩된 경우 가장 바깥 단계에만 시간을 기록)
+TRACED_STAGES = ("rewrite", "speculative_retrieve", "table_lookup", "cache_lookup", "retrieve", "rerank", "assemble_context",
+                 "expand_parents", "reorder", "generate")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Tracer:
+    """턴별 추적 결과를 모아 단계별 p50/p95/p99를 계산하고 Prometheus 텍스트/JSONL로 내보낸다"""
+
+    def __init__(self, log_path=TRACE_LOG_PATH, window=TRACE_WINDOW, max_sessions=1000):
+        self.log_path = log_path
+        self.window = window
+        self.max_sessions = max_sessions
+        self._samples = {}
+        self._sums = {}
+        self._counts = {}
+        self.counters = {"turns": 0, "cache_hits": 0, "table_hits": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                         "candidates": 0}
+        self._last = OrderedDict()
+        self._lock = threading.Lock()
+
+    def handler(self):
+        """체인에 붙일 콜백 핸들러 (동시에 실행되는 여러 턴을 run_id로 구분)"""
+        return StageTraceHandler(self)
+
+    def _observe(self, name, seconds):
+        if name not in self._samples:
+            self._samples[name] = deque(maxlen=self.window)
+            self._sums[name] = 0.0
+            self._counts[name] = 0
+        self._samples[name].append(seconds)
+        self._sums[name] += seconds
+        self._counts[name] += 1
+
+    def record(self, trace):
+        with self._lock:
+            for stage, seconds in trace["stages"].items():
+                self._observe(stage, seconds)
+            self._observe("ttft", trace["ttft"])
+            self._observe("total", trace["total"])
+            self.counters["turns"] += 1
+            self.counters["cache_hits"] += bool(trace["cache_hit"])
+            self.counters["table_hits"] += bool(trace.get("table_hit"))
+            self.counters["prompt_tokens"] += trace["tokens"]["prompt"]
+            self.counters["completion_tokens"] += trace["tokens"]["completion"]
+            self.counters["candidates"] += trace["candidates"] or 0
+
+            # 세션별 마지막 턴 (Streamlit 사이드바 표시용)
+            self._last[trace["session_id"]] = trace
+            self._last.move_to_end(trace["session_id"])
+            while len(self._last) > self.max_sessions:
+                self._last.popitem(last=False)
+
+            if self.log_path:
+                if os.path.dirname(self.log_path):
+                    os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace, ensure_ascii=False) + "\n")
+
+    def last(self, session_id):
+        with self._lock:
+            return self._last.get(session_id)
+
+    def summary(self):
+        """{단계: {"p50", "p95", "p99", "count"}} (초 단위, 최근 window개 기준)"""
+        with self._lock:
+            return {name: {**{f"p{int(q * 100)}": float(np.percentile(samples, q * 100)) for q in QUANTILES},
+                           "count": self._counts[name]}
+                    for name, samples in self._samples.items()}
+
+    def prometheus_text(self):
+        """Prometheus 텍스트 형식 (summary + counter)"""
+        with self._lock:
+            lines = ["# HELP rag_stage_duration_seconds RAG chain stage latency (quantiles over recent turns)",
+                     "# TYPE rag_stage_duration_seconds summary"]
+            for name, samples in self._samples.items():
+                for q in QUANTILES:
+                    lines.append(f'rag_stage_duration_seconds{{stage="{name}",quantile="{q}"}} '
+                                 f'{np.percentile(samples, q * 100):.6f}')
+                lines.append(f'rag_stage_duration_seconds_sum{{stage="{name}"}} {self._sums[name]:.6f}')
+                lines.append(f'rag_stage_duration_seconds_count{{stage="{name}"}} {self._counts[name]}')
+            counters = self.counters
+            lines += ["# HELP rag_turns_total Answered turns", "# TYPE rag_turns_total counter",
+                      f"rag_turns_total {counters['turns']}",
+                      "# HELP rag_cache_hits_total Turns answered from the answer cache",
+                      "# TYPE rag_cache_hits_total counter",
+                      f"rag_cache_hits_total {counters['cache_hits']}",
+                      "# HELP rag_table_hits_total Turns answered from the card table without the LLM",
+                      "# TYPE rag_table_hits_total counter",
+                      f"rag_table_hits_total {counters['table_hits']}",
+                      "# HELP rag_tokens_total LLM tokens", "# TYPE rag_tokens_total counter",
+                      f'rag_tokens_total{{type="prompt"}} {counters["prompt_tokens"]}',
+                      f'rag_tokens_total{{type="completion"}} {counters["completion_tokens"]}',
+                      "# HELP rag_retrieved_candidates_total Candidates passed to the reranker",
+                      "# TYPE rag_retrieved_candidates_total counter",
+                      f"rag_retrieved_candidates_total {counters['candidates']}"]
+            return "\n".join(lines) + "\n"
+
+
+class StageTraceHandler(BaseCallbackHandler):
+    """LangChain 콜백으로 rag_chain의 단계별 시간, 토큰 수, 후보 수, 캐시 적중 여부를 턴 단위로 기록
+
+    이 핸들러가 처음 보는 실행(부모를 모르는 실행)을 한 턴의 시작으로 보고, 그 실행이 끝나면 Tracer에 넘긴다.
+    """
+
+    # 비동기 실행에서도 스레드 풀을 거치지 않고 바로 호출해 시각이 밀리지 않게 함
+    run_inline = True
+
+    def __init__(self, tracer):
+        self.tracer = tracer
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, parent_run_id, name, metadata=None, prompt=""):
+        now = time.perf_counter()
+        with self._lock:
+            parent = self._runs.get(parent_run_id)
+            if parent is None:
+                turn = {"started_at": now, "timestamp": time.time(),
+                        "session_id": (metadata or {}).get("session_id"), "stages": {}, "spans": [],
+                        "tokens": {"prompt": 0, "completion": 0}, "ttft": None, "candidates": None,
+                        "reranked": None, "context_docs": None, "cache_hit": False,
+                        "table_hit": False}
+                self._runs[run_id] = {"turn": turn, "stage": None, "own": False, "start": now, "root": True}
+                return
+            turn, stage = parent["turn"], parent["stage"]
+            own = stage is None and name in TRACED_STAGES
+            self._runs[run_id] = {"turn": turn, "stage": name if own else stage, "own": own, "start": now,
+                                  "root": False, "prompt": prompt, "streamed": 0}
+
+    def mark_start(self, run_id):
+        """단계의 실제 작업 시작 시각을 기록 (스트리밍 시 on_chain_start는 입력이 모이기 전에 호출됨)"""
+        run = self._runs.get(run_id)
+        if run is not None and run["own"]:
+            run["start"] = time.perf_counter()
+
+    def _end(self, run_id, outputs=None):
+        now = time.perf_counter()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        turn = run["turn"]
+        if run["root"]:
+            self._finish(turn, now)
+            return
+        if not run["own"]:
+            return
+        stage = run["stage"]
+        turn["stages"][stage] = turn["stages"].get(stage, 0.0) + now - run["start"]
+        turn["spans"].append({"stage": stage, "start": round(run["start"] - turn["started_at"], 4),
+                              "duration": round(now - run["start"], 4)})
+        if stage == "cache_lookup":
+            turn["cache_hit"] = outputs is not None
+        elif stage == "table_lookup":
+            turn["table_hit"] = outputs is not None
+        elif stage == "rerank":
+            turn["reranked"] = len(outputs or [])
+        elif stage == "reorder":
+            turn["context_docs"] = len(outputs or [])
+
+    def _finish(self, turn, now):
+        total = now - turn.pop("started_at")
+        trace = {**turn, "total": round(total, 4), "ttft": round(turn["ttft"] if turn["ttft"] is not None else total, 4),
+                 "stages": {stage: round(seconds, 4) for stage, seconds in turn["stages"].items()}}
+        self.tracer.record(trace)
+
+    # 체인/리트리버 실행
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name"), metadata)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id, outputs)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_start(self, serialized, query, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name"), metadata)
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run and run["own"] and run["stage"] == "retrieve":
+            run["turn"]["candidates"] = len(documents)
+        self._end(run_id, documents)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    # LLM 호출 (재구성/답변 생성 단계 안에서 실행되며 토큰 수를 해당 턴에 더함)
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        prompt = "\n".join(str(message.content) for batch in messages for message in batch)
+        self._start(run_id, parent_run_id, kwargs.get("name"), metadata, prompt)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name"), metadata, "\n".join(prompts))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        run["streamed"] += 1
+        turn = run["turn"]
+        if run["stage"] == "generate" and turn["ttft"] is None:
+            turn["ttft"] = time.perf_counter() - turn["started_at"]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is not None:
+            prompt_tokens, completion_tokens = self._token_usage(response, run)
+            run["turn"]["tokens"]["prompt"] += prompt_tokens
+            run["turn"]["tokens"]["completion"] += completion_tokens
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    @staticmethod
+    def _token_usage(response, run):
+        # 모델이 보고한 사용량을 우선 쓰고, 없으면 (스트리밍 등) 글자 수로 추정
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage.get("prompt_tokens") is not None:
+            return usage["prompt_tokens"], usage.get("completion_tokens", 0)
+        generations = [generation for batch in response.generations for generation in batch]
+        metadata = getattr(getattr(generations[0], "message", None), "usage_metadata", None) if generations else None
+        if metadata:
+            return metadata["input_tokens"], metadata["output_tokens"]
+        text = "".join(generation.text for generation in generations)
+        return estimate_tokens(run["prompt"]), run["streamed"] or estimate_tokens(text)
+
+
+def traced_lambda(func, name):
+    """이름 붙인 RunnableLambda를 만든다. 단계 시간은 입력을 기다린 시간을 빼고 함수 본문 실행 시간만 잰다."""
+    def run(inputs, config):
+        manager = config.get("callbacks")
+        for handler in getattr(manager, "handlers", []):
+            if isinstance(handler, StageTraceHandler):
+                handler.mark_start(manager.parent_run_id)
+        return func(inputs)
+    return RunnableLambda(run, name=name)
+
+
+# 프로세스 전역 추적기
+tracer = Tracer()